@@ -0,0 +1,62 @@
+"""
+Бенчмарк блок-листа отозванных токенов.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_blocklist --tokens 1000000 --checks 200000
+
+Заполняет TokenBlocklist заданным числом отозванных jti и печатает занятую память
+(фильтр Блума отдельно, всё вместе — по tracemalloc), байт на токен, время проверки
+неотозванного и отозванного токена и фактическую долю ложных срабатываний фильтра.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+import uuid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tokens', type=int, default=1_000_000)
+    parser.add_argument('--checks', type=int, default=200_000)
+    parser.add_argument('--error-rate', type=float, default=0.001)
+    args = parser.parse_args()
+
+    from website.services.token_blocklist import TokenBlocklist, _key
+
+    revoked = [str(uuid.uuid4()) for _ in range(args.tokens)]
+    expires_at = time.time() + 900
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    blocklist = TokenBlocklist(capacity=args.tokens, error_rate=args.error_rate)
+    started = time.perf_counter()
+    for jti in revoked:
+        blocklist.add(jti, expires_at)
+    fill = time.perf_counter() - started
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    stats = blocklist.stats()
+    print(f"отозвано токенов: {len(blocklist):,}, заполнение {fill:.1f} с (замедлено tracemalloc)")
+    print(f"фильтр Блума: {stats['bloom_bytes'] / 2 ** 20:.1f} МиБ; всего: {used / 2 ** 20:.1f} МиБ, "
+          f"{used / len(blocklist):.0f} байт на токен")
+
+    fresh = [str(uuid.uuid4()) for _ in range(args.checks)]
+    started = time.perf_counter()
+    hits = sum(blocklist.is_revoked(jti) for jti in fresh)
+    clean = (time.perf_counter() - started) / args.checks
+    started = time.perf_counter()
+    for jti in revoked[:args.checks]:
+        blocklist.is_revoked(jti)
+    dirty = (time.perf_counter() - started) / min(args.checks, len(revoked))
+    false_positives = sum(_key(jti) in blocklist._bloom for jti in fresh)
+
+    assert hits == 0
+    print(f"проверка неотозванного: {clean * 1e6:.2f} мкс, отозванного: {dirty * 1e6:.2f} мкс")
+    print(f"ложных срабатываний фильтра: {false_positives / args.checks:.4%} (цель {args.error_rate:.4%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
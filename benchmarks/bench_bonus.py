@@ -0,0 +1,63 @@
+"""
+Бенчмарк начисления бонусов по акции.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_bonus --users 100000 --chunk 5000 --single 2000
+
+Создаёт заданное число пользователей и начисляет бонус всем: сначала по одному через
+BonusService.credit (на первых --single пользователях, с пересчётом на всех), затем
+BonusService.bulk_credit по запросу. Печатает время, начислений в секунду и проверяет,
+что сумма проводок совпадает с суммой балансов.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--chunk', type=int, default=5000)
+    parser.add_argument('--single', type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_bonus_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from sqlalchemy import func, insert, select
+    from website import create_app
+    from website.extensions import db
+    from website.models import User, BonusTransaction
+    from website.services.bonus_service import BonusService
+
+    app = create_app()
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {"login": f"user{i}", "email": f"user{i}@example.com", "phone": f"+7900{i:07d}", "password_hash": "-"}
+            for i in range(args.users)
+        ])
+        db.session.commit()
+        ids = db.session.execute(select(User.id).order_by(User.id).limit(args.single)).scalars().all()
+
+        started = time.perf_counter()
+        for user_id in ids:
+            BonusService.credit(user_id, 100)
+        single = (time.perf_counter() - started) / len(ids)
+        print(f"по одному: {1 / single:,.0f} начислений/с, {args.users} пользователей заняли бы {single * args.users:.1f} с")
+
+        started = time.perf_counter()
+        credited, _ = BonusService.bulk_credit(select(User.id), 500, chunk_size=args.chunk)
+        elapsed = time.perf_counter() - started
+        print(f"bulk_credit: {credited} начислений за {elapsed:.2f} с, {credited / elapsed:,.0f} начислений/с "
+              f"(пачка {args.chunk})")
+
+        ledger = db.session.scalar(select(func.sum(BonusTransaction.amount_minor)))
+        balances = db.session.scalar(select(func.sum(User.bonus_minor)))
+        assert ledger == balances, (ledger, balances)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
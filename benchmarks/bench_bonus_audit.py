@@ -0,0 +1,83 @@
+"""
+Бенчмарк сверки бонусных балансов с журналом.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_bonus_audit --users 100000 --transactions 2000000 --new 20000
+
+Наполняет журнал проводками (балансы согласованы с ним, у части пользователей внесено
+расхождение), затем выполняет BonusAuditService.reconcile дважды: первый прогон без
+контрольных точек читает весь журнал, второй — после --new новых проводок — только их.
+Печатает время прогонов, проводок в секунду и найденные расхождения.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--transactions', type=int, default=2_000_000)
+    parser.add_argument('--new', type=int, default=20_000)
+    parser.add_argument('--drifted', type=int, default=100)
+    parser.add_argument('--chunk', type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_bonus_audit_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from sqlalchemy import insert, text
+    from website import create_app
+    from website.extensions import db
+    from website.models import User, BonusTransaction
+    from website.services.bonus_audit import BonusAuditService
+
+    rng = random.Random(42)
+    app = create_app()
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {"id": i + 1, "login": f"user{i}", "email": f"user{i}@example.com", "phone": f"+7900{i:07d}",
+             "password_hash": "-"} for i in range(args.users)
+        ])
+        old = datetime.utcnow() - timedelta(days=1)
+
+        def add_transactions(count, timestamp):
+            # Балансы увеличиваются на сумму добавленных проводок, внесённые расхождения сохраняются
+            last_id = db.session.execute(text("SELECT COALESCE(MAX(id), 0) FROM bonus_transactions")).scalar()
+            for start in range(0, count, 100_000):
+                db.session.execute(insert(BonusTransaction), [
+                    {"user_id": rng.randint(1, args.users), "amount_minor": rng.randint(1, 1000),
+                     "type": "credit", "timestamp": timestamp}
+                    for _ in range(min(100_000, count - start))
+                ])
+            db.session.execute(text(
+                "UPDATE users SET bonus_minor = bonus_minor + (SELECT COALESCE(SUM(amount_minor), 0) "
+                "FROM bonus_transactions WHERE user_id = users.id AND id > :last_id)"
+            ), {"last_id": last_id})
+            db.session.commit()
+
+        started = time.perf_counter()
+        add_transactions(args.transactions, old)
+        db.session.execute(text(f"UPDATE users SET bonus_minor = bonus_minor + 1 WHERE id % {args.users // args.drifted} = 0"))
+        db.session.commit()
+        print(f"журнал: {args.transactions:,} проводок, {args.users:,} пользователей "
+              f"(наполнение {time.perf_counter() - started:.0f} с)")
+
+        for title, new in (("полная сверка", 0), ("инкрементальная", args.new)):
+            if new:
+                add_transactions(new, old)
+            started = time.perf_counter()
+            report, _ = BonusAuditService.reconcile(chunk_size=args.chunk)
+            elapsed = time.perf_counter() - started
+            print(f"{title}: {elapsed:.1f} с, прочитано проводок {report['transactions']:,} "
+                  f"({report['transactions'] / elapsed:,.0f}/с), пользователей {report['users']:,}, "
+                  f"расхождений {report['drifted']}, точек обновлено {report['checkpoints']:,}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Бенчмарк сжигания просроченных бонусов.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_bonus_expiry --users 100000 --credits 3 --batch 1000
+
+Каждому пользователю начисляет --credits начислений со сроком (часть уже просрочена,
+часть частично потрачена), затем запускает BonusExpiryService.sweep и печатает время,
+число записанных проводок 'expire' в секунду и план запроса поиска просроченных начислений.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--credits', type=int, default=3)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_bonus_expiry_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from sqlalchemy import insert, select, text
+    from website import create_app
+    from website.extensions import db
+    from website.models import User, BonusTransaction
+    from website.services.bonus_expiry import BonusExpiryService
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    app = create_app()
+    with app.app_context():
+        rows, balances = [], {}
+        for user_id in range(1, args.users + 1):
+            for _ in range(args.credits):
+                amount = rng.randint(100, 1000)
+                remaining = amount if rng.random() < 0.7 else rng.randint(0, amount)
+                rows.append({"user_id": user_id, "amount_minor": amount, "type": "credit", "timestamp": now,
+                             "expires_at": now + timedelta(days=rng.choice([-10, -1, 30])),
+                             "remaining_minor": remaining})
+                balances[user_id] = balances.get(user_id, 0) + remaining
+        db.session.execute(insert(User), [
+            {"id": user_id, "login": f"user{user_id}", "email": f"user{user_id}@example.com",
+             "phone": f"+7900{user_id:07d}", "password_hash": "-", "bonus_minor": balance}
+            for user_id, balance in balances.items()
+        ])
+        for start in range(0, len(rows), 100_000):
+            db.session.execute(insert(BonusTransaction), rows[start:start + 100_000])
+        db.session.commit()
+
+        plan = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT DISTINCT user_id FROM bonus_transactions "
+            "WHERE user_id > 0 AND remaining_minor > 0 AND expires_at <= :now ORDER BY user_id LIMIT 1000"
+        ), {"now": now}).all()
+        print("план поиска:", "; ".join(row[-1] for row in plan))
+
+        started = time.perf_counter()
+        report = BonusExpiryService.sweep(now=now, batch_size=args.batch)
+        elapsed = time.perf_counter() - started
+        print(f"начислений: {len(rows):,}; сожжено {report['transactions']:,} у {report['users']:,} пользователей "
+              f"за {elapsed:.1f} с — {report['transactions'] / elapsed:,.0f} проводок/с (пачка {args.batch})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Бенчмарк оформления заказа.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_checkout --checkouts 300 --sizes 1 10 100
+
+Для каждого размера корзины многократно наполняет корзину (вне замера) и оформляет
+заказ через OrderService.create_order. Печатает оформлений в секунду, среднее время
+и число SQL-запросов на одно оформление — оно не должно зависеть от размера корзины.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--checkouts', type=int, default=300)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_checkout_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from sqlalchemy import event, insert
+    from website import create_app
+    from website.extensions import db
+    from website.models import User, Product, CartItem
+    from website.services.order_service import OrderService
+
+    app = create_app()
+    with app.app_context():
+        user = User(login='bench', email='bench@example.com', phone='+79000000000', password_hash='x')
+        products = [Product(name=f"Товар {i}", price=10.0 + i, stock=10 ** 9) for i in range(max(args.sizes))]
+        db.session.add(user)
+        db.session.add_all(products)
+        db.session.commit()
+        user_id = user.id
+        product_ids = [product.id for product in products]
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *params: statements.append(1))
+
+        failed = 0
+        for size in args.sizes:
+            rows = [{"user_id": user_id, "product_id": product_id, "quantity": 1} for product_id in product_ids[:size]]
+            elapsed = 0.0
+            statements.clear()
+            for _ in range(args.checkouts):
+                db.session.execute(insert(CartItem), rows)
+                db.session.commit()
+                queries_before = len(statements)
+
+                started = time.perf_counter()
+                order, error = OrderService.create_order(user_id)
+                elapsed += time.perf_counter() - started
+                if error:
+                    failed += 1
+            queries = len(statements) - queries_before
+            print(f"строк в корзине: {size:>4}, оформлений: {args.checkouts}, "
+                  f"{args.checkouts / elapsed:,.0f}/с, {elapsed / args.checkouts * 1000:.2f} мс на заказ, "
+                  f"SQL-запросов на заказ: {queries}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
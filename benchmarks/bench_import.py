@@ -0,0 +1,74 @@
+"""
+Бенчмарк массового импорта и экспорта товаров.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_import --rows 500000
+
+Импортирует NDJSON-фид через ProductIOService (разбор, валидация, чанковые вставки,
+обновление поискового индекса), затем повторно импортирует его как обновление по id
+и выгружает каталог в CSV, сообщая время, строк в секунду и пиковый RSS процесса.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+
+def make_feed(path, rows, with_ids):
+    # Фид пишется на диск, чтобы пиковый RSS отражал импортёр, а не сам файл
+    with open(path, 'w', encoding='utf-8') as feed:
+        for i in range(rows):
+            row = {"name": f"Товар {i}", "price": 100 + i % 1000, "stock": i % 50,
+                   "description": f"Описание товара номер {i}"}
+            if with_ids:
+                row["id"] = i + 1
+            feed.write(json.dumps(row, ensure_ascii=False) + '\n')
+    return path
+
+
+def report(label, rows, seconds):
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{label}: {rows} строк за {seconds:.1f} c ({rows / seconds:,.0f} строк/с), пиковый RSS {rss_mb:.0f} МБ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_import_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from website import create_app
+    from website.services.product_io_service import ProductIOService
+    from website.utils.stream_utils import read_ndjson, csv_lines
+
+    inserts = make_feed(os.path.join(workdir, 'insert.ndjson'), args.rows, with_ids=False)
+    updates = make_feed(os.path.join(workdir, 'update.ndjson'), args.rows, with_ids=True)
+
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        with open(inserts, 'rb') as feed:
+            result = ProductIOService.import_rows(read_ndjson(feed))
+        report("импорт (вставка)", result.created, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with open(updates, 'rb') as feed:
+            result = ProductIOService.import_rows(read_ndjson(feed))
+        report("импорт (обновление)", result.updated, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        exported = 0
+        for chunk in csv_lines(['id', 'name', 'price', 'description', 'stock', 'image_url'],
+                               ProductIOService.export_rows()):
+            exported += chunk.count('\n')
+        report("экспорт CSV", exported - 1, time.perf_counter() - started)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Конкурентный бенчмарк резервирования остатков.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_inventory --threads 16 --seconds 10
+
+Много потоков одновременно оформляют заказы на один и тот же небольшой набор
+«горячих» товаров через InventoryService.reserve. В конце проверяется, что
+ни один остаток не ушёл в минус и что списано ровно столько, сколько зарезервировано.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+
+def worker(app, product_ids, user_id, deadline, seed, totals, lock):
+    from sqlalchemy.exc import OperationalError
+    from website.extensions import db
+    from website.services.inventory_service import InventoryService
+
+    rng = random.Random(seed)
+    stats = Counter()
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            quantities = {product_id: rng.randint(1, 2)
+                          for product_id in rng.sample(product_ids, rng.randint(1, 3))}
+            try:
+                _, error = InventoryService.reserve(user_id, quantities)
+                db.session.commit()
+            except OperationalError:
+                # SQLite отвечает "database is locked" при слишком долгом ожидании записи
+                db.session.rollback()
+                stats['retries'] += 1
+                continue
+            stats['rejected' if error else 'reserved'] += 1
+        db.session.remove()
+    with lock:
+        totals.update(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--products', type=int, default=5)
+    parser.add_argument('--stock', type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_inventory_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from sqlalchemy import func
+    from website import create_app
+    from website.extensions import db
+    from website.models import User, Product, StockReservation
+
+    app = create_app()
+    with app.app_context():
+        user = User(login='bench', email='bench@example.com', phone='+79000000000', password_hash='x')
+        products = [Product(name=f"Горячий товар {i}", price=100.0, stock=args.stock) for i in range(args.products)]
+        db.session.add(user)
+        db.session.add_all(products)
+        db.session.commit()
+        product_ids = [product.id for product in products]
+        user_id = user.id
+
+    totals, lock = Counter(), threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+    threads = [threading.Thread(target=worker, args=(app, product_ids, user_id, deadline, seed, totals, lock))
+               for seed in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        stock = dict(db.session.query(Product.id, Product.stock).all())
+        reserved = dict(db.session.query(StockReservation.product_id, func.sum(StockReservation.quantity))
+                        .group_by(StockReservation.product_id).all())
+
+    attempts = totals['reserved'] + totals['rejected']
+    print(f"потоков: {args.threads}, товаров: {args.products}, начальный остаток: {args.stock}")
+    print(f"оформлений: {attempts} за {elapsed:.1f} c ({attempts / elapsed:,.0f}/с), "
+          f"успешных: {totals['reserved']}, отказов: {totals['rejected']}, повторов: {totals['retries']}")
+
+    oversold = [product_id for product_id, value in stock.items() if value < 0]
+    mismatched = [product_id for product_id in product_ids
+                  if args.stock - stock[product_id] != reserved.get(product_id, 0)]
+    print(f"минимальный остаток: {min(stock.values())}, ушли в минус: {oversold or 'нет'}, "
+          f"расхождения списаний и резервов: {mismatched or 'нет'}")
+    return 1 if oversold or mismatched else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
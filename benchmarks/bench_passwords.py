@@ -0,0 +1,102 @@
+"""
+Бенчмарк входа по паролю.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_passwords --method scrypt:32768:8:1 --workers 0 4 --threads 16 --logins 400
+
+Для каждого размера пула (0 — хэширование в потоке запроса) параллельно выполняет
+POST /auth/login и печатает входы в секунду, входы в секунду на ядро, p50/p99
+времени ответа, а также время лёгкого запроса к каталогу, идущего одновременно со входами,
+чтобы было видно, голодают ли остальные запросы.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def login_worker(app, logins, timings, lock):
+    client = app.test_client()
+    local = []
+    for login in logins:
+        started = time.perf_counter()
+        response = client.post('/auth/login', json={"login": login, "password": "password123"})
+        local.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    with lock:
+        timings.extend(local)
+
+
+def probe_worker(app, stop, timings):
+    client = app.test_client()
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.get('/catalog/products?limit=1')
+        timings.append(time.perf_counter() - started)
+        time.sleep(0.01)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--method', default='scrypt:32768:8:1')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, os.cpu_count() or 1])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=400)
+    parser.add_argument('--users', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_passwords_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from website import create_app
+    from website.extensions import db
+    from website.models import User
+    from website.services.password_service import PasswordHasher
+
+    app = create_app()
+    app.config.update(PASSWORD_HASH_METHOD=args.method)
+    password_hash = PasswordHasher(method=args.method).hash('password123')
+    with app.app_context():
+        db.session.add_all(User(login=f"user{i}", email=f"user{i}@example.com", phone=f"+7900{i:07d}",
+                                password_hash=password_hash) for i in range(args.users))
+        db.session.commit()
+
+    logins = [f"user{i % args.users}" for i in range(args.logins)]
+    print(f"метод: {args.method}, потоков: {args.threads}, входов: {args.logins}, ядер: {os.cpu_count()}")
+    for workers in args.workers:
+        hasher = PasswordHasher(method=args.method, workers=workers, max_pending=args.threads * 2)
+        app.extensions['password_hasher'] = hasher
+        hasher.hash('прогрев')
+
+        timings, probes, lock, stop = [], [], threading.Lock(), threading.Event()
+        probe = threading.Thread(target=probe_worker, args=(app, stop, probes))
+        threads = [threading.Thread(target=login_worker, args=(app, logins[i::args.threads], timings, lock))
+                   for i in range(args.threads)]
+        started = time.perf_counter()
+        probe.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        probe.join()
+        hasher.shutdown()
+
+        rate = len(timings) / elapsed
+        cores = min(workers, os.cpu_count() or 1) if workers else 1
+        print(f"пул {workers or 'нет'}: {rate:,.1f} входов/с, {rate / cores:,.1f} на ядро, "
+              f"p50 {percentile(timings, 0.5) * 1000:.0f} мс, p99 {percentile(timings, 0.99) * 1000:.0f} мс; "
+              f"каталог во время входов p99 {percentile(probes, 0.99) * 1000:.0f} мс")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
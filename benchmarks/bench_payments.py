@@ -0,0 +1,85 @@
+"""
+Нагрузочный прогон генерации ссылок на оплату против локальной заглушки ЮKassa.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_payments --threads 16 --orders 2000 --latency 0.02
+
+Поднимает FakeYooKassa с заданной задержкой ответа, создаёт заказы и параллельно
+вызывает POST /order/generate_payment_link/<id>. Печатает пропускную способность,
+p50/p99 времени ответа и число запросов, дошедших до шлюза.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def worker(app, headers, order_ids, timings, statuses, lock):
+    client = app.test_client()
+    local_timings, local_statuses = [], []
+    for order_id in order_ids:
+        started = time.perf_counter()
+        response = client.post(f'/order/generate_payment_link/{order_id}', headers=headers)
+        local_timings.append(time.perf_counter() - started)
+        local_statuses.append(response.status_code)
+    with lock:
+        timings.extend(local_timings)
+        statuses.extend(local_statuses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_payments_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from collections import Counter
+    from flask_jwt_extended import create_access_token
+    from website import create_app
+    from website.extensions import db
+    from website.models import User, Order
+    from website.utils.fake_yookassa import FakeYooKassa
+
+    with FakeYooKassa(latency=args.latency) as gateway:
+        app = create_app()
+        app.config.update(YOOKASSA_API_URL=gateway.url, PAYMENT_POOL_SIZE=args.threads)
+        with app.app_context():
+            user = User(login='bench', email='bench@example.com', phone='+79000000000', password_hash='x')
+            db.session.add(user)
+            db.session.flush()
+            orders = [Order(user_id=user.id, total_amount=100.0 + i) for i in range(args.orders)]
+            db.session.add_all(orders)
+            db.session.commit()
+            order_ids = [order.id for order in orders]
+            headers = {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+
+        timings, statuses, lock = [], [], threading.Lock()
+        threads = [threading.Thread(target=worker, args=(app, headers, order_ids[i::args.threads], timings, statuses, lock))
+                   for i in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    print(f"потоков: {args.threads}, заказов: {args.orders}, задержка шлюза: {args.latency * 1000:.0f} мс")
+    print(f"ссылок: {len(timings)} за {elapsed:.1f} c ({len(timings) / elapsed:,.0f}/с), "
+          f"p50 {percentile(timings, 0.5) * 1000:.1f} мс, p99 {percentile(timings, 0.99) * 1000:.1f} мс")
+    print(f"ответы: {dict(Counter(statuses))}, запросов к шлюзу: {gateway.requests}, платежей: {len(gateway.payments)}")
+    return 0 if all(status == 200 for status in statuses) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
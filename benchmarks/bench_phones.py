@@ -0,0 +1,84 @@
+"""
+Бенчмарк проверки телефонных номеров.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_phones --starts 5 --checks 20000 --distinct 500
+
+Старт: медиана времени импорта приложения и create_app() в отдельном процессе — как сейчас
+(phonenumbers загружается при первой проверке номера) и с принудительным импортом
+phonenumbers при старте, как было раньше.
+Пропускная способность: проверок номера в секунду без кэша (каждый раз parse и
+is_valid_number) и через phone_to_e164 с LRU-кэшем; номера повторяются, как при
+повторных попытках регистрации и сохранения профиля.
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+STARTUP_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+{prelude}
+from website import create_app
+create_app()
+print(time.perf_counter() - started, 'phonenumbers' in sys.modules)
+"""
+
+
+def measure_startup(prelude, env):
+    output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT.format(prelude=prelude)], env=env,
+                            capture_output=True, text=True, check=True).stdout.split()
+    return float(output[-2]), output[-1] == 'True'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--starts', type=int, default=5)
+    parser.add_argument('--checks', type=int, default=20000)
+    parser.add_argument('--distinct', type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_phones_')
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    variants = {'ленивый импорт': '', 'импорт при старте': 'import phonenumbers'}
+    timings, loaded = {name: [] for name in variants}, {}
+    # Варианты чередуются, чтобы прогрев дискового кэша и фоновая нагрузка делились поровну
+    for _ in range(args.starts):
+        for name, prelude in variants.items():
+            elapsed, loaded[name] = measure_startup(prelude, env)
+            timings[name].append(elapsed)
+    for name in variants:
+        print(f"старт, {name}: {statistics.median(timings[name]) * 1000:.0f} мс, "
+              f"phonenumbers загружен: {'да' if loaded[name] else 'нет'}")
+
+    from website.utils.identity_utils import _parse_phone, phone_to_e164
+
+    rng = random.Random(42)
+    pool = [f"+7912{rng.randrange(10 ** 7):07d}" for _ in range(args.distinct)]
+    phones = rng.choices(pool, k=args.checks)
+    _parse_phone('+79123456789')  # метаданные загружаются вне замера
+
+    started = time.perf_counter()
+    for phone in phones:
+        _parse_phone.__wrapped__(phone)
+    uncached = args.checks / (time.perf_counter() - started)
+
+    _parse_phone.cache_clear()
+    started = time.perf_counter()
+    for phone in phones:
+        phone_to_e164(phone)
+    cached = args.checks / (time.perf_counter() - started)
+
+    print(f"проверок: {args.checks}, разных номеров: {args.distinct}")
+    print(f"без кэша: {uncached:,.0f} проверок/с")
+    print(f"с LRU-кэшем: {cached:,.0f} проверок/с ({_parse_phone.cache_info()})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""
+Бенчмарк хранилищ лимитов запросов.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_rate_limit --checks 200000 --clients 10000 [--redis redis://localhost:6379]
+
+Для каждого хранилища выполняет проверки стратегией sliding-window-counter (как
+RateLimiter.hit в Flask-Limiter) по заданному числу клиентов и печатает время одной
+проверки и число ключей в памяти после прогона.
+"""
+import argparse
+import random
+import sys
+import time
+
+
+def run(storage, keys):
+    from limits import parse
+    from limits.strategies import SlidingWindowCounterRateLimiter
+
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    item = parse('100 per minute')
+    started = time.perf_counter()
+    for key in keys:
+        limiter.hit(item, key)
+    return (time.perf_counter() - started) / len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--checks', type=int, default=200_000)
+    parser.add_argument('--clients', type=int, default=10_000)
+    parser.add_argument('--max-keys', type=int, default=100_000)
+    parser.add_argument('--redis', default=None)
+    args = parser.parse_args()
+
+    from limits.storage import MemoryStorage, storage_from_string
+    from website.utils.rate_limit import WindowMemoryStorage
+
+    rng = random.Random(42)
+    keys = [f"10.0.{i // 256 % 256}.{i % 256}" for i in (rng.randrange(args.clients) for _ in range(args.checks))]
+    storages = [
+        ('window-memory://', WindowMemoryStorage(max_keys=args.max_keys), lambda s: len(s._windows)),
+        ('memory://', MemoryStorage(), lambda s: len(s.storage)),
+    ]
+    if args.redis:
+        storages.append((args.redis, storage_from_string(args.redis), lambda s: None))
+
+    print(f"проверок: {args.checks}, клиентов: {args.clients}")
+    for name, storage, size in storages:
+        per_check = run(storage, keys)
+        keys_left = size(storage)
+        print(f"{name}: {per_check * 1e6:.2f} мкс на проверку"
+              + (f", ключей в памяти: {keys_left}" if keys_left is not None else ""))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
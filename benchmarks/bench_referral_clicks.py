@@ -0,0 +1,82 @@
+"""
+Бенчмарк учёта переходов по реферальным ссылкам.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_referral_clicks --codes 10000 --clicks 200000 --requests 20000
+
+Печатает скорость увеличения счётчика в памяти (ReferralClickService.track),
+скорость POST /auth/ref/<код>/click через тестовый клиент, время переноса накопленных
+дельт в referral_clicks одним flush и для сравнения — запись строки в БД на каждый переход.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--codes', type=int, default=10_000)
+    parser.add_argument('--clicks', type=int, default=200_000)
+    parser.add_argument('--requests', type=int, default=20_000)
+    parser.add_argument('--naive', type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_referral_clicks_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from sqlalchemy import func, insert, select, text
+    from website import create_app
+    from website.extensions import db
+    from website.models import User, ReferralClick
+    from website.services.referral_clicks import ReferralClickService
+
+    rng = random.Random(42)
+    app = create_app()
+    app.config.update(RATELIMIT_ENABLED=False, REFERRAL_CLICK_FLUSH_INTERVAL=0)
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {"login": f"user{i}", "email": f"user{i}@example.com", "phone": f"+7900{i:07d}",
+             "password_hash": "-", "referral_code": f"code{i}"} for i in range(args.codes)
+        ])
+        db.session.commit()
+        # Кампания: небольшая доля кодов собирает большую часть переходов
+        codes = [f"code{min(int(rng.paretovariate(1.2)) - 1, args.codes - 1)}" for _ in range(args.clicks)]
+
+        started = time.perf_counter()
+        for code in codes:
+            ReferralClickService.track(code)
+        elapsed = time.perf_counter() - started
+        print(f"счётчик в памяти: {len(codes) / elapsed:,.0f} переходов/с")
+
+        client = app.test_client()
+        started = time.perf_counter()
+        for code in codes[:args.requests]:
+            client.post(f'/auth/ref/{code}/click')
+        elapsed = time.perf_counter() - started
+        print(f"POST /auth/ref/<код>/click: {args.requests / elapsed:,.0f} запросов/с на поток")
+
+        started = time.perf_counter()
+        report = ReferralClickService.flush()
+        elapsed = time.perf_counter() - started
+        stored = db.session.execute(select(func.sum(ReferralClick.clicks))).scalar()
+        print(f"flush: {elapsed * 1000:.0f} мс, кодов {report['codes']:,}, переходов {report['clicks']:,} "
+              f"(в таблице {stored:,})")
+        assert stored == len(codes) + args.requests
+
+        db.session.execute(text("CREATE TABLE naive_clicks (id INTEGER PRIMARY KEY, referral_code TEXT, "
+                                "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"))
+        db.session.commit()
+        started = time.perf_counter()
+        for code in codes[:args.naive]:
+            db.session.execute(text("INSERT INTO naive_clicks (referral_code) VALUES (:code)"), {"code": code})
+            db.session.commit()
+        elapsed = time.perf_counter() - started
+        print(f"строка на переход: {args.naive / elapsed:,.0f} переходов/с")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
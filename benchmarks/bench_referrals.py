@@ -0,0 +1,94 @@
+"""
+Бенчмарк реферальной статистики.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_referrals --users 200000 --depth 1000 --adds 500 --reads 2000
+
+Строит дерево из --users пользователей (ветвящаяся часть плюс цепочка глубиной --depth),
+заполняет referral_stats через ReferralService.rebuild_stats, затем печатает время
+add_referral под самым глубоким листом и под корнем, время чтения статистики корня
+из агрегатов и для сравнения — обход поддерева корня в Python по одному запросу на уровень.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--depth', type=int, default=1000)
+    parser.add_argument('--adds', type=int, default=500)
+    parser.add_argument('--reads', type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_referrals_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from sqlalchemy import insert, select
+    from website import create_app
+    from website.extensions import db
+    from website.models import User, Referral
+    from website.services import referral_service
+    from website.services.referral_service import ReferralService
+
+    rng = random.Random(42)
+    referral_service.MAX_DEPTH = max(referral_service.MAX_DEPTH, args.depth + 10)
+    total = args.users + args.adds * 2
+    app = create_app()
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {"id": i, "login": f"user{i}", "email": f"user{i}@example.com", "phone": f"+7900{i:07d}",
+             "password_hash": "-"} for i in range(1, total + 1)
+        ])
+        # Пользователи 2..depth+1 — цепочка под корнем, остальные — случайное дерево под корнем
+        edges = [(i - 1, i) for i in range(2, args.depth + 2)]
+        for i in range(args.depth + 2, args.users + 1):
+            referrer = rng.randint(args.depth + 1, i - 1)
+            edges.append((1 if referrer == args.depth + 1 else referrer, i))
+        for start in range(0, len(edges), 100_000):
+            db.session.execute(insert(Referral), [
+                {"referrer_id": referrer, "referred_user_id": referred, "bonus_amount": 1.0}
+                for referrer, referred in edges[start:start + 100_000]
+            ])
+            db.session.execute(User.__table__.update().where(User.id == db.bindparam('uid'))
+                               .values(referrer_id=db.bindparam('rid')),
+                               [{"uid": referred, "rid": referrer} for referrer, referred in edges[start:start + 100_000]])
+        db.session.commit()
+
+        started = time.perf_counter()
+        report, _ = ReferralService.rebuild_stats()
+        print(f"дерево: {args.users:,} пользователей, цепочка {args.depth}; "
+              f"rebuild_stats {time.perf_counter() - started:.1f} с, агрегатов {report['users']:,}")
+
+        new_ids = iter(range(args.users + 1, total + 1))
+        for title, parent in (("под глубоким листом", args.depth + 1), ("под корнем", 1)):
+            started = time.perf_counter()
+            for _ in range(args.adds):
+                _, error = ReferralService.add_referral(parent, next(new_ids))
+                assert error is None, error
+            elapsed = time.perf_counter() - started
+            print(f"add_referral {title}: {elapsed / args.adds * 1000:.2f} мс на вставку")
+
+        started = time.perf_counter()
+        for _ in range(args.reads):
+            stats = ReferralService.get_stats(1)
+        elapsed = time.perf_counter() - started
+        print(f"get_stats корня: {elapsed / args.reads * 1_000_000:.0f} мкс, всего в поддереве {stats['total']:,}")
+
+        started = time.perf_counter()
+        level, counted = [1], 0
+        while level:
+            level = db.session.execute(select(Referral.referred_user_id)
+                                       .where(Referral.referrer_id.in_(level))).scalars().all()
+            counted += len(level)
+        print(f"обход в Python: {(time.perf_counter() - started) * 1000:.0f} мс, насчитано {counted:,}")
+        assert counted == stats['total']
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+Бенчмарк полнотекстового поиска по каталогу.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_search --products 100000 --queries 2000 --vocabulary 30000
+
+Заполняет временную SQLite-базу синтетическими товарами, строит FTS5-индекс
+и замеряет задержку SearchService.search на случайных префиксных запросах.
+Слова названий, описаний и запросов берутся из словаря --vocabulary слов
+с распределением Ципфа: частые слова («ноутбук», «чехол») встречаются в большой
+доле каталога и дают широкие запросы, редкие — узкие.
+
+Первый прогон — SearchService.search, по нему проверяется бюджет p99; второй —
+те же запросы через GET /catalog/search (с накладными расходами Flask). Кэша
+результатов поиска нет: каждый запрос идёт в индекс.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+WORDS = [
+    "ноутбук", "смартфон", "планшет", "наушники", "колонка", "клавиатура", "мышь", "монитор",
+    "чехол", "зарядка", "кабель", "адаптер", "камера", "объектив", "штатив", "рюкзак",
+    "игровой", "беспроводной", "портативный", "компактный", "профессиональный", "умный",
+    "чёрный", "белый", "серый", "красный", "синий", "металлический", "пластиковый", "кожаный",
+    "laptop", "phone", "tablet", "wireless", "gaming", "ultra", "mini", "pro", "max", "lite",
+]
+
+
+SYLLABLES = ["ка", "ро", "ми", "ла", "то", "ве", "ст", "на", "пре", "ко", "лю", "ор", "ин", "да", "су", "те"]
+
+
+def vocabulary(size, rng):
+    # Голова словаря — настоящие частые слова, хвост — синтетические из слогов
+    words, seen = list(WORDS), set(WORDS)
+    while len(words) < size:
+        word = ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 5)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    weights = [1 / (rank + 1) ** 1.07 for rank in range(len(words))]
+    cumulative, total = [], 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return words, cumulative
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed(count, rng, words, cumulative):
+    from website.extensions import db
+    from website.models import Product
+    from website.services.search_service import SearchService
+
+    chunk = 10000
+    for start in range(0, count, chunk):
+        rows = [{
+            "name": ' '.join(rng.choices(words, cum_weights=cumulative, k=3)) + f" {start + i}",
+            "description": ' '.join(rng.choices(words, cum_weights=cumulative, k=12)),
+            "price": round(rng.uniform(100, 100000), 2),
+            "stock": rng.randint(0, 50),
+        } for i in range(min(chunk, count - start))]
+        db.session.execute(db.insert(Product), rows)
+    SearchService.rebuild_index()
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--vocabulary', type=int, default=30000)
+    parser.add_argument('--p99-budget-ms', type=float, default=20.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_search_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from website import create_app
+    from website.services.search_service import SearchService
+
+    rng = random.Random(42)
+    app = create_app()
+    with app.app_context():
+        words, cumulative = vocabulary(args.vocabulary, rng)
+        started = time.perf_counter()
+        seed(args.products, rng, words, cumulative)
+        print(f"seed: {args.products} товаров за {time.perf_counter() - started:.1f} c")
+
+        queries = []
+        for _ in range(args.queries):
+            terms = rng.choices(words, cum_weights=cumulative, k=rng.choice([1, 1, 2]))
+            queries.append(' '.join(term[:rng.randint(min(3, len(term)), len(term))] for term in terms))
+
+        pages = [rng.choice([1, 1, 1, 2, 3]) for _ in queries]
+        latencies = []
+        for query, page in zip(queries, pages):
+            started = time.perf_counter()
+            SearchService.search(query, page=page)
+            latencies.append((time.perf_counter() - started) * 1000)
+        p99 = report("SearchService.search", latencies)
+
+        client = app.test_client()
+        latencies = []
+        for query, page in zip(queries, pages):
+            started = time.perf_counter()
+            client.get('/catalog/search', query_string={"q": query, "page": page})
+            latencies.append((time.perf_counter() - started) * 1000)
+        report("GET /catalog/search", latencies)
+
+    print(f"бюджет p99 {args.p99_budget_ms:.0f} мс")
+    return 0 if p99 <= args.p99_budget_ms else 1
+
+
+def report(title, latencies):
+    p99 = percentile(latencies, 99)
+    print(f"{title}: {len(latencies)} запросов, p50 {statistics.median(latencies):.2f} мс, "
+          f"p95 {percentile(latencies, 95):.2f} мс, p99 {p99:.2f} мс")
+    return p99
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""
+Бенчмарк приёма и разбора вебхуков платёжного шлюза.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_webhooks --payments 5000 --duplicates 2 --threads 8
+
+Воспроизводит «шторм» уведомлений: каждое событие об успешной оплате отправляется
+несколько раз из нескольких потоков, пока фоновый разбор очереди работает параллельно.
+Печатает скорость приёма, время до полного разбора, задержку received_at → processed_at
+(p50/p99) и проверяет, что все заказы оплачены ровно по одному событию на платёж.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def sender(app, payloads):
+    client = app.test_client()
+    for payload in payloads:
+        response = client.post('/order/yookassa_webhook', json=payload)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payments', type=int, default=5000)
+    parser.add_argument('--duplicates', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--drain-interval', type=float, default=0.2)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_webhooks_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from website import create_app
+    from website.extensions import db
+    from website.models import User, Order, WebhookEvent
+    from website.services.webhook_service import WebhookService
+    from website.utils.background import start_periodic
+
+    app = create_app()
+    with app.app_context():
+        user = User(login='bench', email='bench@example.com', phone='+79000000000', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all(Order(user_id=user.id, total_amount=100.0, payment_id=f"pay-{i}")
+                           for i in range(args.payments))
+        db.session.commit()
+
+    payloads = [{"type": "notification", "event": "payment.succeeded",
+                 "object": {"id": f"pay-{i}", "status": "succeeded", "paid": True}}
+                for i in range(args.payments) for _ in range(args.duplicates)]
+    random.Random(1).shuffle(payloads)
+
+    stop = start_periodic(app, 'bench-webhook-drain', args.drain_interval, WebhookService.drain)
+    threads = [threading.Thread(target=sender, args=(app, payloads[i::args.threads])) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    intake = time.perf_counter() - started
+
+    with app.app_context():
+        while db.session.query(WebhookEvent.id).filter(WebhookEvent.processed_at.is_(None)).first():
+            db.session.remove()
+            time.sleep(0.05)
+        drained = time.perf_counter() - started
+        stop.set()
+
+        lags = [(processed - received).total_seconds() for received, processed
+                in db.session.query(WebhookEvent.received_at, WebhookEvent.processed_at)]
+        events = len(lags)
+        paid = Order.query.filter_by(status="Оплачен").count()
+
+    print(f"уведомлений: {len(payloads)} ({args.payments} платежей × {args.duplicates}), потоков: {args.threads}")
+    print(f"приём: {intake:.1f} c ({len(payloads) / intake:,.0f}/с), полный разбор: {drained:.1f} c")
+    print(f"сохранено событий: {events}, оплачено заказов: {paid}, "
+          f"задержка разбора p50 {percentile(lags, 0.5) * 1000:.0f} мс, p99 {percentile(lags, 0.99) * 1000:.0f} мс")
+    return 0 if events == args.payments and paid == args.payments else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -11,6 +11,44 @@ class Config:
     CACHE_REDIS_HOST = 'localhost'
     CACHE_REDIS_PORT = 6379
     WTF_CSRF_ENABLED = False
+    INVENTORY_HOLD_SECONDS = 900  # Сколько товар удерживается за неоплаченным заказом
+    INVENTORY_SWEEP_INTERVAL = 60  # Период фоновой очистки просроченных удержаний, 0 — выключена
+    CART_STORE = os.getenv('CART_STORE', 'sql')  # Хранилище корзин: sql — таблица cart_items, redis — хэш в Redis
+    CART_REDIS_URL = os.getenv('CART_REDIS_URL')  # Обязателен для CART_STORE=redis; в тестах без него — MemoryRedis
+    CART_FLUSH_INTERVAL = 5  # Период переноса изменённых корзин из Redis в cart_items, 0 — выключен
+    YOOKASSA_API_URL = os.getenv('YOOKASSA_API_URL', 'https://api.yookassa.ru/v3')
+    YOOKASSA_SHOP_ID = os.getenv('YOOKASSA_SHOP_ID')
+    YOOKASSA_SECRET_KEY = os.getenv('YOOKASSA_SECRET_KEY')
+    PAYMENT_CONNECT_TIMEOUT = 3.05  # Таймаут соединения с платёжным шлюзом, с
+    PAYMENT_READ_TIMEOUT = 10  # Таймаут ответа платёжного шлюза, с
+    PAYMENT_MAX_RETRIES = 2  # Повторы при сетевых ошибках и 429/5xx
+    PAYMENT_POOL_SIZE = 20  # Соединений в пуле к шлюзу
+    PAYMENT_BREAKER_THRESHOLD = 5  # Подряд неудачных обращений до размыкания предохранителя
+    PAYMENT_BREAKER_RESET = 30  # Через сколько секунд пропустить пробный запрос
+    WEBHOOK_DRAIN_INTERVAL = 1  # Период разбора входящих уведомлений платёжного шлюза, 0 — выключен
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # Алгоритм и стоимость KDF
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))  # Процессов для хэширования, 0 — в потоке запроса
+    PASSWORD_HASH_MAX_PENDING = 64  # Сколько операций с паролями может ждать пул, остальным — 503
+    AUTH_MISS_TTL = 30  # Сколько секунд помнить, что логин/email/телефон не найден
+    TOKEN_BLOCKLIST_CAPACITY = 1_000_000  # На сколько отозванных токенов рассчитан фильтр Блума
+    TOKEN_BLOCKLIST_ERROR_RATE = 0.001  # Доля ложных срабатываний фильтра (их проверяет точное множество)
+    TOKEN_BLOCKLIST_SYNC_INTERVAL = 2  # Период подтягивания отзывов других процессов, 0 — выключен
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI', 'window-memory://')  # В памяти процесса; для кластера — redis://
+    RATELIMIT_STORAGE_OPTIONS = {"max_keys": 100_000}  # Предел числа ключей для window-memory://
+    RATELIMIT_STRATEGY = 'sliding-window-counter'
+    RATELIMIT_HEADERS_ENABLED = True
+    RATELIMIT_SWALLOW_ERRORS = True  # Недоступное хранилище лимитов не роняет запросы
+    RATELIMIT_LOGIN = os.getenv('RATELIMIT_LOGIN', '10 per minute;100 per hour')
+    RATELIMIT_REGISTER = os.getenv('RATELIMIT_REGISTER', '5 per minute;20 per hour')
+    RATELIMIT_CART = os.getenv('RATELIMIT_CART', '120 per minute')
+    BONUS_AUDIT_INTERVAL = 24 * 3600  # Период сверки бонусных балансов с журналом, 0 — выключена
+    BONUS_AUDIT_REPAIR = os.getenv('BONUS_AUDIT_REPAIR', 'False') == 'True'  # Исправлять ли расхождения автоматически
+    BONUS_EXPIRY_DAYS = int(os.getenv('BONUS_EXPIRY_DAYS', 365))  # Срок действия начисленных бонусов, 0 — бессрочно
+    BONUS_EXPIRY_SWEEP_INTERVAL = 3600  # Период сжигания просроченных бонусов, 0 — выключено
+    REFERRAL_CLICK_REDIS_URL = os.getenv('REFERRAL_CLICK_REDIS_URL')  # Общие счётчики переходов; без адреса — в памяти процесса
+    REFERRAL_CLICK_MAX_CODES = 100_000  # Сколько разных кодов копится в памяти между переносами
+    REFERRAL_CLICK_FLUSH_INTERVAL = 5  # Период переноса счётчиков переходов в referral_clicks, 0 — выключен
+    RATELIMIT_REFERRAL_CLICK = os.getenv('RATELIMIT_REFERRAL_CLICK', '60 per minute')
 
 class DevelopmentConfig(Config):
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(os.getcwd(), 'instance', os.getenv('DB_NAME', 'dev_db.sqlite'))}"
@@ -34,3 +72,13 @@ class TestingConfig(Config):
     TESTING = True  # Включение тестового режима
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     MAIL_SUPPRESS_SEND = True  # Отключает отправку почты во время тестирования
+    INVENTORY_SWEEP_INTERVAL = 0
+    CART_FLUSH_INTERVAL = 0
+    WEBHOOK_DRAIN_INTERVAL = 0
+    TOKEN_BLOCKLIST_SYNC_INTERVAL = 0
+    RATELIMIT_LOGIN = RATELIMIT_REGISTER = RATELIMIT_CART = RATELIMIT_REFERRAL_CLICK = '10000 per second'
+    BONUS_AUDIT_INTERVAL = 0
+    BONUS_EXPIRY_SWEEP_INTERVAL = 0
+    REFERRAL_CLICK_FLUSH_INTERVAL = 0
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'  # Дешёвый хэш, чтобы тесты не тратили время на KDF
+    PASSWORD_HASH_WORKERS = 0
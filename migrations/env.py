@@ -3,7 +3,9 @@ from website import create_app
 from website.models import db
 
 
-app = create_app()
+# Схему ведут только миграции: create_all при старте приложения создал бы новые
+# таблицы раньше ревизий, которые их добавляют
+app = create_app(init_schema=False)
 app.app_context().push()
 target_metadata = db.metadata
 
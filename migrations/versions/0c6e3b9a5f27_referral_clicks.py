@@ -0,0 +1,44 @@
+"""Счётчики переходов по реферальным ссылкам
+
+Revision ID: 0c6e3b9a5f27
+Revises: f4b8d1a6c392
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0c6e3b9a5f27'
+down_revision = 'f4b8d1a6c392'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name']: column for column in inspector.get_columns('users')}
+    # token_urlsafe(16) даёт 22 символа, а колонка была на 20
+    if (getattr(columns['referral_code']['type'], 'length', None) or 0) < 32:
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.alter_column('referral_code', type_=sa.String(32), existing_type=sa.String(20),
+                                  existing_nullable=True)
+    if inspector.has_table('referral_clicks'):
+        return
+    op.create_table(
+        'referral_clicks',
+        sa.Column('referral_code', sa.String(32), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('clicks', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_referral_clicks_user_id', 'referral_clicks', ['user_id'])
+
+
+def downgrade():
+    op.drop_index('ix_referral_clicks_user_id', table_name='referral_clicks')
+    op.drop_table('referral_clicks')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('referral_code', type_=sa.String(20), existing_type=sa.String(32),
+                              existing_nullable=True)
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""Индексы keyset-пагинации каталога
+
+Revision ID: 1a7c3e9b5d02
+Revises: 0c6e3b9a5f27
+Create Date: 2026-10-19 01:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '1a7c3e9b5d02'
+down_revision = '0c6e3b9a5f27'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_products_price_id': ['price', 'id'],
+    'ix_products_name_id': ['name', 'id'],
+}
+
+
+def upgrade():
+    # В базах, созданных через create_all, индексы уже есть
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('products')}
+    with op.batch_alter_table('products') as batch_op:
+        for name, columns in INDEXES.items():
+            if name not in existing:
+                batch_op.create_index(name, columns)
+
+
+def downgrade():
+    with op.batch_alter_table('products') as batch_op:
+        for name in reversed(list(INDEXES)):
+            batch_op.drop_index(name)
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""Метки изменения пользователей, товаров и строк корзины
+
+Revision ID: 2b8d4f0a6e13
+Revises: 1a7c3e9b5d02
+Create Date: 2026-10-19 01:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '2b8d4f0a6e13'
+down_revision = '1a7c3e9b5d02'
+branch_labels = None
+depends_on = None
+
+# Таблица -> индексировать ли updated_at
+UPDATED_AT = {'users': True, 'products': True, 'cart_items': False}
+
+
+def upgrade():
+    # В базах, созданных через create_all, колонки и индексы уже есть
+    inspector = sa.inspect(op.get_bind())
+    for table, indexed in UPDATED_AT.items():
+        columns = {column['name'] for column in inspector.get_columns(table)}
+        if 'updated_at' in columns:
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+            if indexed:
+                batch_op.create_index(f'ix_{table}_updated_at', ['updated_at'])
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+
+    if 'ix_cart_items_user_id' not in {index['name'] for index in inspector.get_indexes('cart_items')}:
+        with op.batch_alter_table('cart_items') as batch_op:
+            batch_op.create_index('ix_cart_items_user_id', ['user_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('cart_items') as batch_op:
+        batch_op.drop_index('ix_cart_items_user_id')
+    for table, indexed in reversed(list(UPDATED_AT.items())):
+        with op.batch_alter_table(table) as batch_op:
+            if indexed:
+                batch_op.drop_index(f'ix_{table}_updated_at')
+            batch_op.drop_column('updated_at')
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""Удержания товара при оформлении заказа
+
+Revision ID: 3c9e5a1b7f24
+Revises: 2b8d4f0a6e13
+Create Date: 2026-10-19 01:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '3c9e5a1b7f24'
+down_revision = '2b8d4f0a6e13'
+branch_labels = None
+depends_on = None
+
+FK_NAME = 'fk_stock_reservations_product_id_products'
+NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('stock_reservations'):
+        op.create_table(
+            'stock_reservations',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('order_id', sa.Integer(), sa.ForeignKey('orders.id'), nullable=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id', name=FK_NAME, ondelete='CASCADE'),
+                      nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('status', sa.String(20), nullable=False),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+        )
+        op.create_index('ix_stock_reservations_order_id', 'stock_reservations', ['order_id'])
+        op.create_index('ix_stock_reservations_status_expires', 'stock_reservations', ['status', 'expires_at'])
+        return
+
+    # Таблица создана через create_all без ON DELETE: удаление товара, который когда-либо
+    # заказывали, падало на внешнем ключе. Завершённые удержания больше не нужны
+    op.execute("DELETE FROM stock_reservations WHERE status IN ('committed', 'released')")
+    fk = next(fk for fk in inspector.get_foreign_keys('stock_reservations') if fk['referred_table'] == 'products')
+    if (fk.get('options') or {}).get('ondelete', '').upper() != 'CASCADE':
+        with op.batch_alter_table('stock_reservations', naming_convention=NAMING) as batch_op:
+            batch_op.drop_constraint(fk['name'] or FK_NAME, type_='foreignkey')
+            batch_op.create_foreign_key(FK_NAME, 'products', ['product_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    op.drop_table('stock_reservations')
\ No newline at end of file
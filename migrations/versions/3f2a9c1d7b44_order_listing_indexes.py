@@ -0,0 +1,40 @@
+"""Индексы для истории заказов, админского списка и поиска заказа по платежу
+
+Revision ID: 3f2a9c1d7b44
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '3f2a9c1d7b44'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDEXES = {
+    'ix_orders_payment_id': ['payment_id'],
+    'ix_orders_user_id_id': ['user_id', 'id'],
+    'ix_orders_status_id': ['status', 'id'],
+    'ix_orders_created_at_id': ['created_at', 'id'],
+}
+
+
+def upgrade():
+    # Здесь и в следующих ревизиях: в базах, созданных через create_all, объекты уже есть
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('orders')}
+    with op.batch_alter_table('orders') as batch_op:
+        for name, columns in INDEXES.items():
+            if name not in existing:
+                batch_op.create_index(name, columns)
+
+
+def downgrade():
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_index('ix_orders_created_at_id')
+        batch_op.drop_index('ix_orders_status_id')
+        batch_op.drop_index('ix_orders_user_id_id')
+        batch_op.drop_index('ix_orders_payment_id')
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""Входящая очередь уведомлений платёжного шлюза
+
+Revision ID: 4d0f6b2c8a35
+Revises: 3c9e5a1b7f24
+Create Date: 2026-10-19 01:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '4d0f6b2c8a35'
+down_revision = '3c9e5a1b7f24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # В базах, созданных через create_all, таблица уже есть
+    if sa.inspect(op.get_bind()).has_table('webhook_events'):
+        return
+    op.create_table(
+        'webhook_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('event_key', sa.String(120), nullable=False, unique=True),
+        sa.Column('event', sa.String(50), nullable=False),
+        sa.Column('payment_id', sa.String(50), nullable=False),
+        sa.Column('payment_status', sa.String(30), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_webhook_events_payment_id', 'webhook_events', ['payment_id'])
+    op.create_index('ix_webhook_events_pending', 'webhook_events', ['processed_at', 'id'])
+
+
+def downgrade():
+    op.drop_table('webhook_events')
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""Нормализованные email и телефон пользователя
+
+Revision ID: 5d9a7e3c1b82
+Revises: c47d0e5b2f18
+Create Date: 2026-10-18 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from website.utils.identity_utils import normalize_email, normalize_phone
+
+
+revision = '5d9a7e3c1b82'
+down_revision = 'c47d0e5b2f18'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    # Колонки с уникальностью уже созданы create_all и заполняются приложением при записи
+    if 'email_norm' in {column['name'] for column in sa.inspect(op.get_bind()).get_columns('users')}:
+        return
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('email_norm', sa.String(120), nullable=True))
+        batch_op.add_column(sa.Column('phone_e164', sa.String(20), nullable=True))
+
+    # Заполнение пачками по id. Если после нормализации значения совпали у нескольких
+    # пользователей, колонка остаётся пустой у всех, кроме первого: такие учётки
+    # входят по логину, пока владелец не исправит email или телефон в профиле
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('email', sa.String),
+                     sa.column('phone', sa.String), sa.column('email_norm', sa.String),
+                     sa.column('phone_e164', sa.String))
+    connection = op.get_bind()
+    seen_emails, seen_phones = set(), set()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(users.c.id, users.c.email, users.c.phone)
+            .where(users.c.id > last_id).order_by(users.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            email, phone = normalize_email(row.email), normalize_phone(row.phone)
+            if email in seen_emails:
+                email = None
+            if phone in seen_phones:
+                phone = None
+            seen_emails.add(email)
+            seen_phones.add(phone)
+            updates.append({"row_id": row.id, "email_norm": email, "phone_e164": phone})
+        connection.execute(
+            users.update().where(users.c.id == sa.bindparam('row_id'))
+            .values(email_norm=sa.bindparam('email_norm'), phone_e164=sa.bindparam('phone_e164')),
+            updates
+        )
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.create_unique_constraint('uq_users_email_norm', ['email_norm'])
+        batch_op.create_unique_constraint('uq_users_phone_e164', ['phone_e164'])
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_constraint('uq_users_phone_e164', type_='unique')
+        batch_op.drop_constraint('uq_users_email_norm', type_='unique')
+        batch_op.drop_column('phone_e164')
+        batch_op.drop_column('email_norm')
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""Снимок позиций заказа
+
+Revision ID: 5e1a7c3d9b46
+Revises: 4d0f6b2c8a35
+Create Date: 2026-10-19 01:40:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '5e1a7c3d9b46'
+down_revision = '4d0f6b2c8a35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # В базах, созданных через create_all, таблица уже есть
+    if sa.inspect(op.get_bind()).has_table('order_items'):
+        return
+    op.create_table(
+        'order_items',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('order_id', sa.Integer(), sa.ForeignKey('orders.id'), nullable=False),
+        sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('product_name', sa.String(100), nullable=False),
+        sa.Column('unit_price', sa.Float(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+    )
+    op.create_index('ix_order_items_order_id', 'order_items', ['order_id'])
+
+
+def downgrade():
+    op.drop_table('order_items')
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""Одна строка cart_items на товар в корзине
+
+Revision ID: 6f2b8d4e0c57
+Revises: 5e1a7c3d9b46
+Create Date: 2026-10-19 01:50:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '6f2b8d4e0c57'
+down_revision = '5e1a7c3d9b46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # В базах, созданных через create_all, индекс уже есть
+    if 'ix_cart_items_user_id_product_id' in {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('cart_items')}:
+        return
+    # Повторные строки одного товара (гонка чтение-разница-запись) удаляются, остаётся первая —
+    # её корзина и показывала, иначе уникальный индекс не создать
+    op.execute("""
+        DELETE FROM cart_items
+        WHERE id NOT IN (SELECT MIN(id) FROM cart_items GROUP BY user_id, product_id)
+    """)
+    op.create_index('ix_cart_items_user_id_product_id', 'cart_items', ['user_id', 'product_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_cart_items_user_id_product_id', table_name='cart_items')
\ No newline at end of file
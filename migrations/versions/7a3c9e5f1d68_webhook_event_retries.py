@@ -0,0 +1,30 @@
+"""Повторный разбор уведомлений о платежах без заказа
+
+Revision ID: 7a3c9e5f1d68
+Revises: 6f2b8d4e0c57
+Create Date: 2026-10-19 02:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '7a3c9e5f1d68'
+down_revision = '6f2b8d4e0c57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # В базах, созданных через create_all, колонки уже есть
+    if 'attempts' in {column['name'] for column in sa.inspect(op.get_bind()).get_columns('webhook_events')}:
+        return
+    with op.batch_alter_table('webhook_events') as batch_op:
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('webhook_events') as batch_op:
+        batch_op.drop_column('next_attempt_at')
+        batch_op.drop_column('attempts')
\ No newline at end of file
@@ -0,0 +1,27 @@
+"""Флаг блокировки пользователя
+
+Revision ID: 8b1e4d2c9a60
+Revises: 3f2a9c1d7b44
+Create Date: 2026-10-18 15:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '8b1e4d2c9a60'
+down_revision = '3f2a9c1d7b44'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'is_blocked' in {column['name'] for column in sa.inspect(op.get_bind()).get_columns('users')}:
+        return
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('is_blocked', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('is_blocked')
\ No newline at end of file
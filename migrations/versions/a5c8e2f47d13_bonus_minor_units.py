@@ -0,0 +1,53 @@
+"""Бонусы в целых копейках
+
+Revision ID: a5c8e2f47d13
+Revises: e81f3a6d9c25
+Create Date: 2026-10-18 20:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'a5c8e2f47d13'
+down_revision = 'e81f3a6d9c25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'bonus_minor' not in {column['name'] for column in inspector.get_columns('users')}:
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column('bonus_minor', sa.BigInteger(), nullable=False, server_default='0'))
+        op.execute("UPDATE users SET bonus_minor = CAST(ROUND(COALESCE(bonus_balance, 0) * 100) AS BIGINT)")
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.drop_column('bonus_balance')
+            batch_op.create_check_constraint('ck_users_bonus_minor_nonnegative', 'bonus_minor >= 0')
+
+    if 'amount_minor' in {column['name'] for column in inspector.get_columns('bonus_transactions')}:
+        return
+    with op.batch_alter_table('bonus_transactions') as batch_op:
+        batch_op.add_column(sa.Column('amount_minor', sa.BigInteger(), nullable=False, server_default='0'))
+    op.execute("UPDATE bonus_transactions SET amount_minor = CAST(ROUND(amount * 100) AS BIGINT)")
+    with op.batch_alter_table('bonus_transactions') as batch_op:
+        batch_op.drop_column('amount')
+        batch_op.alter_column('amount_minor', server_default=None)
+        batch_op.create_index('ix_bonus_transactions_user_id', ['user_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('bonus_transactions') as batch_op:
+        batch_op.drop_index('ix_bonus_transactions_user_id')
+        batch_op.add_column(sa.Column('amount', sa.Float(), nullable=False, server_default='0'))
+    op.execute("UPDATE bonus_transactions SET amount = amount_minor / 100.0")
+    with op.batch_alter_table('bonus_transactions') as batch_op:
+        batch_op.drop_column('amount_minor')
+        batch_op.alter_column('amount', server_default=None)
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_constraint('ck_users_bonus_minor_nonnegative', type_='check')
+        batch_op.add_column(sa.Column('bonus_balance', sa.Float(), nullable=True))
+    op.execute("UPDATE users SET bonus_balance = bonus_minor / 100.0")
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('bonus_minor')
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""Контрольные точки бонусных балансов
+
+Revision ID: b63d1f8e0a74
+Revises: a5c8e2f47d13
+Create Date: 2026-10-18 21:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'b63d1f8e0a74'
+down_revision = 'a5c8e2f47d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('bonus_checkpoints'):
+        op.create_table(
+            'bonus_checkpoints',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('balance_minor', sa.BigInteger(), nullable=False),
+            sa.Column('last_transaction_id', sa.Integer(), nullable=False),
+            sa.Column('checked_at', sa.DateTime(), nullable=False),
+        )
+    existing = {index['name'] for index in inspector.get_indexes('bonus_transactions')}
+    with op.batch_alter_table('bonus_transactions') as batch_op:
+        if 'ix_bonus_transactions_user_id' in existing:
+            batch_op.drop_index('ix_bonus_transactions_user_id')
+        if 'ix_bonus_transactions_user_id_id' not in existing:
+            batch_op.create_index('ix_bonus_transactions_user_id_id', ['user_id', 'id'])
+
+
+def downgrade():
+    with op.batch_alter_table('bonus_transactions') as batch_op:
+        batch_op.drop_index('ix_bonus_transactions_user_id_id')
+        batch_op.create_index('ix_bonus_transactions_user_id', ['user_id'])
+    op.drop_table('bonus_checkpoints')
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""Расширение password_hash под scrypt-хэши
+
+Revision ID: c47d0e5b2f18
+Revises: 8b1e4d2c9a60
+Create Date: 2026-10-18 17:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'c47d0e5b2f18'
+down_revision = '8b1e4d2c9a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name']: column for column in sa.inspect(op.get_bind()).get_columns('users')}
+    if (getattr(columns['password_hash']['type'], 'length', None) or 0) >= 255:
+        return
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(128), type_=sa.String(255),
+                              existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(255), type_=sa.String(128),
+                              existing_nullable=False)
\ No newline at end of file
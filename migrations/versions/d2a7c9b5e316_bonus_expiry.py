@@ -0,0 +1,50 @@
+"""Срок действия бонусов и курсоры фоновых задач
+
+Revision ID: d2a7c9b5e316
+Revises: b63d1f8e0a74
+Create Date: 2026-10-18 22:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'd2a7c9b5e316'
+down_revision = 'b63d1f8e0a74'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'reference_id' not in {column['name'] for column in inspector.get_columns('bonus_transactions')}:
+        with op.batch_alter_table('bonus_transactions') as batch_op:
+            batch_op.add_column(sa.Column('expires_at', sa.DateTime(), nullable=True))
+            batch_op.add_column(sa.Column('remaining_minor', sa.BigInteger(), nullable=True))
+            batch_op.add_column(sa.Column('reference_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_bonus_transactions_reference_id', 'bonus_transactions',
+                                        ['reference_id'], ['id'])
+            batch_op.create_unique_constraint('uq_bonus_transactions_reference_id', ['reference_id'])
+    # Начисления, сделанные до появления сроков, остаются бессрочными
+    if 'ix_bonus_transactions_expiring' not in {index['name'] for index in inspector.get_indexes('bonus_transactions')}:
+        op.create_index('ix_bonus_transactions_expiring', 'bonus_transactions', ['user_id', 'expires_at'],
+                        sqlite_where=sa.text('remaining_minor > 0'), postgresql_where=sa.text('remaining_minor > 0'))
+
+    if not inspector.has_table('job_checkpoints'):
+        op.create_table(
+            'job_checkpoints',
+            sa.Column('name', sa.String(50), primary_key=True),
+            sa.Column('cursor', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table('job_checkpoints')
+    op.drop_index('ix_bonus_transactions_expiring', table_name='bonus_transactions')
+    with op.batch_alter_table('bonus_transactions') as batch_op:
+        batch_op.drop_constraint('uq_bonus_transactions_reference_id', type_='unique')
+        batch_op.drop_constraint('fk_bonus_transactions_reference_id', type_='foreignkey')
+        batch_op.drop_column('reference_id')
+        batch_op.drop_column('remaining_minor')
+        batch_op.drop_column('expires_at')
\ No newline at end of file
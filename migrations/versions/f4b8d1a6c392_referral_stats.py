@@ -0,0 +1,78 @@
+"""Агрегаты реферального дерева
+
+Revision ID: f4b8d1a6c392
+Revises: d2a7c9b5e316
+Create Date: 2026-10-18 23:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'f4b8d1a6c392'
+down_revision = 'd2a7c9b5e316'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Таблица и индексы уже созданы create_all, пересчитывать статистику не нужно
+    if sa.inspect(op.get_bind()).has_table('referral_stats'):
+        return
+    # У пользователя один пригласивший: повторные рёбра, оставшиеся от гонки в add_referral,
+    # удаляются (остаётся первое), иначе уникальный индекс не создать
+    op.execute("""
+        DELETE FROM referrals
+        WHERE id NOT IN (SELECT MIN(id) FROM referrals GROUP BY referred_user_id)
+    """)
+    op.execute("""
+        UPDATE users SET referrer_id = (
+            SELECT referrals.referrer_id FROM referrals WHERE referrals.referred_user_id = users.id
+        )
+        WHERE id IN (SELECT referred_user_id FROM referrals)
+    """)
+    with op.batch_alter_table('referrals') as batch_op:
+        batch_op.create_index('ix_referrals_referrer_id', ['referrer_id'])
+        batch_op.create_index('ix_referrals_referred_user_id', ['referred_user_id'], unique=True)
+    op.create_table(
+        'referral_stats',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('direct_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('levels', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('bonus_earned_minor', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_referral_stats_total_count', 'referral_stats', ['total_count', 'user_id'])
+
+    # Заполнение по существующим рефералам: замыкание дерева одним рекурсивным запросом
+    op.execute("""
+        WITH RECURSIVE closure(ancestor, descendant, depth) AS (
+            SELECT referrer_id, referred_user_id, 1 FROM referrals
+            UNION ALL
+            SELECT closure.ancestor, referrals.referred_user_id, closure.depth + 1
+            FROM closure JOIN referrals ON referrals.referrer_id = closure.descendant
+            WHERE closure.depth < 1000
+        ),
+        bonuses AS (
+            SELECT referrer_id, SUM(CAST(ROUND(bonus_amount * 100) AS BIGINT)) AS bonus_minor
+            FROM referrals GROUP BY referrer_id
+        )
+        INSERT INTO referral_stats (user_id, direct_count, total_count, levels, bonus_earned_minor, updated_at)
+        SELECT closure.ancestor,
+               SUM(CASE WHEN closure.depth = 1 THEN 1 ELSE 0 END),
+               COUNT(*),
+               MAX(closure.depth),
+               MAX(bonuses.bonus_minor),
+               CURRENT_TIMESTAMP
+        FROM closure JOIN bonuses ON bonuses.referrer_id = closure.ancestor
+        GROUP BY closure.ancestor
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_referral_stats_total_count', table_name='referral_stats')
+    op.drop_table('referral_stats')
+    with op.batch_alter_table('referrals') as batch_op:
+        batch_op.drop_index('ix_referrals_referred_user_id')
+        batch_op.drop_index('ix_referrals_referrer_id')
\ No newline at end of file
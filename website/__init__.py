@@ -1,4 +1,4 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_wtf.csrf import CSRFProtect
 from dotenv import load_dotenv
 from website.extensions import db, login_manager, jwt, mail, limiter, cache
@@ -11,7 +11,9 @@ from flask_cors import CORS
 load_dotenv()
 
 
-def create_app(config_name='testing'):
+def create_app(config_name='testing', init_schema=True):
+    # init_schema=False — приложение только для контекста (миграции Alembic): без create_all,
+    # поискового индекса, прогрева блок-листа и фоновых задач, которым нужна готовая схема
     if config_name is None:
         config_name = os.getenv('FLASK_ENV', 'development')
 
@@ -43,6 +45,9 @@ def create_app(config_name='testing'):
         app.config['CACHE_TYPE'] = 'RedisCache'
         app.config['CACHE_REDIS_HOST'] = redis_host
         app.config['CACHE_REDIS_PORT'] = redis_port
+        # Лимиты запросов — в том же Redis, если хранилище не задано явно
+        if not os.getenv('RATELIMIT_STORAGE_URI'):
+            app.config['RATELIMIT_STORAGE_URI'] = f"redis://{redis_host}:{redis_port}"
     else:
         app.config['CACHE_TYPE'] = 'SimpleCache'
 
@@ -55,8 +60,17 @@ def create_app(config_name='testing'):
     cache.init_app(app)
     CSRFProtect(app)
 
-    with app.app_context():
-        db.create_all()
+    from website.services.product_cache import init_product_cache
+    from website.services.search_service import SearchService
+    from website.services.token_blocklist import get_token_blocklist
+
+    init_product_cache(app)
+
+    if init_schema:
+        with app.app_context():
+            db.create_all()
+            SearchService.ensure_index()
+            get_token_blocklist()  # Отзывы загружаются при старте, а не в первом запросе
 
     if not app.debug:
         if not os.path.exists('logs'):
@@ -74,11 +88,58 @@ def create_app(config_name='testing'):
     from website.blueprints.admin import admin_bp
     from website.blueprints.cart import cart_bp
     from website.blueprints.order import order_bp
+    from website.blueprints.catalog import catalog_bp
 
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(profile_bp, url_prefix='/profile')
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(cart_bp, url_prefix='/cart')
     app.register_blueprint(order_bp, url_prefix='/order')
+    app.register_blueprint(catalog_bp, url_prefix='/catalog')
+
+    from website.services.password_service import PasswordBusyError
+
+    @app.errorhandler(429)
+    def rate_limited(error):
+        # Retry-After и X-RateLimit-* добавляет Flask-Limiter
+        return jsonify({"error": "Слишком много запросов, повторите попытку позже"}), 429
+
+    @app.errorhandler(PasswordBusyError)
+    def password_pool_busy(error):
+        # Пул хэширования переполнен — клиенту лучше повторить позже, чем ждать в очереди
+        return jsonify({"error": "Сервер перегружен, повторите попытку позже"}), 503, {"Retry-After": "1"}
+
+    from website.services.cart_store import init_cart_store, RedisCartStore
+
+    cart_store = init_cart_store(app)
+
+    if not init_schema:
+        return app
+
+    # Фоновые задачи
+    from website.utils.background import start_periodic
+    from website.services.inventory_service import InventoryService
+    from website.services.webhook_service import WebhookService
+    from website.services.bonus_audit import BonusAuditService
+    from website.services.bonus_expiry import BonusExpiryService
+    from website.services.referral_clicks import ReferralClickService
+
+    if app.config.get('INVENTORY_SWEEP_INTERVAL'):
+        start_periodic(app, 'inventory-sweep', app.config['INVENTORY_SWEEP_INTERVAL'],
+                       InventoryService.release_expired)
+    if isinstance(cart_store, RedisCartStore) and app.config.get('CART_FLUSH_INTERVAL'):
+        start_periodic(app, 'cart-flush', app.config['CART_FLUSH_INTERVAL'], cart_store.flush)
+    if app.config.get('WEBHOOK_DRAIN_INTERVAL'):
+        start_periodic(app, 'webhook-drain', app.config['WEBHOOK_DRAIN_INTERVAL'], WebhookService.drain)
+    if app.config.get('TOKEN_BLOCKLIST_SYNC_INTERVAL'):
+        start_periodic(app, 'token-blocklist-sync', app.config['TOKEN_BLOCKLIST_SYNC_INTERVAL'],
+                       lambda: get_token_blocklist().sync())
+    if app.config.get('BONUS_AUDIT_INTERVAL'):
+        start_periodic(app, 'bonus-audit', app.config['BONUS_AUDIT_INTERVAL'], BonusAuditService.run_scheduled)
+    if app.config.get('BONUS_EXPIRY_SWEEP_INTERVAL'):
+        start_periodic(app, 'bonus-expiry', app.config['BONUS_EXPIRY_SWEEP_INTERVAL'], BonusExpiryService.sweep)
+    if app.config.get('REFERRAL_CLICK_FLUSH_INTERVAL'):
+        start_periodic(app, 'referral-click-flush', app.config['REFERRAL_CLICK_FLUSH_INTERVAL'],
+                       ReferralClickService.flush)
 
     return app
\ No newline at end of file
@@ -1,8 +1,18 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import get_jwt_identity
 from werkzeug.security import generate_password_hash
+from sqlalchemy import func
 from website.models import User, Product, Order, Log
 from website.extensions import db
+from website.services.search_service import SearchService
+from website.services.product_cache import ProductCache, stats as cache_stats
+from website.services.product_io_service import ProductIOService, EXPORT_FIELDS
+from website.services.order_service import OrderService, ADMIN_ORDER_FIELDS, parse_order_filters
+from website.services.bonus_audit import BonusAuditService
+from website.services.referral_service import ReferralService
+from website.utils.auth_utils import require_role, invalidate_principal
+from website.utils.http_utils import conditional_json
+from website.utils.stream_utils import detect_format, stream_rows, read_csv, read_ndjson
 from werkzeug.utils import secure_filename
 import os
 from datetime import datetime
@@ -12,51 +22,42 @@ admin_bp = Blueprint('admin', __name__)
 
 
 @admin_bp.route('/users', methods=['GET'])
-@jwt_required()
+@require_role('admin')
 def get_users():
-    user_id = get_jwt_identity()
-    admin = User.query.get(user_id)
-    if not admin or admin.role != 'admin':
-        return jsonify({"error": "Недостаточно прав"}), 403
+    version = db.session.query(func.count(User.id), func.max(User.updated_at)).one()
 
-    users = User.query.all()
-    users_list = [{
-        "id": user.id,
-        "login": user.login,
-        "email": user.email,
-        "phone": user.phone,
-        "role": user.role,
-        "is_blocked": user.is_blocked
-    } for user in users]
+    def build():
+        users = User.query.all()
+        users_list = [{
+            "id": user.id,
+            "login": user.login,
+            "email": user.email,
+            "phone": user.phone,
+            "role": user.role,
+            "is_blocked": user.is_blocked
+        } for user in users]
+        return {"users": users_list}
 
-    return jsonify({"users": users_list}), 200
+    return conditional_json(version, build)
 
 
 @admin_bp.route('/users/<int:user_id>/block', methods=['POST'])
-@jwt_required()
+@require_role('admin')
 def block_user(user_id):
     admin_id = get_jwt_identity()
-    admin = User.query.get(admin_id)
-    if not admin or admin.role != 'admin':
-        return jsonify({"error": "Недостаточно прав"}), 403
-
     user = User.query.get_or_404(user_id)
     user.is_blocked = True
     db.session.commit()
+    invalidate_principal(user.id)
 
     log_action(admin_id, f"Заблокирован пользователь {user.id} ({user.login})")
     return jsonify({"message": f"Пользователь {user.login} заблокирован"}), 200
 
 
 @admin_bp.route('/users/<int:user_id>/role', methods=['PUT'])
-@jwt_required()
+@require_role('admin')
 def change_user_role(user_id):
-
     admin_id = get_jwt_identity()
-    admin = User.query.get(admin_id)
-    if not admin or admin.role != 'admin':
-        return jsonify({"error": "Недостаточно прав"}), 403
-
     user = User.query.get_or_404(user_id)
     data = request.json
     if 'role' not in data:
@@ -64,39 +65,34 @@ def change_user_role(user_id):
 
     user.role = data['role']
     db.session.commit()
+    invalidate_principal(user.id)
     log_action(admin_id, f"Изменена роль пользователя {user.id} ({user.login}) на {user.role}")
     return jsonify({"message": f"Роль пользователя {user.login} изменена на {user.role}"}), 200
 
 
 @admin_bp.route('/products', methods=['GET'])
-@jwt_required()
+@require_role('admin')
 def get_products():
-    admin_id = get_jwt_identity()
-    admin = User.query.get(admin_id)
-    if not admin or admin.role != 'admin':
-        return jsonify({"error": "Недостаточно прав"}), 403
-
-    products = Product.query.all()
-    products_list = [{
-        "id": product.id,
-        "name": product.name,
-        "price": product.price,
-        "description": product.description,
-        "stock": product.stock,
-        "image_url": product.image_url
-    } for product in products]
-
-    return jsonify({"products": products_list}), 200
+    version = db.session.query(func.count(Product.id), func.max(Product.updated_at)).one()
+
+    def build():
+        products = Product.query.all()
+        products_list = [{
+            "id": product.id,
+            "name": product.name,
+            "price": product.price,
+            "description": product.description,
+            "stock": product.stock,
+            "image_url": product.image_url
+        } for product in products]
+        return {"products": products_list}
+
+    return conditional_json(version, build)
 
 @admin_bp.route('/products', methods=['POST'])
-@jwt_required()
+@require_role('admin')
 def add_product():
-
     admin_id = get_jwt_identity()
-    admin = User.query.get(admin_id)
-    if not admin or admin.role != 'admin':
-        return jsonify({"error": "Недостаточно прав"}), 403
-
     data = request.json
     if not data or 'name' not in data or 'price' not in data:
         return jsonify({"error": "Необходимо указать название и цену товара"}), 400
@@ -109,22 +105,47 @@ def add_product():
         image_url=data.get('image_url', '')
     )
     db.session.add(product)
+    db.session.flush()
+    SearchService.reindex([product.id])
     db.session.commit()
+    ProductCache.invalidate([product.id], catalog=True)
 
     # Логируем действие
     log_action(admin_id, f"Добавлен товар {product.id} ({product.name})")
 
     return jsonify({"message": "Товар успешно добавлен", "product_id": product.id}), 201
 
-@admin_bp.route('/products/<int:product_id>', methods=['PUT'])
-@jwt_required()
-def update_product(product_id):
+@admin_bp.route('/products/export', methods=['GET'])
+@require_role('admin')
+def export_products():
+    fmt = detect_format(request.args.get('format', 'ndjson'))
+    if not fmt:
+        return jsonify({"error": "Поддерживаются форматы csv и ndjson"}), 400
+
+    return stream_rows(ProductIOService.export_rows(), fmt, EXPORT_FIELDS, 'products')
+
 
+@admin_bp.route('/products/import', methods=['POST'])
+@require_role('admin')
+def import_products():
     admin_id = get_jwt_identity()
-    admin = User.query.get(admin_id)
-    if not admin or admin.role != 'admin':
-        return jsonify({"error": "Недостаточно прав"}), 403
+    fmt = detect_format(request.args.get('format'), request.content_type)
+    if not fmt:
+        return jsonify({"error": "Поддерживаются форматы csv и ndjson"}), 400
 
+    reader = read_csv if fmt == 'csv' else read_ndjson
+    report = ProductIOService.import_rows(reader(request.stream))
+
+    # Одна запись в журнал на весь импорт, а не на каждый товар
+    log_action(admin_id, f"Импорт товаров: создано {report.created}, обновлено {report.updated}, "
+                         f"ошибок {report.failed}")
+    return jsonify(report.to_dict()), 200
+
+
+@admin_bp.route('/products/<int:product_id>', methods=['PUT'])
+@require_role('admin')
+def update_product(product_id):
+    admin_id = get_jwt_identity()
     product = Product.query.get_or_404(product_id)
     data = request.json
 
@@ -139,22 +160,22 @@ def update_product(product_id):
     if 'image_url' in data:
         product.image_url = data['image_url']
 
+    SearchService.reindex([product.id])
     db.session.commit()
+    ProductCache.invalidate([product.id], catalog=True)
     log_action(admin_id, f"Обновлен товар {product.id} ({product.name})")
 
     return jsonify({"message": "Товар успешно обновлён", "product_id": product.id}), 200
 
 @admin_bp.route('/products/<int:product_id>', methods=['DELETE'])
-@jwt_required()
+@require_role('admin')
 def delete_product(product_id):
     admin_id = get_jwt_identity()
-    admin = User.query.get(admin_id)
-    if not admin or admin.role != 'admin':
-        return jsonify({"error": "Недостаточно прав"}), 403
-
     product = Product.query.get_or_404(product_id)
+    SearchService.remove([product.id])
     db.session.delete(product)
     db.session.commit()
+    ProductCache.invalidate([product.id], catalog=True)
 
     # Логируем действие
     log_action(admin_id, f"Удален товар {product.id} ({product.name})")
@@ -162,34 +183,48 @@ def delete_product(product_id):
     return jsonify({"message": "Товар успешно удалён", "product_id": product.id}), 200
 
 
+@admin_bp.route('/cache/stats', methods=['GET'])
+@require_role('admin')
+def get_cache_stats():
+    return jsonify({"cache": cache_stats.snapshot()}), 200
+
+
 @admin_bp.route('/orders', methods=['GET'])
-@jwt_required()
+@require_role('admin')
 def get_orders():
-    admin_id = get_jwt_identity()
-    admin = User.query.get(admin_id)
-    if not admin or admin.role != 'admin':
-        return jsonify({"error": "Недостаточно прав"}), 403
+    filters, error = parse_order_filters(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    page, error = OrderService.admin_list_orders(
+        filters,
+        limit=request.args.get('limit', type=int),
+        cursor=request.args.get('cursor')
+    )
+    if error:
+        return jsonify({"error": error}), 400
+
+    return jsonify(page), 200
+
+
+@admin_bp.route('/orders/export', methods=['GET'])
+@require_role('admin')
+def export_orders():
+    fmt = detect_format(request.args.get('format', 'ndjson'))
+    if not fmt:
+        return jsonify({"error": "Поддерживаются форматы csv и ndjson"}), 400
 
-    orders = Order.query.all()
-    orders_list = [{
-        "id": order.id,
-        "user_id": order.user_id,
-        "total_amount": order.total_amount,
-        "status": order.status,
-        "created_at": order.created_at.isoformat()
-    } for order in orders]
+    filters, error = parse_order_filters(request.args)
+    if error:
+        return jsonify({"error": error}), 400
 
-    return jsonify({"orders": orders_list}), 200
+    return stream_rows(OrderService.export_orders(filters), fmt, ADMIN_ORDER_FIELDS, 'orders')
 
 
 @admin_bp.route('/orders/<int:order_id>/status', methods=['PUT'])
-@jwt_required()
+@require_role('admin')
 def update_order_status(order_id):
     admin_id = get_jwt_identity()
-    admin = User.query.get(admin_id)
-    if not admin or admin.role != 'admin':
-        return jsonify({"error": "Недостаточно прав"}), 403
-
     order = Order.query.get_or_404(order_id)
     data = request.json
     if 'status' not in data:
@@ -204,6 +239,48 @@ def update_order_status(order_id):
     return jsonify({"message": f"Статус заказа {order.id} обновлен на {order.status}"}), 200
 
 
+@admin_bp.route('/bonus/reconcile', methods=['POST'])
+@require_role('admin')
+def reconcile_bonuses():
+    admin_id = get_jwt_identity()
+    repair = request.args.get('repair', '0') in ('1', 'true')
+    report, error = BonusAuditService.reconcile(repair=repair)
+    if error:
+        return jsonify({"error": error}), 400
+
+    if report["repaired"]:
+        log_action(admin_id, f"Исправлены бонусные балансы: {report['repaired']} пользователей")
+    return jsonify(report), 200
+
+
+@admin_bp.route('/referrals/top', methods=['GET'])
+@require_role('admin')
+def top_referrers():
+    return jsonify({"items": ReferralService.top(limit=request.args.get('limit', 50, type=int))}), 200
+
+
+@admin_bp.route('/referrals/<int:user_id>', methods=['GET'])
+@require_role('admin')
+def referral_tree(user_id):
+    return jsonify({
+        "stats": ReferralService.get_stats(user_id),
+        "tree": ReferralService.subtree(user_id, depth=request.args.get('depth', 3, type=int),
+                                        limit=request.args.get('limit', 1000, type=int))
+    }), 200
+
+
+@admin_bp.route('/referrals/rebuild', methods=['POST'])
+@require_role('admin')
+def rebuild_referral_stats():
+    admin_id = get_jwt_identity()
+    report, error = ReferralService.rebuild_stats()
+    if error:
+        return jsonify({"error": error}), 400
+
+    log_action(admin_id, f"Пересчитана реферальная статистика: {report['users']} пользователей")
+    return jsonify(report), 200
+
+
 def log_action(admin_id, action):
     log = Log(admin_id=admin_id, action=action, timestamp=datetime.utcnow())
     db.session.add(log)
@@ -211,13 +288,9 @@ def log_action(admin_id, action):
 
 
 @admin_bp.route('/logs', methods=['GET'])
-@jwt_required()
+@require_role('admin')
 def get_logs():
     admin_id = get_jwt_identity()
-    admin = User.query.get(admin_id)
-    if not admin or admin.role != 'admin':
-        return jsonify({"error": "Недостаточно прав"}), 403
-
     logs = Log.query.all()
     logs_list = [{
         "id": log.id,
@@ -1,11 +1,16 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token
 from website import db
 from website.forms import RegistrationForm, LoginForm, ForgotPasswordForm, ResetPasswordForm
 from website.services.auth_service import AuthService
 from flask_cors import CORS
+from flask_jwt_extended import jwt_required, get_jwt
 from flask import Flask
-from website.models import User
+from website.utils.auth_utils import issue_access_token
+from website.services.token_blocklist import revoke_token
+from website.services.referral_clicks import ReferralClickService
+from website.services.referral_service import ReferralService
+from website.extensions import limiter
+from website.utils.rate_limit import limit_from_config
 from website.utils.email_utils import send_password_reset_email
 
 # Создаем Blueprint для аутентификации
@@ -15,6 +20,7 @@ CORS(app)
 
 
 @auth_bp.route('/register', methods=['POST'])
+@limiter.limit(limit_from_config('RATELIMIT_REGISTER'))
 def register():
     data = request.json
     form = RegistrationForm(data=data)
@@ -33,11 +39,17 @@ def register():
     if error:
         return jsonify({"error": error}), 400
 
-    access_token = create_access_token(identity=str(user.id))  # Преобразуем id в строку
+    # Регистрация по реферальной ссылке (/register?ref=<код>); неизвестный код регистрации не мешает
+    referral_code = request.args.get('ref') or (data or {}).get('ref')
+    if referral_code:
+        ReferralService.add_referral_by_code(str(referral_code), user.id)
+
+    access_token = issue_access_token(user)
     return jsonify({"message": "Регистрация успешна", "access_token": access_token}), 201
 
 
 @auth_bp.route('/login', methods=['POST'])
+@limiter.limit(limit_from_config('RATELIMIT_LOGIN'))
 def login():
     data = request.json
 
@@ -45,17 +57,14 @@ def login():
     if not data or not data.get('password'):
         return jsonify({"error": "Необходимо указать пароль и один из параметров: login, email или phone"}), 400
 
-    user = None
-    if data.get('login'):
-        user = User.query.filter_by(login=data.get('login')).first()
-    elif data.get('email'):
-        user = User.query.filter_by(email=data.get('email')).first()
-    elif data.get('phone'):
-        user = User.query.filter_by(phone=data.get('phone')).first()
-    else:
+    identifier = data.get('login') or data.get('email') or data.get('phone')
+    if not identifier:
         return jsonify({"error": "Необходимо указать login, email или phone"}), 400
-    if user and user.check_password(data.get('password')):
-        access_token = create_access_token(identity=str(user.id))
+    user = AuthService.find_user(identifier)
+    if user and AuthService.verify_password(user, data.get('password')):
+        if user.is_blocked:
+            return jsonify({"error": "Пользователь заблокирован"}), 403
+        access_token = issue_access_token(user)
         return jsonify({
             "message": "Вход успешен",
             "access_token": access_token,
@@ -75,7 +84,7 @@ def forgot_password():
     if not form.validate():
         return jsonify({"errors": form.errors}), 400
 
-    user = User.query.filter_by(email=form.email.data).first()
+    user = AuthService.find_by_email(form.email.data)
     if not user:
         return jsonify({"error": "Пользователь не найден"}), 404
 
@@ -90,7 +99,7 @@ def reset_password():
     if not form.validate():
         return jsonify({"errors": form.errors}), 400
 
-    user = User.query.filter_by(email=form.email.data).first()
+    user = AuthService.find_by_email(form.email.data)
     if not user:
         return jsonify({"error": "Пользователь не найден"}), 404
 
@@ -102,5 +111,17 @@ def reset_password():
     return jsonify({"message": "Пароль успешно изменен"}), 200
 
 @auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
 def logout():
-    return jsonify({"message": "Выход выполнен, токен больше не используйте"}), 200
\ No newline at end of file
+    revoke_token(get_jwt())
+    return jsonify({"message": "Выход выполнен, токен отозван"}), 200
+
+
+@auth_bp.route('/ref/<referral_code>/click', methods=['POST'])
+@limiter.limit(limit_from_config('RATELIMIT_REFERRAL_CLICK'))
+def referral_click(referral_code):
+    # Переход по реферальной ссылке: только счётчик в памяти, в БД — пачкой по таймеру
+    _, error = ReferralClickService.track(referral_code)
+    if error:
+        return jsonify({"error": error}), 400
+    return jsonify({"message": "Переход учтён"}), 202
\ No newline at end of file
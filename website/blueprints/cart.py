@@ -1,9 +1,12 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from website.models import CartItem, Product
-from website.extensions import db
+from website.services.cart_service import CartService
+from website.utils.http_utils import conditional_json
+from website.extensions import limiter
+from website.utils.rate_limit import limit_from_config
 
 cart_bp = Blueprint('cart', __name__)
+limiter.limit(limit_from_config('RATELIMIT_CART'))(cart_bp)
 
 @cart_bp.route('/add', methods=['POST'])
 @jwt_required()
@@ -20,32 +23,39 @@ def add_to_cart():
     if not isinstance(quantity, int) or quantity < 1:
         return jsonify({"error": "Количество должно быть положительным числом"}), 400
 
-    product = Product.query.get(product_id)
-    if not product:
-        return jsonify({"error": "Товар не найден"}), 404
+    _, error = CartService.add_item(user_id, product_id, quantity)
+    if error:
+        return jsonify({"error": error}), 404
 
-    cart_item = CartItem.query.filter_by(user_id=user_id, product_id=product_id).first()
-    if cart_item:
-        cart_item.quantity += quantity
-    else:
-        cart_item = CartItem(user_id=user_id, product_id=product_id, quantity=quantity)
-        db.session.add(cart_item)
-
-    db.session.commit()
     return jsonify({"message": "Товар добавлен в корзину"}), 201
 
 
+@cart_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch_cart():
+    user_id = get_jwt_identity()
+    data = request.json
+
+    if not data or 'operations' not in data:
+        return jsonify({"error": "Необходимо указать operations"}), 400
+
+    results, error = CartService.apply_batch(user_id, data['operations'])
+    if error:
+        return jsonify({"error": error}), 400
+
+    applied = sum(1 for result in results if result['status'] == 'ok')
+    return jsonify({"results": results, "applied": applied, "failed": len(results) - applied}), 200
+
+
 @cart_bp.route('/remove/<int:product_id>', methods=['DELETE'])
 @jwt_required()
 def remove_from_cart(product_id):
     user_id = get_jwt_identity()
-    cart_item = CartItem.query.filter_by(user_id=user_id, product_id=product_id).first()
+    _, error = CartService.remove_item(user_id, product_id)
 
-    if not cart_item:
-        return jsonify({"error": "Товар не найден в корзине"}), 404
+    if error:
+        return jsonify({"error": error}), 404
 
-    db.session.delete(cart_item)
-    db.session.commit()
     return jsonify({"message": "Товар удален из корзины"}), 200
 
 
@@ -62,12 +72,10 @@ def update_cart(product_id):
     if not isinstance(quantity, int) or quantity < 1:
         return jsonify({"error": "Количество должно быть положительным числом"}), 400
 
-    cart_item = CartItem.query.filter_by(user_id=user_id, product_id=product_id).first()
-    if not cart_item:
-        return jsonify({"error": "Товар не найден в корзине"}), 404
+    _, error = CartService.update_item(user_id, product_id, quantity)
+    if error:
+        return jsonify({"error": error}), 404
 
-    cart_item.quantity = quantity
-    db.session.commit()
     return jsonify({"message": "Количество товара обновлено"}), 200
 
 
@@ -75,29 +83,17 @@ def update_cart(product_id):
 @jwt_required()
 def view_cart():
     user_id = get_jwt_identity()
-    cart_items = CartItem.query.filter_by(user_id=user_id).all()
-
-    cart_data = []
-    total_amount = 0
 
-    for item in cart_items:
-        product = Product.query.get(item.product_id)
-        cart_data.append({
-            "product_id": product.id,
-            "name": product.name,
-            "price": product.price,
-            "quantity": item.quantity,
-            "total": product.price * item.quantity
-        })
-        total_amount += product.price * item.quantity
+    def build():
+        cart_data, total_amount = CartService.view_cart(user_id)
+        return {"cart": cart_data, "total_amount": total_amount}
 
-    return jsonify({"cart": cart_data, "total_amount": total_amount}), 200
+    return conditional_json([user_id, *CartService.cart_version(user_id)], build)
 
 
 @cart_bp.route('/clear', methods=['DELETE'])
 @jwt_required()
 def clear_cart():
     user_id = get_jwt_identity()
-    CartItem.query.filter_by(user_id=user_id).delete()
-    db.session.commit()
+    CartService.clear(user_id)
     return jsonify({"message": "Корзина очищена"}), 200
\ No newline at end of file
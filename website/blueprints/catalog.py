@@ -0,0 +1,50 @@
+from flask import Blueprint, jsonify, request
+from website.services.catalog_service import CatalogService
+from website.services.product_cache import ProductCache
+from website.services.search_service import SearchService
+from website.utils.http_utils import conditional_json
+
+catalog_bp = Blueprint('catalog', __name__)
+
+
+@catalog_bp.route('/products', methods=['GET'])
+def list_products():
+    args = request.args
+    params = {
+        "limit": args.get('limit', type=int),
+        "cursor": args.get('cursor'),
+        "sort": args.get('sort', 'id'),
+        "order": args.get('order', 'asc'),
+        "min_price": args.get('min_price', type=float),
+        "max_price": args.get('max_price', type=float),
+        "in_stock": args.get('in_stock', '').lower() in ('1', 'true', 'yes')
+    }
+    page, error = ProductCache.get_catalog_page(params, lambda: CatalogService.list_products(**params))
+    if error:
+        return jsonify({"error": error}), 400
+
+    generations = ProductCache.generations(product['id'] for product in page['products'])
+    return conditional_json([ProductCache.generation(), generations], lambda: page, cache_control='public, no-cache')
+
+
+@catalog_bp.route('/products/<int:product_id>', methods=['GET'])
+def get_product(product_id):
+    product = ProductCache.get_product(product_id)
+    if not product:
+        return jsonify({"error": "Товар не найден"}), 404
+
+    return conditional_json([ProductCache.generations([product_id])], lambda: product, cache_control='public, no-cache')
+
+
+@catalog_bp.route('/search', methods=['GET'])
+def search_products():
+    args = request.args
+    results, error = SearchService.search(
+        args.get('q', ''),
+        page=args.get('page', 1, type=int),
+        limit=args.get('limit', type=int)
+    )
+    if error:
+        return jsonify({"error": error}), 400
+
+    return jsonify(results), 200
\ No newline at end of file
@@ -1,36 +1,28 @@
-import os
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from website.models import Order, CartItem
+from website.models import Order
 from website.extensions import db
-import requests
+from website.services.order_service import OrderService
+from website.services.payment_client import get_payment_client, confirmation_url, CircuitOpenError, PaymentError
+from website.services.webhook_service import WebhookService
 from datetime import datetime
 
 order_bp = Blueprint('order', __name__)
 
-YOOKASSA_SHOP_ID = os.getenv('YOOKASSA_SHOP_ID')
-YOOKASSA_SECRET_KEY = os.getenv('YOOKASSA_SECRET_KEY')
-YOOKASSA_API_URL = 'https://api.yookassa.ru/v3/payments'
-
 @order_bp.route('/create', methods=['POST'])
 @jwt_required()
 def create_order():
     user_id = get_jwt_identity()
-    cart_items = CartItem.query.filter_by(user_id=user_id).all()
-
-    if not cart_items:
-        return jsonify({"error": "Корзина пуста"}), 400
-
-    total_amount = sum(item.product.price * item.quantity for item in cart_items)
-    order = Order(user_id=user_id, total_amount=total_amount)
 
     try:
-        db.session.add(order)
-        db.session.commit()
-    except Exception as e:
+        order, error = OrderService.create_order(user_id)
+    except Exception:
         db.session.rollback()
         return jsonify({"error": "Ошибка при создании заказа"}), 500
 
+    if error:
+        return jsonify({"error": error}), 400
+
     return jsonify({"message": "Заказ создан", "order_id": order.id}), 201
 
 
@@ -40,6 +32,9 @@ def generate_payment_link(order_id):
     order = Order.query.get_or_404(order_id)
     if order.status == "Оплачен":
         return jsonify({"error": "Заказ уже оплачен"}), 400
+    if order.status != 'pending':
+        # Отменённый очисткой заказ уже вернул товар на склад — платить за него нельзя
+        return jsonify({"error": "Заказ недоступен для оплаты"}), 400
 
     payment_data = {
         "amount": {"value": str(order.total_amount), "currency": "RUB"},
@@ -47,28 +42,33 @@ def generate_payment_link(order_id):
         "description": f"Оплата заказа #{order.id}"
     }
 
-    auth = (YOOKASSA_SHOP_ID, YOOKASSA_SECRET_KEY)
-    response = requests.post(YOOKASSA_API_URL, json=payment_data, auth=auth)
-
-    if response.status_code == 200:
-        payment_info = response.json()
-        order.payment_id = payment_info['id']
-        order.payment_link = payment_info['confirmation']['confirmation_url']
-        db.session.commit()
-        return jsonify({"payment_link": order.payment_link}), 200
-
-    return jsonify({"error": "Не удалось создать ссылку на оплату"}), 500
+    # Ключ привязан к заказу, сумме и предыдущему платежу: повторное нажатие вернёт тот же
+    # платёж, а после отмены предыдущего (истёк, отклонён) будет создан новый
+    client = get_payment_client()
+    try:
+        if order.payment_id and order.payment_link:
+            if client.get_payment(order.payment_id).get('status') != 'canceled':
+                return jsonify({"payment_link": order.payment_link}), 200
+        idempotence_key = f"order-{order.id}-{order.total_amount}-{order.payment_id or 'first'}"
+        payment_info = client.create_payment(payment_data, idempotence_key)
+        payment_link = confirmation_url(payment_info)
+    except CircuitOpenError as e:
+        return jsonify({"error": str(e)}), 503
+    except PaymentError:
+        return jsonify({"error": "Не удалось создать ссылку на оплату"}), 502
+
+    order.payment_id = payment_info['id']
+    order.payment_link = payment_link
+    db.session.commit()
+    return jsonify({"payment_link": order.payment_link}), 200
 
 
 @order_bp.route('/yookassa_webhook', methods=['POST'])
 def yookassa_webhook():
-    data = request.json
-    payment_id = data['object']['id']
-    order = Order.query.filter_by(payment_id=payment_id).first()
-
-    if order and data['object']['status'] == 'succeeded':
-        order.status = "Оплачен"
-        db.session.commit()
-        return jsonify({"status": "ok"}), 200
+    # Событие только записывается во входящую очередь; заказ обновит фоновый разбор.
+    # Повторы того же события от шлюза подтверждаются, но второй раз не сохраняются
+    _, error = WebhookService.enqueue(request.get_json(silent=True))
+    if error:
+        return jsonify({"error": error}), 400
 
-    return jsonify({"error": "Неверные данные"}), 400
\ No newline at end of file
+    return jsonify({"status": "ok"}), 200
\ No newline at end of file
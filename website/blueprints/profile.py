@@ -1,10 +1,16 @@
 from flask import Blueprint, jsonify, request, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from itsdangerous import URLSafeTimedSerializer
-from website.models import User, Order
+from website.models import User
 from website import db
 from website.forms import UpdateProfileForm
+from website.services.auth_service import AuthService
 from website.utils.email_utils import send_password_reset_email
+from website.services.order_service import OrderService
+from website.services.referral_service import ReferralService
+from website.services.referral_clicks import ReferralClickService
+from website.utils.auth_utils import issue_access_token
+from website.utils.http_utils import conditional_json
 
 profile_bp = Blueprint('profile', __name__)
 
@@ -18,14 +24,14 @@ def view_profile():
     if not user:
         return jsonify({'error': 'Пользователь не найден'}), 404
 
-    return jsonify({
+    return conditional_json([user.id, user.updated_at], lambda: {
         "user_id": user.id,
         "email": user.email,
         "login": user.login,
         "phone": user.phone,
         "bonus_balance": user.bonus_balance,
         "referral_link": user.get_referral_link()
-    }), 200
+    }, last_modified=user.updated_at)
 
 
 @profile_bp.route('/profile/update', methods=['POST'])
@@ -43,11 +49,10 @@ def update_profile():
     if not form.validate():
         return jsonify({'errors': form.errors}), 400
 
-    if form.email.data != user.email and User.query.filter_by(email=form.email.data).first():
-        return jsonify({'error': 'Email уже используется'}), 400
-
-    if form.login.data != user.login and User.query.filter_by(login=form.login.data).first():
-        return jsonify({'error': 'Логин уже используется'}), 400
+    error = (AuthService.validate_login(form.login.data)
+             or AuthService.find_conflicts(form.login.data, form.email.data, form.phone.data, exclude_id=user.id))
+    if error:
+        return jsonify({'error': error}), 400
 
     user.email = form.email.data
     user.login = form.login.data
@@ -57,7 +62,8 @@ def update_profile():
         user.set_password(form.password.data)
 
     db.session.commit()
-    new_token = create_access_token(identity=user.id)
+    AuthService.forget_misses()
+    new_token = issue_access_token(user)
 
     return jsonify({'message': 'Профиль успешно обновлён', 'new_token': new_token})
 
@@ -69,7 +75,7 @@ def reset_password():
     if not email:
         return jsonify({"error": "Укажите email"}), 400
 
-    user = User.query.filter_by(email=email).first()
+    user = AuthService.find_by_email(email)
     if not user:
         return jsonify({"error": "Пользователь с таким email не найден"}), 404
 
@@ -99,7 +105,7 @@ def reset_password_confirm():
     except:
         return jsonify({"error": "Неверный или просроченный токен"}), 400
 
-    user = User.query.filter_by(email=email).first()
+    user = AuthService.find_by_email(email)
     if not user:
         return jsonify({"error": "Пользователь не найден"}), 404
 
@@ -113,18 +119,23 @@ def reset_password_confirm():
 @jwt_required()
 def order_history():
     user_id = get_jwt_identity()
-    orders = Order.query.filter_by(user_id=user_id).all()
-
-    orders_data = [
-        {
-            'order_id': order.id,
-            'product_name': order.product_name,
-            'quantity': order.quantity,
-            'total_price': order.total_price,
-            'status': order.status,
-            'created_at': order.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
-        for order in orders
-    ]
-
-    return jsonify({'orders': orders_data})
\ No newline at end of file
+    page, error = OrderService.list_orders(
+        user_id,
+        limit=request.args.get('limit', type=int),
+        cursor=request.args.get('cursor')
+    )
+    if error:
+        return jsonify({"error": error}), 400
+
+    return jsonify(page), 200
+
+@profile_bp.route('/referrals', methods=['GET'])
+@jwt_required()
+def referral_stats():
+    # Агрегаты читаются из referral_stats, список — только первый уровень с ограничением
+    user_id = int(get_jwt_identity())
+    return jsonify({
+        "stats": ReferralService.get_stats(user_id),
+        "direct": ReferralService.subtree(user_id, depth=1, limit=request.args.get('limit', 50, type=int)),
+        "clicks": ReferralClickService.clicks_for_user(user_id)
+    }), 200
\ No newline at end of file
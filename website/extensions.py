@@ -5,11 +5,12 @@ from flask_mail import Mail
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_caching import Cache
+from website.utils.rate_limit import WindowMemoryStorage  # Регистрирует схему window-memory://
 
 
 db = SQLAlchemy()
 login_manager = LoginManager()
 jwt = JWTManager()
 mail = Mail()
-limiter = Limiter(key_func=get_remote_address, storage_uri="redis://localhost:6379")  # Ограничение запросов
+limiter = Limiter(key_func=get_remote_address)  # Ограничение запросов; хранилище и стратегия — RATELIMIT_* в config.py
 cache = Cache()
\ No newline at end of file
@@ -2,17 +2,16 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, DecimalField, IntegerField, TextAreaField, URLField, SubmitField, BooleanField, validators
 from wtforms.validators import DataRequired, Email, Length, EqualTo, NumberRange, Optional, ValidationError, Regexp
 from website.models import User
-import phonenumbers
+from website.utils.identity_utils import normalize_email, phone_to_e164
 
-# Валидатор для проверки международного формата телефонного номера
+# Валидатор для проверки международного формата телефонного номера.
+# Заменяет значение поля на E.164, чтобы дальше номер не разбирался повторно
 class PhoneNumberValidator:
     def __call__(self, form, field):
-        try:
-            number = phonenumbers.parse(field.data, None)  # None — не привязываем к конкретной стране
-            if not phonenumbers.is_valid_number(number):
-                raise ValueError
-        except (phonenumbers.NumberParseException, ValueError):
+        e164 = phone_to_e164(field.data)
+        if e164 is None:
             raise ValidationError('Введите корректный номер телефона в международном формате (например, +79123456789)')
+        field.data = e164
 
 
 class RegistrationForm(FlaskForm):
@@ -69,7 +68,7 @@ class UpdateProfileForm(FlaskForm):
             raise ValidationError('Этот логин уже занят другим пользователем.')
 
     def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()
+        user = User.query.filter_by(email_norm=normalize_email(email.data)).first()
         if user and user.id != self.user_id:
             raise ValidationError('Этот email уже используется.')
 
@@ -1,21 +1,31 @@
 from datetime import datetime
 import uuid
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import validates
 from website.extensions import db
+from website.services.password_service import get_password_hasher
+from website.utils.identity_utils import normalize_email, normalize_phone
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.CheckConstraint('bonus_minor >= 0', name='ck_users_bonus_minor_nonnegative'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     login = db.Column(db.String(50), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     phone = db.Column(db.String(20), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    # Нормализованные формы для поиска и проверки уникальности; заполняются при записи email/phone
+    email_norm = db.Column(db.String(120), unique=True, nullable=True)
+    phone_e164 = db.Column(db.String(20), unique=True, nullable=True)
+    password_hash = db.Column(db.String(255), nullable=False)  # scrypt-хэш werkzeug длиннее 128 символов
     date_registered = db.Column(db.DateTime, default=datetime.utcnow)
     role = db.Column(db.String(20), default='user')
-    referral_code = db.Column(db.String(20), unique=True, nullable=True)
-    bonus_balance = db.Column(db.Float, default=0.0)
+    is_blocked = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    referral_code = db.Column(db.String(32), unique=True, nullable=True)
+    bonus_minor = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')  # Бонусы в копейках
     referrer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     orders = db.relationship('Order', backref='user', lazy=True, cascade='all, delete-orphan')
     cart_items = db.relationship('CartItem', backref='user', lazy=True, cascade='all, delete-orphan')
@@ -23,11 +33,29 @@ class User(db.Model):
 
     referred_users = db.relationship('Referral', foreign_keys='Referral.referrer_id', backref='referring_user', lazy=True)
 
+    @validates('email')
+    def _normalize_email(self, key, email):
+        self.email_norm = normalize_email(email)
+        return email
+
+    @validates('phone')
+    def _normalize_phone(self, key, phone):
+        self.phone_e164 = normalize_phone(phone)
+        return phone
+
+    @property
+    def bonus_balance(self):
+        return self.bonus_minor / 100 if self.bonus_minor is not None else 0.0
+
+    @bonus_balance.setter
+    def bonus_balance(self, value):
+        self.bonus_minor = round(value * 100)
+
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_password_hasher().hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return get_password_hasher().verify(self.password_hash, password)
 
     def generate_referral_code(self):
         import secrets
@@ -42,8 +70,9 @@ class User(db.Model):
 class Referral(db.Model):
     __tablename__ = 'referrals'
     id = db.Column(db.Integer, primary_key=True)
-    referrer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    referred_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Рёбра реферального дерева: вниз — по referrer_id, вверх — по referred_user_id
+    referrer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    referred_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True, unique=True)
     bonus_amount = db.Column(db.Float, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -51,44 +80,180 @@ class Referral(db.Model):
     referred_user = db.relationship('User', foreign_keys=[referred_user_id], backref='received_referrals')
 
 
+class ReferralStats(db.Model):
+    __tablename__ = 'referral_stats'
+    # Агрегаты по поддереву рефералов пользователя. Обновляются при добавлении Referral
+    # (ReferralService.add_referral), поэтому чтение не зависит от глубины дерева
+    __table_args__ = (
+        db.Index('ix_referral_stats_total_count', 'total_count', 'user_id'),
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    direct_count = db.Column(db.Integer, nullable=False, default=0)  # Приглашённые лично
+    total_count = db.Column(db.Integer, nullable=False, default=0)  # Всё поддерево
+    levels = db.Column(db.Integer, nullable=False, default=0)  # Глубина поддерева
+    bonus_earned_minor = db.Column(db.BigInteger, nullable=False, default=0)  # Бонусы за личные приглашения, коп.
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ReferralClick(db.Model):
+    __tablename__ = 'referral_clicks'
+    # Переходы по реферальным ссылкам по дням. Строки не пишутся на каждый переход:
+    # счётчики копятся в памяти и переносятся пачкой upsert (ReferralClickService.flush).
+    # Первичный ключ начинается с кода — по нему же идёт выборка переходов одного кода
+    referral_code = db.Column(db.String(32), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    clicks = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
 class Product(db.Model):
     __tablename__ = 'products'
+    # Составные индексы под keyset-пагинацию каталога по цене и названию
+    __table_args__ = (
+        db.Index('ix_products_price_id', 'price', 'id'),
+        db.Index('ix_products_name_id', 'name', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     price = db.Column(db.Float, nullable=False)
     description = db.Column(db.Text, nullable=True)
     stock = db.Column(db.Integer, nullable=False)
     image_url = db.Column(db.String(200), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     cart_items = db.relationship('CartItem', backref='product', lazy=True, cascade='all, delete-orphan')
 
 
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
+    # Одна строка на товар в корзине: запись идёт upsert-ом по этой паре
+    __table_args__ = (
+        db.Index('ix_cart_items_user_id_product_id', 'user_id', 'product_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    # История заказов пользователя и админский список листаются по id от новых к старым;
+    # фильтры по пользователю, статусу и периоду идут по составным индексам
+    __table_args__ = (
+        db.Index('ix_orders_user_id_id', 'user_id', 'id'),
+        db.Index('ix_orders_status_id', 'status', 'id'),
+        db.Index('ix_orders_created_at_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     total_amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default='pending')
-    payment_id = db.Column(db.String(50), nullable=True)
+    payment_id = db.Column(db.String(50), nullable=True, index=True)
     payment_link = db.Column(db.String(200), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class OrderItem(db.Model):
+    __tablename__ = 'order_items'
+    # Снимок позиции на момент заказа: название и цена не меняются вместе с каталогом
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='SET NULL'), nullable=True)
+    product_name = db.Column(db.String(100), nullable=False)
+    unit_price = db.Column(db.Float, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+
+
+class StockReservation(db.Model):
+    __tablename__ = 'stock_reservations'
+    # Просроченные удержания ищутся фоновой очисткой по (status, expires_at)
+    __table_args__ = (
+        db.Index('ix_stock_reservations_status_expires', 'status', 'expires_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=True, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='held')  # 'held', 'committed' или 'released'
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class WebhookEvent(db.Model):
+    __tablename__ = 'webhook_events'
+    # Входящие уведомления платёжного шлюза. Обработчик вебхука только дописывает сюда
+    # событие и сразу отвечает; заказы обновляет фоновая выборка по processed_at IS NULL
+    __table_args__ = (
+        db.Index('ix_webhook_events_pending', 'processed_at', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    event_key = db.Column(db.String(120), unique=True, nullable=False)  # событие + id платежа, для дедупликации
+    event = db.Column(db.String(50), nullable=False)
+    payment_id = db.Column(db.String(50), nullable=False, index=True)
+    payment_status = db.Column(db.String(30), nullable=True)
+    payload = db.Column(db.Text, nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = db.Column(db.DateTime, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # Разборы, не нашедшие заказ платежа
+    next_attempt_at = db.Column(db.DateTime, nullable=True)  # Не разбирать повторно раньше этого времени
+
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+    # Отозванные JWT. Общий источник для блок-листов процессов: каждый подтягивает записи
+    # по revoked_at, просроченные (expires_at в прошлом) удаляются
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)  # NULL — токен без срока действия
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
 class BonusTransaction(db.Model):
     __tablename__ = 'bonus_transactions'
+    # Сверка читает проводки пользователя после контрольной точки: (user_id, id > last_transaction_id).
+    # Частичный индекс покрывает только начисления с ещё не израсходованным и не сгоревшим остатком
+    __table_args__ = (
+        db.Index('ix_bonus_transactions_user_id_id', 'user_id', 'id'),
+        db.Index('ix_bonus_transactions_expiring', 'user_id', 'expires_at',
+                 sqlite_where=db.text('remaining_minor > 0'), postgresql_where=db.text('remaining_minor > 0')),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
-    type = db.Column(db.String(20), nullable=False)  # 'credit' или 'debit'
+    amount_minor = db.Column(db.BigInteger, nullable=False)  # Всегда положительная, в копейках; знак задаёт type
+    type = db.Column(db.String(20), nullable=False)  # 'credit', 'debit' или 'expire' (сгорание начисления)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=True)  # Для начислений со сроком действия
+    remaining_minor = db.Column(db.BigInteger, nullable=True)  # Неизрасходованный остаток такого начисления
+    # Для 'expire' — сгоревшее начисление; уникальность не даёт сжечь его дважды
+    reference_id = db.Column(db.Integer, db.ForeignKey('bonus_transactions.id'), nullable=True, unique=True)
+
+    @property
+    def amount(self):
+        return self.amount_minor / 100
+
+
+class BonusCheckpoint(db.Model):
+    __tablename__ = 'bonus_checkpoints'
+    # Баланс по журналу проводок до last_transaction_id включительно. Сверка начинает с него
+    # и не перечитывает историю пользователя целиком
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    balance_minor = db.Column(db.BigInteger, nullable=False)
+    last_transaction_id = db.Column(db.Integer, nullable=False)
+    checked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class JobCheckpoint(db.Model):
+    __tablename__ = 'job_checkpoints'
+    # Курсор пакетной фоновой задачи: после сбоя следующий запуск продолжает с него
+    name = db.Column(db.String(50), primary_key=True)
+    cursor = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
 
 class Log(db.Model):
     __tablename__ = 'logs'
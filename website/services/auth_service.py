@@ -1,7 +1,41 @@
-from werkzeug.security import generate_password_hash, check_password_hash
-from website.models import User
-from website.extensions import db
+import hashlib
 import re
+import time
+from sqlalchemy import or_
+from flask import current_app
+from website.models import User
+from website.extensions import db, cache
+from website.services.password_service import get_password_hasher
+from website.utils.identity_utils import normalize_email, normalize_phone
+
+MISS_TTL = 30  # Сколько секунд помнить, что идентификатор не найден
+MISS_GENERATION_KEY = 'auth:miss:generation'
+PHONE_LIKE = re.compile(r'^[\d\s()+\-]+$')
+
+
+def _miss_generation():
+    generation = cache.get(MISS_GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        if not cache.add(MISS_GENERATION_KEY, generation, timeout=0):
+            generation = cache.get(MISS_GENERATION_KEY) or generation
+    return generation
+
+
+def _miss_key(identifier):
+    digest = hashlib.sha1(identifier.encode('utf-8')).hexdigest()
+    return f'auth:miss:g{_miss_generation()}:{digest}'
+
+
+def _identifier_filters(login=None, email=None, phone=None):
+    filters = []
+    if login:
+        filters.append(User.login == login)
+    if email:
+        filters.append(User.email_norm == email)
+    if phone:
+        filters.append(User.phone_e164 == phone)
+    return filters
 
 
 class AuthService:
@@ -15,34 +49,104 @@ class AuthService:
         pattern = re.compile(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$')
         return bool(pattern.match(email))
 
+    @staticmethod
+    def validate_login(login):
+        # Вид идентификатора при входе определяет колонку (см. find_user), поэтому логин
+        # не может выглядеть как email или телефон — иначе он перехватил бы чужой вход
+        if login and ('@' in login or PHONE_LIKE.match(login)):
+            return "Логин не может содержать @ или выглядеть как номер телефона"
+        return None
+
+    @staticmethod
+    def find_conflicts(login=None, email=None, phone=None, exclude_id=None):
+        # Все проверки уникальности одним запросом по нормализованным колонкам
+        email, phone = normalize_email(email), normalize_phone(phone)
+        filters = _identifier_filters(login, email, phone)
+        if not filters:
+            return None
+        query = db.session.query(User.login, User.email_norm, User.phone_e164).filter(or_(*filters))
+        if exclude_id is not None:
+            query = query.filter(User.id != exclude_id)
+        rows = query.limit(3).all()
+        if login and any(row.login == login for row in rows):
+            return "Логин уже занят"
+        if email and any(row.email_norm == email for row in rows):
+            return "Email уже зарегистрирован"
+        if phone and any(row.phone_e164 == phone for row in rows):
+            return "Телефон уже зарегистрирован"
+        return None
+
+    @staticmethod
+    def forget_misses():
+        # Вызывается после изменения логинов, email или телефонов: закэшированные промахи
+        # могли стать попаданиями
+        cache.set(MISS_GENERATION_KEY, time.time_ns(), timeout=0)
+
+    @staticmethod
+    def find_user(identifier):
+        # Логин, email или телефон в одном поле. Колонка выбирается по виду идентификатора:
+        # с @ — email, похожий на номер — телефон, иначе логин; один запрос по индексу.
+        # Промахи кэшируются ненадолго, чтобы перебор несуществующих учёток не доходил до БД
+        identifier = (identifier or '').strip()
+        if not identifier:
+            return None
+        key = _miss_key(identifier)
+        if cache.get(key):
+            return None
+
+        if '@' in identifier:
+            user = User.query.filter_by(email_norm=normalize_email(identifier)).first()
+        elif PHONE_LIKE.match(identifier):
+            phone = normalize_phone(identifier)
+            user = User.query.filter_by(phone_e164=phone).first() if phone else None
+        else:
+            user = User.query.filter_by(login=identifier).first()
+        if user:
+            return user
+        cache.set(key, 1, timeout=current_app.config.get('AUTH_MISS_TTL', MISS_TTL))
+        return None
+
+    @staticmethod
+    def find_by_email(email):
+        email = normalize_email(email)
+        if not email:
+            return None
+        return User.query.filter_by(email_norm=email).first()
+
     @staticmethod
     def register_user(login, email, phone, password):
-        if User.query.filter_by(login=login).first():
-            return None, "Логин уже занят"
-        if User.query.filter_by(email=email).first():
-            return None, "Email уже зарегистрирован"
-        if User.query.filter_by(phone=phone).first():
-            return None, "Телефон уже зарегистрирован"
-
-        hashed_password = generate_password_hash(password)
+        error = AuthService.validate_login(login) or AuthService.find_conflicts(login, email, phone)
+        if error:
+            return None, error
+
+        hashed_password = get_password_hasher().hash(password)
         user = User(login=login, email=email, phone=phone, password_hash=hashed_password)
         db.session.add(user)
         db.session.commit()
+        AuthService.forget_misses()
 
         return user, None
 
     @staticmethod
     def login_user(login=None, email=None, phone=None, password=None):
-        if login:
-            user = User.query.filter_by(login=login).first()
-        elif email:
-            user = User.query.filter_by(email=email).first()
-        elif phone:
-            user = User.query.filter_by(phone=phone).first()
-        else:
+        identifier = login or email or phone
+        if not identifier:
             return None, "Необходимо указать логин, email или телефон"
 
         # Проверка пароля
-        if user and check_password_hash(user.password_hash, password):
+        user = AuthService.find_user(identifier)
+        if user and AuthService.verify_password(user, password):
             return user, None
-        return None, "Неверные данные для входа"
\ No newline at end of file
+        return None, "Неверные данные для входа"
+
+    @staticmethod
+    def verify_password(user, password):
+        # Проверка пароля при входе; хэш со старыми параметрами (алгоритм, стоимость)
+        # пересчитывается по текущим настройкам, пока пароль известен в открытом виде
+        hasher = get_password_hasher()
+        if not hasher.verify(user.password_hash, password):
+            return False
+        if hasher.needs_rehash(user.password_hash):
+            user.password_hash = hasher.hash(password)
+            db.session.commit()
+        return True
\ No newline at end of file
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, bindparam, case, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from website.extensions import db
+from website.models import BonusCheckpoint, BonusTransaction, User
+from website.services.bonus_service import DEBIT_TYPES
+
+AUDIT_CHUNK_SIZE = 5000
+DRIFT_SAMPLES = 100  # Сколько расхождений перечислять в отчёте; остальные только считаются
+# Контрольная точка не сдвигается на проводки моложе этого срока: проводка с меньшим id,
+# которая ещё не закоммичена, иначе осталась бы позади точки и выпала из сверки
+CHECKPOINT_LAG = timedelta(minutes=5)
+
+
+def _upsert_checkpoints(rows):
+    insert = pg_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+    statement = insert(BonusCheckpoint)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={
+            "balance_minor": statement.excluded.balance_minor,
+            "last_transaction_id": statement.excluded.last_transaction_id,
+            "checked_at": statement.excluded.checked_at
+        }
+    ), rows)
+
+
+def _chunk_bound(last_id, chunk_size):
+    # Верхний id пачки пользователей; None — пачка последняя
+    return db.session.execute(
+        select(User.id).where(User.id > last_id).order_by(User.id).offset(chunk_size - 1).limit(1)
+    ).scalar()
+
+
+class BonusAuditService:
+    @staticmethod
+    def reconcile(repair=False, chunk_size=AUDIT_CHUNK_SIZE, now=None):
+        # Сверка users.bonus_minor с журналом проводок. Пользователи идут пачками по id;
+        # на пачку один запрос: баланс, контрольная точка и сумма только тех проводок, что
+        # новее точки (поиск по индексу (user_id, id)). Баланс и проводки читаются одним
+        # запросом, то есть из одного снимка БД. Точки сдвигаются на проверенные проводки,
+        # repair=True приводит баланс к журналу. Память — одна пачка и образцы расхождений
+        now = now or datetime.utcnow()
+        cutoff = now - CHECKPOINT_LAG
+        signed = case((BonusTransaction.type.in_(DEBIT_TYPES), -BonusTransaction.amount_minor),
+                      else_=BonusTransaction.amount_minor)
+        settled = BonusTransaction.timestamp < cutoff
+        report = {"users": 0, "transactions": 0, "checkpoints": 0, "drifted": 0,
+                  "drift_minor": 0, "repaired": 0, "samples": []}
+
+        last_id = 0
+        while True:
+            bound = _chunk_bound(last_id, chunk_size)
+            users = [User.id > last_id] + ([User.id <= bound] if bound is not None else [])
+            rows = db.session.execute(
+                select(
+                    User.id, User.bonus_minor,
+                    BonusCheckpoint.balance_minor, BonusCheckpoint.last_transaction_id,
+                    func.count(BonusTransaction.id).label('read'),
+                    func.coalesce(func.sum(signed), 0).label('delta'),
+                    func.coalesce(func.sum(case((settled, signed), else_=0)), 0).label('settled_delta'),
+                    func.max(case((settled, BonusTransaction.id))).label('settled_id')
+                )
+                .select_from(User)
+                .outerjoin(BonusCheckpoint, BonusCheckpoint.user_id == User.id)
+                .outerjoin(BonusTransaction, and_(
+                    BonusTransaction.user_id == User.id,
+                    BonusTransaction.id > func.coalesce(BonusCheckpoint.last_transaction_id, 0)
+                ))
+                .where(*users)
+                .group_by(User.id, User.bonus_minor, BonusCheckpoint.balance_minor,
+                          BonusCheckpoint.last_transaction_id)
+            ).all()
+            if not rows:
+                break
+
+            checkpoints, repairs = [], []
+            for row in rows:
+                base = row.balance_minor or 0
+                expected = base + row.delta
+                drift = row.bonus_minor - expected
+                report["transactions"] += row.read
+                if row.settled_id is not None:
+                    checkpoints.append({"user_id": row.id, "balance_minor": base + row.settled_delta,
+                                        "last_transaction_id": row.settled_id, "checked_at": now})
+                if drift:
+                    report["drifted"] += 1
+                    report["drift_minor"] += abs(drift)
+                    if len(report["samples"]) < DRIFT_SAMPLES:
+                        report["samples"].append({"user_id": row.id, "balance_minor": row.bonus_minor,
+                                                  "ledger_minor": expected, "drift_minor": drift})
+                    # Отрицательный баланс по журналу — ошибка журнала, а не баланса: не трогаем
+                    if repair and expected >= 0:
+                        repairs.append({"user_id": row.id, "drift": drift})
+
+            if checkpoints:
+                _upsert_checkpoints(checkpoints)
+            if repairs:
+                # Поправка относительная: изменения баланса, сделанные после чтения, сохраняются
+                db.session.execute(
+                    update(User.__table__)
+                    .where(User.__table__.c.id == bindparam('user_id'))
+                    .values(bonus_minor=User.__table__.c.bonus_minor - bindparam('drift')),
+                    repairs
+                )
+            db.session.commit()
+            report["users"] += len(rows)
+            report["checkpoints"] += len(checkpoints)
+            report["repaired"] += len(repairs)
+            if bound is None:
+                break
+            last_id = bound
+        return report, None
+
+    @staticmethod
+    def run_scheduled():
+        # Периодическая сверка: расхождения пишутся в лог, исправляются только при BONUS_AUDIT_REPAIR
+        report, _ = BonusAuditService.reconcile(repair=current_app.config.get('BONUS_AUDIT_REPAIR', False))
+        if report["drifted"]:
+            current_app.logger.warning(
+                f"Сверка бонусов: расхождений {report['drifted']} на {report['drift_minor']} коп., "
+                f"исправлено {report['repaired']}; примеры: {report['samples'][:10]}"
+            )
+        return report
\ No newline at end of file
@@ -0,0 +1,86 @@
+from datetime import datetime
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from website.extensions import db
+from website.models import BonusTransaction, JobCheckpoint, User
+
+SWEEP_JOB = 'bonus-expiry'
+SWEEP_BATCH_SIZE = 1000  # Пользователей в одной транзакции
+
+
+def _save_cursor(cursor, now):
+    insert_ = pg_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+    statement = insert_(JobCheckpoint).values(name=SWEEP_JOB, cursor=cursor, updated_at=now)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['name'], set_={"cursor": statement.excluded.cursor, "updated_at": statement.excluded.updated_at}
+    ))
+
+
+class BonusExpiryService:
+    @staticmethod
+    def sweep(now=None, batch_size=SWEEP_BATCH_SIZE):
+        # Сжигает неизрасходованные остатки просроченных начислений. Пользователи с такими
+        # начислениями находятся по частичному индексу (user_id, expires_at) WHERE remaining_minor > 0
+        # и обрабатываются пачками по id. Пачка — одна транзакция: проводки 'expire' (по одной
+        # на начисление, reference_id уникален), уменьшение балансов, обнуление остатков и курсор
+        # в job_checkpoints. После сбоя запуск продолжает с курсора, а уже сожжённое не находится
+        # повторно. Возвращает сводку: пользователей, проводок, сожжено копеек
+        now = now or datetime.utcnow()
+        checkpoint = db.session.get(JobCheckpoint, SWEEP_JOB)
+        cursor = checkpoint.cursor if checkpoint else 0
+        report = {"users": 0, "transactions": 0, "expired_minor": 0, "resumed_from": cursor}
+        expiring = (BonusTransaction.remaining_minor > 0, BonusTransaction.expires_at <= now)
+
+        while True:
+            user_ids = db.session.execute(
+                select(BonusTransaction.user_id).distinct()
+                .where(BonusTransaction.user_id > cursor, *expiring)
+                .order_by(BonusTransaction.user_id).limit(batch_size)
+            ).scalars().all()
+            if not user_ids:
+                break
+
+            credits = db.session.execute(
+                select(BonusTransaction.id, BonusTransaction.user_id, BonusTransaction.remaining_minor)
+                .where(BonusTransaction.user_id.in_(user_ids), *expiring)
+                .order_by(BonusTransaction.user_id, BonusTransaction.expires_at, BonusTransaction.id)
+                .with_for_update()
+            ).all()
+            balances = dict(db.session.execute(
+                select(User.id, User.bonus_minor).where(User.id.in_(user_ids)).with_for_update()
+            ).all())
+
+            rows, burned = [], {}
+            for credit in credits:
+                # Баланс меньше остатков бывает только при расхождении с журналом: в минус не уводим
+                amount = min(credit.remaining_minor, balances[credit.user_id] - burned.get(credit.user_id, 0))
+                if amount > 0:
+                    burned[credit.user_id] = burned.get(credit.user_id, 0) + amount
+                    rows.append({"user_id": credit.user_id, "amount_minor": amount, "type": 'expire',
+                                 "timestamp": now, "reference_id": credit.id})
+
+            if rows:
+                db.session.execute(insert(BonusTransaction), rows)
+                users = User.__table__
+                db.session.execute(
+                    update(users).where(users.c.id == bindparam('row_id'))
+                    .values(bonus_minor=users.c.bonus_minor - bindparam('burned')),
+                    [{"row_id": user_id, "burned": amount} for user_id, amount in burned.items()]
+                )
+            db.session.execute(
+                update(BonusTransaction).where(BonusTransaction.id.in_([credit.id for credit in credits]))
+                .values(remaining_minor=0).execution_options(synchronize_session=False)
+            )
+            cursor = user_ids[-1]
+            _save_cursor(cursor, now)
+            db.session.commit()
+
+            report["users"] += len(user_ids)
+            report["transactions"] += len(rows)
+            report["expired_minor"] += sum(burned.values())
+
+        # Проход завершён: следующий начнёт с начала
+        _save_cursor(0, now)
+        db.session.commit()
+        return report
\ No newline at end of file
@@ -1,16 +1,168 @@
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from flask import current_app
+from sqlalchemy import bindparam, insert, literal, null, select, update
+from sqlalchemy.sql import Select
 from website.models import BonusTransaction, User
 from website.extensions import db
 
+BULK_CHUNK_SIZE = 5000
+DEBIT_TYPES = ('debit', 'expire')  # Типы проводок, уменьшающих баланс
+
+
+def to_minor(amount):
+    # Рубли (float, Decimal, строка) в целые копейки без ошибок двоичного округления
+    return int((Decimal(str(amount)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def _default_expiry(now):
+    days = current_app.config.get('BONUS_EXPIRY_DAYS')
+    return now + timedelta(days=days) if days else None
+
+
+def _consume_expiring(user_id, amount_minor):
+    # Списание расходует начисления со сроком в порядке сгорания: сгорает только то,
+    # что не потрачено. Строки находятся по частичному индексу (user_id, expires_at)
+    credits = db.session.execute(
+        select(BonusTransaction.id, BonusTransaction.remaining_minor)
+        .where(BonusTransaction.user_id == user_id, BonusTransaction.remaining_minor > 0)
+        .order_by(BonusTransaction.expires_at, BonusTransaction.id)
+        .with_for_update()
+    ).all()
+    updates = []
+    for credit in credits:
+        if amount_minor <= 0:
+            break
+        used = min(credit.remaining_minor, amount_minor)
+        updates.append({"credit_id": credit.id, "remaining": credit.remaining_minor - used})
+        amount_minor -= used
+    if updates:
+        table = BonusTransaction.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('credit_id')).values(remaining_minor=bindparam('remaining')),
+            updates
+        )
+
+
+def _id_chunks(users, chunk_size):
+    # Пачки id получателей. Запрос читается по keyset и каждая пачка фиксируется списком:
+    # и проводки, и балансы в пачке относятся к одним и тем же пользователям, даже если
+    # условие запроса зависит от баланса или истории начислений
+    if isinstance(users, Select):
+        column = users.subquery().c[0]
+        last_id = None
+        while True:
+            query = select(column).distinct().order_by(column).limit(chunk_size)
+            if last_id is not None:
+                query = query.where(column > last_id)
+            ids = db.session.execute(query).scalars().all()
+            if not ids:
+                return
+            yield ids
+            last_id = ids[-1]
+    else:
+        ids = sorted(set(int(user_id) for user_id in users))
+        for start in range(0, len(ids), chunk_size):
+            yield ids[start:start + chunk_size]
+
+
 class BonusService:
+    # Бонусный счёт: баланс меняется одним условным UPDATE в БД (без чтения в Python,
+    # поэтому параллельные операции не теряют обновления), а проводка пишется в той же транзакции.
+    # Обе записи — в точке сохранения: при ошибке откатываются только они, а не несохранённые
+    # изменения вызывающего кода
+
     @staticmethod
-    def add_bonus(user_id, amount, transaction_type):
-        user = User.query.get(user_id)
-        if not user:
+    def credit(user_id, amount_minor, transaction_type='credit', expires_at=None):
+        # expires_at не задан — срок из BONUS_EXPIRY_DAYS (0 — бессрочно)
+        if amount_minor <= 0:
+            return None, "Сумма должна быть положительной"
+        with db.session.begin_nested():
+            result = db.session.execute(
+                update(User).where(User.id == user_id)
+                .values(bonus_minor=User.bonus_minor + amount_minor)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                transaction = BonusService._record(user_id, amount_minor, transaction_type,
+                                                   expires_at or _default_expiry(datetime.utcnow()))
+        if result.rowcount == 0:
             return None, "Пользователь не найден"
-        if transaction_type == 'debit' and user.bonus_balance < amount:
+        return BonusService._commit(user_id, transaction)
+
+    @staticmethod
+    def debit(user_id, amount_minor, transaction_type='debit'):
+        if amount_minor <= 0:
+            return None, "Сумма должна быть положительной"
+        # Проверка остатка — часть UPDATE: списание либо проходит целиком, либо не меняет ничего
+        with db.session.begin_nested():
+            result = db.session.execute(
+                update(User).where(User.id == user_id, User.bonus_minor >= amount_minor)
+                .values(bonus_minor=User.bonus_minor - amount_minor)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                _consume_expiring(user_id, amount_minor)
+                transaction = BonusService._record(user_id, amount_minor, transaction_type)
+        if result.rowcount == 0:
+            if db.session.get(User, user_id) is None:
+                return None, "Пользователь не найден"
             return None, "Недостаточно бонусов"
-        bonus_transaction = BonusTransaction(user_id=user_id, amount=amount, type=transaction_type)
-        db.session.add(bonus_transaction)
-        user.bonus_balance += amount if transaction_type == 'credit' else -amount
+        return BonusService._commit(user_id, transaction)
+
+    @staticmethod
+    def _record(user_id, amount_minor, transaction_type, expires_at=None):
+        transaction = BonusTransaction(user_id=user_id, amount_minor=amount_minor, type=transaction_type,
+                                       expires_at=expires_at, remaining_minor=amount_minor if expires_at else None)
+        db.session.add(transaction)
+        db.session.flush()
+        return transaction
+
+    @staticmethod
+    def _commit(user_id, transaction):
         db.session.commit()
-        return bonus_transaction, None
\ No newline at end of file
+        # Баланс изменён в обход сессии — загруженный пользователь перечитается при обращении
+        user = db.session.identity_map.get(db.session.identity_key(User, int(user_id)))
+        if user is not None:
+            db.session.expire(user, ['bonus_minor'])
+        return transaction, None
+
+    @staticmethod
+    def add_bonus(user_id, amount, transaction_type):
+        # Прежний интерфейс: сумма в рублях
+        if transaction_type not in ('credit', 'debit'):
+            return None, "Неизвестный тип операции"
+        amount_minor = to_minor(amount)
+        if transaction_type == 'debit':
+            return BonusService.debit(user_id, amount_minor)
+        return BonusService.credit(user_id, amount_minor)
+
+    @staticmethod
+    def bulk_credit(users, amount_minor, transaction_type='credit', chunk_size=BULK_CHUNK_SIZE, expires_at=None):
+        # Начисление по акции: users — набор id или select(...) с id в первой колонке.
+        # На каждую пачку два set-based запроса (INSERT ... SELECT проводок и UPDATE балансов)
+        # и отдельный commit. Несуществующие id пропускаются. Возвращает (число начислений, ошибка)
+        if amount_minor <= 0:
+            return 0, "Сумма должна быть положительной"
+        expires_at = expires_at or _default_expiry(datetime.utcnow())
+        credited = 0
+        for ids in _id_chunks(users, chunk_size):
+            condition = User.id.in_(ids)
+            now = datetime.utcnow()
+            result = db.session.execute(
+                insert(BonusTransaction).from_select(
+                    ['user_id', 'amount_minor', 'type', 'timestamp', 'expires_at', 'remaining_minor'],
+                    select(User.id, literal(amount_minor), literal(transaction_type), literal(now),
+                           literal(expires_at) if expires_at else null(),
+                           literal(amount_minor) if expires_at else null()).where(condition)
+                )
+            )
+            db.session.execute(
+                update(User).where(condition)
+                .values(bonus_minor=User.bonus_minor + amount_minor)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            credited += result.rowcount
+        db.session.expire_all()
+        return credited, None
\ No newline at end of file
@@ -0,0 +1,118 @@
+from website.services.cart_store import get_cart_store, load_cart_lines
+from website.services.product_cache import ProductCache
+
+MAX_BATCH_OPERATIONS = 200
+BATCH_OPERATIONS = ('add', 'update', 'remove')
+
+
+def _parse_operation(operation):
+    # Возвращает (op, product_id, quantity, error) для одной операции пакета
+    if not isinstance(operation, dict):
+        return None, None, None, "Операция должна быть объектом"
+    op = operation.get('op')
+    product_id = operation.get('product_id')
+    if op not in BATCH_OPERATIONS:
+        return op, product_id, None, "Неизвестная операция"
+    if not isinstance(product_id, int) or isinstance(product_id, bool):
+        return op, product_id, None, "Необходимо указать product_id"
+    if op == 'remove':
+        return op, product_id, None, None
+    quantity = operation.get('quantity', 1 if op == 'add' else None)
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+        return op, product_id, None, "Количество должно быть положительным числом"
+    return op, product_id, quantity, None
+
+
+def _apply(user_id, parsed, results):
+    # Операции применяются по порядку к состоянию корзины в памяти; хранилище получает
+    # только итог. Товары проверяются одним пакетным чтением через кэш товаров
+    store = get_cart_store()
+    product_ids = {product_id for _, op, product_id, _ in parsed if op != 'remove'}
+    known = ProductCache.get_products(product_ids) if product_ids else {}
+    before = store.get(user_id)
+    state = dict(before)
+
+    for index, op, product_id, quantity in parsed:
+        result = results[index]
+        if op == 'remove':
+            if product_id not in state:
+                result.update(status="error", error="Товар не найден в корзине")
+                continue
+            del state[product_id]
+        elif product_id not in known:
+            result.update(status="error", error="Товар не найден")
+            continue
+        elif op == 'add':
+            state[product_id] = state.get(product_id, 0) + quantity
+        else:
+            if product_id not in state:
+                result.update(status="error", error="Товар не найден в корзине")
+                continue
+            state[product_id] = quantity
+        result.update(status="ok", quantity=state.get(product_id, 0))
+
+    if state != before:
+        store.write(user_id, before, state)
+
+
+def _apply_one(user_id, op, product_id, quantity=None):
+    results = [{"index": 0, "op": op, "product_id": product_id}]
+    _apply(user_id, [(0, op, product_id, quantity)], results)
+    if results[0]['status'] == 'error':
+        return None, results[0]['error']
+    return results[0]['quantity'], None
+
+
+class CartService:
+    @staticmethod
+    def load_cart(user_id):
+        # Для оформления заказа: корзина из хранилища сначала переносится в cart_items,
+        # и строки читаются уже из БД — это и есть авторитетное состояние
+        get_cart_store().flush([user_id])
+        return load_cart_lines(user_id)
+
+    @staticmethod
+    def view_cart(user_id):
+        return get_cart_store().lines(user_id)
+
+    @staticmethod
+    def cart_version(user_id):
+        return get_cart_store().version(user_id)
+
+    @staticmethod
+    def add_item(user_id, product_id, quantity):
+        return _apply_one(user_id, 'add', product_id, quantity)
+
+    @staticmethod
+    def update_item(user_id, product_id, quantity):
+        return _apply_one(user_id, 'update', product_id, quantity)
+
+    @staticmethod
+    def remove_item(user_id, product_id):
+        return _apply_one(user_id, 'remove', product_id)
+
+    @staticmethod
+    def clear(user_id):
+        get_cart_store().clear(user_id)
+
+    @staticmethod
+    def apply_batch(user_id, operations):
+        # Пакет операций над корзиной: ошибка в операции не отменяет остальные —
+        # она попадает в результат. Всё применённое записывается одной транзакцией
+        if not isinstance(operations, list) or not operations:
+            return None, "Необходимо указать список операций"
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return None, f"Не более {MAX_BATCH_OPERATIONS} операций за запрос"
+
+        results = []
+        parsed = []
+        for index, operation in enumerate(operations):
+            op, product_id, quantity, error = _parse_operation(operation)
+            results.append({"index": index, "op": op, "product_id": product_id})
+            if error:
+                results[index].update(status="error", error=error)
+            else:
+                parsed.append((index, op, product_id, quantity))
+
+        _apply(user_id, parsed, results)
+        return results, None
\ No newline at end of file
@@ -0,0 +1,298 @@
+import uuid
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from website.extensions import db
+from website.models import CartItem, Product
+from website.services.product_cache import ProductCache
+
+DIRTY_KEY = 'cart:dirty'
+LOADED_FIELD = '_loaded'
+FLUSH_BATCH_SIZE = 200
+CART_TTL = 30 * 24 * 3600  # Хэш корзины, к которой давно не обращались, удаляет сам Redis
+
+
+def load_cart_lines(user_id):
+    # Корзина из cart_items вместе с товарами и суммами — один запрос: строки соединяются
+    # с products, сумма строки и итог корзины (оконная функция) считаются в SQL
+    line_total = Product.price * CartItem.quantity
+    rows = db.session.execute(
+        select(
+            CartItem.product_id,
+            Product.name,
+            Product.price,
+            CartItem.quantity,
+            line_total.label('total'),
+            func.sum(line_total).over().label('cart_total')
+        )
+        .join(Product, Product.id == CartItem.product_id)
+        .where(CartItem.user_id == user_id)
+        .order_by(CartItem.id)
+    ).all()
+
+    lines = [{
+        "product_id": row.product_id,
+        "name": row.name,
+        "price": row.price,
+        "quantity": row.quantity,
+        "total": row.total
+    } for row in rows]
+    total_amount = rows[0].cart_total if rows else 0
+    return lines, total_amount
+
+
+def _load_states(user_ids):
+    # {user_id: {product_id: количество}} из cart_items одним запросом
+    states = {user_id: {} for user_id in user_ids}
+    rows = db.session.execute(
+        select(CartItem.user_id, CartItem.product_id, CartItem.quantity)
+        .where(CartItem.user_id.in_(list(states)))
+        .order_by(CartItem.id)
+    )
+    for user_id, product_id, quantity in rows:
+        states[user_id].setdefault(product_id, quantity)
+    return states
+
+
+def _write_diffs(diffs, increment=True):
+    # diffs — [(user_id, before, after)]; в cart_items уходит только разница, одним upsert
+    # по (user_id, product_id) на все корзины сразу. По умолчанию пишется приращение
+    # количества и складывается с тем, что в строке сейчас: параллельные запросы к одной
+    # корзине не затирают изменения друг друга. increment=False записывает after как есть —
+    # так корзина переносится из Redis-хранилища. commit делает вызывающий
+    now = datetime.utcnow()
+    rows, deletes = [], []
+    for user_id, before, after in diffs:
+        for product_id, quantity in after.items():
+            if before.get(product_id) != quantity:
+                change = quantity - before.get(product_id, 0) if increment else quantity
+                rows.append({"user_id": user_id, "product_id": product_id, "quantity": change, "updated_at": now})
+                if change < 0:
+                    deletes.append((user_id, product_id))
+        for product_id in before:
+            if product_id not in after:
+                if increment:
+                    rows.append({"user_id": user_id, "product_id": product_id,
+                                 "quantity": -before[product_id], "updated_at": now})
+                deletes.append((user_id, product_id))
+
+    if rows:
+        insert_ = pg_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+        statement = insert_(CartItem)
+        quantity = CartItem.__table__.c.quantity + statement.excluded.quantity if increment else statement.excluded.quantity
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['user_id', 'product_id'],
+            set_={"quantity": quantity, "updated_at": statement.excluded.updated_at}
+        ), rows)
+    if deletes:
+        # После уменьшения строка с нулём (или ниже — если её уже удалил параллельный запрос) убирается
+        condition = tuple_(CartItem.user_id, CartItem.product_id).in_(deletes)
+        if increment:
+            condition = condition & (CartItem.quantity <= 0)
+        db.session.execute(
+            delete(CartItem)
+            .where(condition)
+            .execution_options(synchronize_session=False)
+        )
+
+
+class SqlCartStore:
+    # Корзина прямо в таблице cart_items: каждое изменение сразу пишется и коммитится
+
+    def get(self, user_id):
+        user_id = int(user_id)
+        return _load_states([user_id])[user_id]
+
+    def write(self, user_id, before, after):
+        _write_diffs([(int(user_id), before, after)])
+        db.session.commit()
+
+    def clear(self, user_id):
+        CartItem.query.filter_by(user_id=user_id).delete()
+        db.session.commit()
+
+    def lines(self, user_id):
+        return load_cart_lines(user_id)
+
+    def version(self, user_id):
+        # Валидатор для ETag корзины: число строк, суммарное количество
+        # и время последнего изменения строк корзины и их товаров (цена, название)
+        return list(db.session.execute(
+            select(
+                func.count(CartItem.id),
+                func.sum(CartItem.quantity),
+                func.max(CartItem.updated_at),
+                func.max(Product.updated_at)
+            )
+            .join(Product, Product.id == CartItem.product_id)
+            .where(CartItem.user_id == user_id)
+        ).one())
+
+    def flush(self, user_ids=None):
+        return 0
+
+    def forget(self, user_id):
+        pass
+
+
+class RedisCartStore:
+    # Корзина в хэше cart:<user_id> (поле — product_id, значение — количество) в Redis
+    # или MemoryRedis. Изменения не трогают БД: пользователь помечается в множестве cart:dirty,
+    # а в cart_items корзины переносит flush — пачками по таймеру и перед оформлением заказа.
+    # Каждое обращение продлевает срок хэша на CART_TTL
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _key(user_id):
+        return f'cart:{int(user_id)}'
+
+    @staticmethod
+    def _state(data):
+        # Поля с нулём и ниже остаются от HINCRBY после удаления товара и в корзину не входят
+        return {int(field): int(value) for field, value in data.items()
+                if field != LOADED_FIELD and int(value) > 0}
+
+    def get(self, user_id):
+        key = self._key(user_id)
+        pipe = self.client.pipeline()
+        pipe.hgetall(key)
+        pipe.expire(key, CART_TTL)
+        data = pipe.execute()[0]
+        if LOADED_FIELD in data:
+            return self._state(data)
+
+        # Первое обращение — корзина поднимается из cart_items. Метка отличает
+        # пустую корзину от ещё не загруженной. Состояние пишется во временный ключ
+        # и переименовывается, только если хэша ещё нет: корзину, которую другой процесс
+        # успел загрузить и изменить, пока шёл запрос в БД, устаревшие строки не затрут
+        staging_key = f'{key}:load:{uuid.uuid4().hex}'
+        state = SqlCartStore().get(user_id)
+        pipe = self.client.pipeline()
+        pipe.hset(staging_key, mapping={LOADED_FIELD: 1, **state})
+        pipe.renamenx(staging_key, key)
+        pipe.delete(staging_key)
+        pipe.hgetall(key)
+        pipe.expire(key, CART_TTL)
+        return self._state(pipe.execute()[-2])
+
+    def write(self, user_id, before, after):
+        # В хэш уходят приращения (HINCRBY), а не итоговые количества: параллельные запросы
+        # к одной корзине складываются. Метка загрузки проверяется в той же транзакции
+        # (WATCH/MULTI), что и запись: если хэш сбросили (forget) или он истёк после get,
+        # корзина сначала заново поднимается из БД, а не создаётся из одних приращений
+        key = self._key(user_id)
+        changes = {product_id: after.get(product_id, 0) - before.get(product_id, 0)
+                   for product_id in {*before, *after} if before.get(product_id) != after.get(product_id)}
+
+        def increment(pipe):
+            if not pipe.hexists(key, LOADED_FIELD):
+                return
+            pipe.multi()
+            for product_id, change in changes.items():
+                pipe.hincrby(key, product_id, change)
+            pipe.expire(key, CART_TTL)
+            pipe.sadd(DIRTY_KEY, int(user_id))
+
+        while not self.client.transaction(increment, key):
+            self.get(user_id)
+
+    def clear(self, user_id):
+        key = self._key(user_id)
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={LOADED_FIELD: 1})
+        pipe.expire(key, CART_TTL)
+        pipe.sadd(DIRTY_KEY, int(user_id))
+        pipe.execute()
+
+    def lines(self, user_id):
+        state = self.get(user_id)
+        products = ProductCache.get_products(state)
+        lines = [{
+            "product_id": product_id,
+            "name": products[product_id]['name'],
+            "price": products[product_id]['price'],
+            "quantity": quantity,
+            "total": products[product_id]['price'] * quantity
+        } for product_id, quantity in sorted(state.items()) if product_id in products]
+        return lines, sum(line['total'] for line in lines)
+
+    def version(self, user_id):
+        # Цены и названия берутся из кэша товаров, поэтому в валидатор входят поколения товаров корзины
+        state = sorted(self.get(user_id).items())
+        return [state, ProductCache.generations(product_id for product_id, _ in state)]
+
+    def flush(self, user_ids=None):
+        # Без аргументов — переносит все помеченные корзины пачками по FLUSH_BATCH_SIZE.
+        # Для явно переданных пользователей (оформление заказа) синхронизирует корзину
+        # безусловно, чтобы БД точно совпадала с хэшем
+        if user_ids is not None:
+            user_ids = [int(user_id) for user_id in user_ids]
+            self.client.srem(DIRTY_KEY, *user_ids)
+            self._flush_batch(user_ids)
+            return len(user_ids)
+
+        flushed = 0
+        while True:
+            batch = [int(user_id) for user_id in self.client.spop(DIRTY_KEY, FLUSH_BATCH_SIZE)]
+            if not batch:
+                return flushed
+            self._flush_batch(batch)
+            flushed += len(batch)
+
+    def forget(self, user_id):
+        # Корзина оформлена и удалена из cart_items — хэш сбрасывается
+        # и при следующем обращении поднимется из БД уже пустым
+        pipe = self.client.pipeline()
+        pipe.delete(self._key(user_id))
+        pipe.srem(DIRTY_KEY, int(user_id))
+        pipe.execute()
+
+    def _flush_batch(self, user_ids):
+        try:
+            states = {user_id: self.get(user_id) for user_id in user_ids}
+            stored = _load_states(user_ids)
+            # Товары, удалённые из каталога после добавления в корзину, в БД не переносятся
+            product_ids = {product_id for state in states.values() for product_id in state}
+            known = set(db.session.execute(
+                select(Product.id).where(Product.id.in_(product_ids))
+            ).scalars()) if product_ids else set()
+            _write_diffs([
+                (user_id, stored[user_id],
+                 {product_id: quantity for product_id, quantity in states[user_id].items() if product_id in known})
+                for user_id in user_ids
+            ], increment=False)
+            db.session.commit()
+        except Exception:
+            # Не перенесённые корзины остаются помеченными до следующего прохода
+            db.session.rollback()
+            self.client.sadd(DIRTY_KEY, *user_ids)
+            raise
+
+
+def init_cart_store(app):
+    if app.config.get('CART_STORE', 'sql') == 'redis':
+        redis_url = app.config.get('CART_REDIS_URL')
+        if redis_url:
+            import redis
+            client = redis.Redis.from_url(redis_url, decode_responses=True)
+        elif not app.config.get('TESTING'):
+            # Корзины в памяти одного процесса: у каждого воркера своя копия, а несброшенные
+            # изменения пропадают при перезапуске
+            raise RuntimeError("CART_STORE=redis требует CART_REDIS_URL")
+        else:
+            from website.utils.memory_redis import MemoryRedis
+            client = MemoryRedis()
+        store = RedisCartStore(client)
+    else:
+        store = SqlCartStore()
+    app.extensions['cart_store'] = store
+    return store
+
+
+def get_cart_store():
+    return current_app.extensions['cart_store']
\ No newline at end of file
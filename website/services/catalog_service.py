@@ -0,0 +1,92 @@
+from sqlalchemy import tuple_
+from website.models import Product
+from website.utils.cursor_utils import encode_cursor, decode_cursor
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Допустимые ключи сортировки; id всегда добавляется вторым ключом, чтобы порядок был однозначным
+SORT_COLUMNS = {
+    'id': Product.id,
+    'price': Product.price,
+    'name': Product.name,
+}
+# Типы значений курсора (ключ сортировки, id) для каждой сортировки
+CURSOR_TYPES = {
+    'id': (int, int),
+    'price': ((int, float), int),
+    'name': (str, int),
+}
+
+
+def serialize_product(product):
+    return {
+        "id": product.id,
+        "name": product.name,
+        "price": product.price,
+        "description": product.description,
+        "stock": product.stock,
+        "image_url": product.image_url
+    }
+
+
+class CatalogService:
+    @staticmethod
+    def list_products(limit=None, cursor=None, sort='id', order='asc',
+                      min_price=None, max_price=None, in_stock=False):
+        if sort not in SORT_COLUMNS:
+            return None, "Недопустимое поле сортировки"
+        if order not in ('asc', 'desc'):
+            return None, "Недопустимое направление сортировки"
+
+        if limit is None:
+            limit = DEFAULT_PAGE_SIZE
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            return None, f"Размер страницы должен быть от 1 до {MAX_PAGE_SIZE}"
+
+        if min_price is not None and max_price is not None and min_price > max_price:
+            return None, "Минимальная цена больше максимальной"
+
+        sort_column = SORT_COLUMNS[sort]
+        query = Product.query
+        if min_price is not None:
+            query = query.filter(Product.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Product.price <= max_price)
+        if in_stock:
+            query = query.filter(Product.stock > 0)
+
+        # Keyset-пагинация: продолжаем строго после (значение сортировки, id) последней строки,
+        # поэтому стоимость страницы не зависит от её номера
+        if cursor:
+            values = decode_cursor(cursor, CURSOR_TYPES[sort])
+            if values is None:
+                return None, "Некорректный курсор"
+            if sort == 'id':
+                key, boundary = Product.id, values[1]
+            else:
+                key, boundary = tuple_(sort_column, Product.id), tuple_(*values)
+            query = query.filter(key > boundary if order == 'asc' else key < boundary)
+
+        if sort == 'id':
+            ordering = [Product.id.asc() if order == 'asc' else Product.id.desc()]
+        elif order == 'asc':
+            ordering = [sort_column.asc(), Product.id.asc()]
+        else:
+            ordering = [sort_column.desc(), Product.id.desc()]
+
+        # Берём на одну строку больше, чтобы узнать, есть ли следующая страница, без COUNT(*)
+        products = query.order_by(*ordering).limit(limit + 1).all()
+        has_more = len(products) > limit
+        products = products[:limit]
+
+        next_cursor = None
+        if has_more:
+            last = products[-1]
+            next_cursor = encode_cursor([getattr(last, sort_column.key), last.id])
+
+        return {
+            "products": [serialize_product(product) for product in products],
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        }, None
\ No newline at end of file
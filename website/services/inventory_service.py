@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+from collections import defaultdict
+from flask import current_app
+from sqlalchemy import case, delete, insert, select, update
+from website.extensions import db
+from website.models import Product, StockReservation, Order
+from website.services.product_cache import ProductCache
+
+DEFAULT_HOLD_SECONDS = 900
+SWEEP_BATCH_SIZE = 500
+
+
+def _hold_seconds():
+    return current_app.config.get('INVENTORY_HOLD_SECONDS', DEFAULT_HOLD_SECONDS)
+
+
+class InventoryService:
+    @staticmethod
+    def reserve(user_id, quantities, order_id=None, hold_seconds=None):
+        # quantities — {product_id: количество}. Списание всего заказа — один UPDATE с условием
+        # stock >= qty по каждой строке: БД сама проверяет остаток под блокировкой строки,
+        # поэтому параллельные оформления не могут увести остаток в минус.
+        # Работает внутри транзакции вызывающего; commit делает он.
+        quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+        if not quantities:
+            return None, "Нечего резервировать"
+
+        requested = case(quantities, value=Product.id)
+        updated = set(db.session.execute(
+            update(Product)
+            .where(Product.id.in_(list(quantities)), Product.stock >= requested)
+            .values(stock=Product.stock - requested)
+            .returning(Product.id)
+            .execution_options(synchronize_session=False)
+        ).scalars())
+        if len(updated) != len(quantities):
+            # Хотя бы одной позиции не хватило — возвращаем уже списанное, чтобы не оставлять
+            # частичного резерва даже если вызывающий забудет откатить транзакцию
+            if updated:
+                db.session.execute(
+                    update(Product)
+                    .where(Product.id.in_(list(updated)))
+                    .values(stock=Product.stock + requested)
+                    .execution_options(synchronize_session=False)
+                )
+            short_id = min(product_id for product_id in quantities if product_id not in updated)
+            short = db.session.get(Product, short_id)
+            if short is None:
+                return None, "Товар не найден"
+            return None, f"Недостаточно товара на складе: {short.name}"
+
+        expires_at = datetime.utcnow() + timedelta(seconds=hold_seconds or _hold_seconds())
+        rows = [{
+            "order_id": order_id,
+            "user_id": user_id,
+            "product_id": product_id,
+            "quantity": quantity,
+            "status": 'held',
+            "expires_at": expires_at
+        } for product_id, quantity in quantities.items()]
+        db.session.execute(insert(StockReservation), rows)
+        return expires_at, None
+
+    @staticmethod
+    def commit_orders(order_ids):
+        # Оплаченный заказ забирает удержание насовсем: очистка его больше не трогает
+        order_ids = list(order_ids)
+        if not order_ids:
+            return 0
+        result = db.session.execute(
+            update(StockReservation)
+            .where(StockReservation.order_id.in_(order_ids), StockReservation.status == 'held')
+            .values(status='committed')
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    @staticmethod
+    def release_expired(now=None, batch_size=SWEEP_BATCH_SIZE):
+        # Возвращает на склад просроченные удержания пачками и отменяет их неоплаченные заказы.
+        # Пачка захватывается через UPDATE ... RETURNING, поэтому два параллельных
+        # процесса очистки не вернут одно и то же удержание дважды. В конце удаляет
+        # завершённые удержания, чтобы таблица не росла
+        now = now or datetime.utcnow()
+        released_total = 0
+        while True:
+            batch = db.session.query(StockReservation.id).filter(
+                StockReservation.status == 'held',
+                StockReservation.expires_at <= now
+            ).order_by(StockReservation.expires_at).limit(batch_size).subquery()
+
+            claimed = db.session.execute(
+                update(StockReservation)
+                .where(StockReservation.id.in_(select(batch.c.id)), StockReservation.status == 'held')
+                .values(status='released')
+                .returning(StockReservation.product_id, StockReservation.quantity, StockReservation.order_id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            if not claimed:
+                db.session.commit()
+                break
+
+            returned = defaultdict(int)
+            order_ids = set()
+            for product_id, quantity, order_id in claimed:
+                returned[product_id] += quantity
+                if order_id is not None:
+                    order_ids.add(order_id)
+
+            restock = case(dict(returned), value=Product.id)
+            db.session.execute(
+                update(Product)
+                .where(Product.id.in_(list(returned)))
+                .values(stock=Product.stock + restock)
+                .execution_options(synchronize_session=False)
+            )
+            if order_ids:
+                db.session.execute(
+                    update(Order)
+                    .where(Order.id.in_(order_ids), Order.status == 'pending')
+                    .values(status='Отменен')
+                    .execution_options(synchronize_session=False)
+                )
+            db.session.commit()
+
+            ProductCache.invalidate(returned)
+            released_total += len(claimed)
+            if len(claimed) < batch_size:
+                break
+
+        InventoryService.purge_finished(batch_size=batch_size)
+        return released_total
+
+    @staticmethod
+    def purge_finished(batch_size=SWEEP_BATCH_SIZE):
+        # Подтверждённые и возвращённые удержания больше ничего не держат: остаток уже
+        # списан или возвращён, позиции заказа хранит order_items
+        purged_total = 0
+        while True:
+            batch = select(StockReservation.id).where(
+                StockReservation.status.in_(('committed', 'released'))
+            ).limit(batch_size).subquery()
+            purged = db.session.execute(
+                delete(StockReservation)
+                .where(StockReservation.id.in_(select(batch.c.id)))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            purged_total += purged
+            if purged < batch_size:
+                return purged_total
\ No newline at end of file
@@ -1,28 +1,193 @@
-from website.models import Order, CartItem, Product
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import delete, insert, select
+from website.models import CartItem, Order, OrderItem
 from website.extensions import db
+from website.services.cart_service import CartService
+from website.services.cart_store import get_cart_store
+from website.services.inventory_service import InventoryService
+from website.services.product_cache import ProductCache
+from website.utils.cursor_utils import encode_cursor, decode_cursor
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+EXPORT_CHUNK_SIZE = 1000
+ADMIN_ORDER_FIELDS = ['id', 'user_id', 'total_amount', 'status', 'created_at']
+
+
+def parse_order_filters(args):
+    # Фильтры админского списка заказов из query-параметров; возвращает (filters, error)
+    filters = {
+        "status": args.get('status') or None,
+        "user_id": args.get('user_id', type=int),
+        "min_amount": args.get('min_amount', type=float),
+        "max_amount": args.get('max_amount', type=float),
+    }
+    for name in ('created_from', 'created_to'):
+        value = args.get(name)
+        try:
+            filters[name] = datetime.fromisoformat(value) if value else None
+        except ValueError:
+            return None, f"Некорректная дата в {name}, ожидается ISO 8601"
+    if filters['min_amount'] is not None and filters['max_amount'] is not None \
+            and filters['min_amount'] > filters['max_amount']:
+        return None, "Минимальная сумма больше максимальной"
+    return filters, None
+
+
+def _apply_order_filters(query, filters):
+    if filters.get('status'):
+        query = query.where(Order.status == filters['status'])
+    if filters.get('user_id') is not None:
+        query = query.where(Order.user_id == filters['user_id'])
+    if filters.get('min_amount') is not None:
+        query = query.where(Order.total_amount >= filters['min_amount'])
+    if filters.get('max_amount') is not None:
+        query = query.where(Order.total_amount <= filters['max_amount'])
+    if filters.get('created_from') is not None:
+        query = query.where(Order.created_at >= filters['created_from'])
+    if filters.get('created_to') is not None:
+        query = query.where(Order.created_at < filters['created_to'])
+    return query
+
+
+def _admin_order_row(row):
+    row = dict(row)
+    row['created_at'] = row['created_at'].isoformat() if row['created_at'] else None
+    return row
+
+
+def serialize_order(order, items):
+    return {
+        "order_id": order.id,
+        "status": order.status,
+        "total_amount": order.total_amount,
+        "created_at": order.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        "items": [{
+            "product_id": item.product_id,
+            "product_name": item.product_name,
+            "unit_price": item.unit_price,
+            "quantity": item.quantity,
+            "total_price": item.unit_price * item.quantity
+        } for item in items]
+    }
 
 
 class OrderService:
     @staticmethod
     def create_order(user_id):
-        cart_items = CartItem.query.filter_by(user_id=user_id).all()
-        if not cart_items:
+        # Единственный путь оформления: одна транзакция с фиксированным числом запросов
+        # независимо от размера корзины — чтение корзины с итогом (SQL), вставка заказа,
+        # пакетная вставка позиций, условное списание остатков, удаление корзины
+        lines, total_amount = CartService.load_cart(user_id)
+        if not lines:
             return None, "Корзина пуста"
 
-        # Проверка наличия товаров на складе
-        for item in cart_items:
-            product = Product.query.get(item.product_id)
-            if product.stock < item.quantity:
-                return None, f"Недостаточно товара на складе: {product.name}"
+        quantities = defaultdict(int)
+        for line in lines:
+            quantities[line['product_id']] += line['quantity']
 
-        total_amount = sum(item.product.price * item.quantity for item in cart_items)
         order = Order(user_id=user_id, total_amount=total_amount)
         db.session.add(order)
+        db.session.flush()
+        OrderService.add_items(order.id, lines)
 
-        # Уменьшение количества товаров на складе
-        for item in cart_items:
-            product = Product.query.get(item.product_id)
-            product.stock -= item.quantity
+        # Проверка остатков и списание — один условный UPDATE на весь заказ;
+        # удержание живёт до оплаты или до истечения срока
+        _, error = InventoryService.reserve(user_id, quantities, order_id=order.id)
+        if error:
+            db.session.rollback()
+            return None, error
 
+        db.session.execute(
+            delete(CartItem)
+            .where(CartItem.user_id == user_id)
+            .execution_options(synchronize_session=False)
+        )
         db.session.commit()
-        return order, None
\ No newline at end of file
+        get_cart_store().forget(user_id)
+        # Остатки изменились — записи этих товаров в кэше устарели
+        ProductCache.invalidate(quantities)
+        return order, None
+
+    @staticmethod
+    def add_items(order_id, lines):
+        # Снимок корзины в позиции заказа — одна пакетная вставка; commit делает вызывающий
+        db.session.execute(insert(OrderItem), [{
+            "order_id": order_id,
+            "product_id": line['product_id'],
+            "product_name": line['name'],
+            "unit_price": line['price'],
+            "quantity": line['quantity']
+        } for line in lines])
+
+    @staticmethod
+    def list_orders(user_id, limit=None, cursor=None):
+        if limit is None:
+            limit = DEFAULT_PAGE_SIZE
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            return None, f"Размер страницы должен быть от 1 до {MAX_PAGE_SIZE}"
+
+        # Keyset-пагинация по индексу (user_id, id) от новых заказов к старым:
+        # страница стоит одинаково и для первого, и для тысячного заказа
+        query = Order.query.filter(Order.user_id == user_id)
+        if cursor:
+            values = decode_cursor(cursor, (int,))
+            if values is None:
+                return None, "Некорректный курсор"
+            query = query.filter(Order.id < values[0])
+
+        orders = query.order_by(Order.id.desc()).limit(limit + 1).all()
+        has_more = len(orders) > limit
+        orders = orders[:limit]
+
+        # Позиции всех заказов страницы — одним запросом
+        items = defaultdict(list)
+        if orders:
+            for item in OrderItem.query.filter(OrderItem.order_id.in_([order.id for order in orders])) \
+                    .order_by(OrderItem.id):
+                items[item.order_id].append(item)
+
+        return {
+            "orders": [serialize_order(order, items[order.id]) for order in orders],
+            "next_cursor": encode_cursor([orders[-1].id]) if has_more else None,
+            "has_more": has_more
+        }, None
+
+    @staticmethod
+    def admin_list_orders(filters, limit=None, cursor=None):
+        if limit is None:
+            limit = DEFAULT_PAGE_SIZE
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            return None, f"Размер страницы должен быть от 1 до {MAX_PAGE_SIZE}"
+
+        # От новых к старым с курсором по id; фильтры опираются на составные индексы
+        # (status, id), (user_id, id) и (created_at, id)
+        columns = [getattr(Order, field) for field in ADMIN_ORDER_FIELDS]
+        query = _apply_order_filters(select(*columns), filters)
+        if cursor:
+            values = decode_cursor(cursor, (int,))
+            if values is None:
+                return None, "Некорректный курсор"
+            query = query.where(Order.id < values[0])
+
+        rows = db.session.execute(query.order_by(Order.id.desc()).limit(limit + 1)).mappings().all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "orders": [_admin_order_row(row) for row in rows],
+            "next_cursor": encode_cursor([rows[-1]['id']]) if has_more else None,
+            "has_more": has_more
+        }, None
+
+    @staticmethod
+    def export_orders(filters, chunk_size=EXPORT_CHUNK_SIZE):
+        # Потоковая выгрузка как у товаров: драйвер отдаёт строки порциями по chunk_size
+        columns = [getattr(Order, field) for field in ADMIN_ORDER_FIELDS]
+        result = db.session.execute(
+            _apply_order_filters(select(*columns), filters)
+            .order_by(Order.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        for row in result.mappings():
+            yield _admin_order_row(row)
\ No newline at end of file
@@ -0,0 +1,73 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+DEFAULT_MAX_PENDING = 64
+
+
+class PasswordBusyError(Exception):
+    pass
+
+
+class PasswordHasher:
+    # Хэширование паролей вне потока запроса: KDF выполняется в пуле процессов
+    # (GIL не держится, остальные запросы не голодают). Очередь ограничена max_pending:
+    # при всплеске регистраций лишние запросы получают отказ, а не копятся бесконечно.
+    # workers=0 — считать в текущем потоке (тесты, однопроцессные скрипты)
+
+    def __init__(self, method=DEFAULT_METHOD, workers=0, max_pending=DEFAULT_MAX_PENDING):
+        self.method = method
+        self.workers = workers
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._prefix = None
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordBusyError("Слишком много одновременных операций с паролями")
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        if not password_hash:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        # Хэш хранит алгоритм и стоимость перед первым '$'; если они отличаются от
+        # текущих настроек, пароль пересчитывается при следующем успешном входе
+        if self._prefix is None:
+            # Короткие записи вроде 'pbkdf2' werkzeug раскрывает в полные параметры
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_password_hasher():
+    # Один пул на приложение; создаётся при первом обращении
+    hasher = current_app.extensions.get('password_hasher')
+    if hasher is None:
+        config = current_app.config
+        hasher = PasswordHasher(
+            method=config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+            workers=config.get('PASSWORD_HASH_WORKERS', 0),
+            max_pending=config.get('PASSWORD_HASH_MAX_PENDING', DEFAULT_MAX_PENDING)
+        )
+        current_app.extensions['password_hasher'] = hasher
+    return hasher
\ No newline at end of file
@@ -0,0 +1,156 @@
+import random
+import threading
+import time
+import uuid
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PaymentError(Exception):
+    pass
+
+
+class CircuitOpenError(PaymentError):
+    pass
+
+
+class CircuitBreaker:
+    # После failure_threshold подряд неудачных обращений шлюз считается недоступным:
+    # запросы сразу отклоняются reset_timeout секунд, затем пропускается одна пробная попытка
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if self.clock() - self.opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.clock() - self.opened_at < self.reset_timeout or self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+
+class YooKassaClient:
+    # Клиент API платежей: общий пул соединений, таймауты на соединение и чтение,
+    # ограниченные повторы с экспоненциальной задержкой и jitter, предохранитель.
+    # Все повторы одного платежа идут с одним Idempotence-Key, поэтому шлюз не создаст дубль
+
+    def __init__(self, api_url, shop_id, secret_key, connect_timeout=3.05, read_timeout=10,
+                 max_retries=2, backoff=0.2, max_backoff=2.0, pool_size=20, breaker=None):
+        self.api_url = api_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        self.session.auth = (shop_id or '', secret_key or '')
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def create_payment(self, payment_data, idempotence_key=None):
+        return self._request('POST', '/payments', payment_data, idempotence_key or str(uuid.uuid4()))
+
+    def get_payment(self, payment_id):
+        return self._request('GET', f'/payments/{payment_id}')
+
+    def _request(self, method, path, payload=None, idempotence_key=None):
+        if not self.breaker.allow():
+            raise CircuitOpenError("Платёжный шлюз временно недоступен")
+
+        headers = {"Idempotence-Key": idempotence_key} if idempotence_key else {}
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, f"{self.api_url}{path}", json=payload,
+                                                headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = PaymentError(f"Платёжный шлюз не ответил: {e.__class__.__name__}")
+            else:
+                if response.status_code < 400:
+                    try:
+                        data = response.json()
+                    except ValueError:
+                        # 2xx не от шлюза (прокси, страница ошибки): повторять POST нельзя — платёж
+                        # мог быть создан, повтор с тем же ключом сделает вызывающий
+                        self.breaker.record_failure()
+                        raise PaymentError("Платёжный шлюз вернул ответ не в JSON")
+                    if not isinstance(data, dict) or not data.get('id'):
+                        self.breaker.record_failure()
+                        raise PaymentError("Платёжный шлюз вернул ответ без id платежа")
+                    self.breaker.record_success()
+                    return data
+                error = PaymentError(f"Платёжный шлюз вернул {response.status_code}")
+                if response.status_code not in RETRY_STATUSES:
+                    # Ошибка в самом запросе: повтор не поможет, и шлюз при этом исправен
+                    self.breaker.record_success()
+                    raise error
+
+            if attempt < self.max_retries:
+                # Full jitter: клиенты не повторяют запросы синхронно после общего сбоя
+                time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+        self.breaker.record_failure()
+        raise error
+
+
+def confirmation_url(payment):
+    # Ссылка на оплату из ответа шлюза; без неё платёж для покупателя бесполезен
+    confirmation = payment.get('confirmation')
+    url = confirmation.get('confirmation_url') if isinstance(confirmation, dict) else None
+    if not url:
+        raise PaymentError("Платёжный шлюз вернул платёж без ссылки на оплату")
+    return url
+
+
+def get_payment_client():
+    # Один клиент (и пул соединений) на приложение
+    client = current_app.extensions.get('payment_client')
+    if client is None:
+        config = current_app.config
+        client = YooKassaClient(
+            config.get('YOOKASSA_API_URL', 'https://api.yookassa.ru/v3'),
+            config.get('YOOKASSA_SHOP_ID'),
+            config.get('YOOKASSA_SECRET_KEY'),
+            connect_timeout=config.get('PAYMENT_CONNECT_TIMEOUT', 3.05),
+            read_timeout=config.get('PAYMENT_READ_TIMEOUT', 10),
+            max_retries=config.get('PAYMENT_MAX_RETRIES', 2),
+            pool_size=config.get('PAYMENT_POOL_SIZE', 20),
+            breaker=CircuitBreaker(config.get('PAYMENT_BREAKER_THRESHOLD', 5),
+                                   config.get('PAYMENT_BREAKER_RESET', 30))
+        )
+        current_app.extensions['payment_client'] = client
+    return client
\ No newline at end of file
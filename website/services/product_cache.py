@@ -0,0 +1,190 @@
+import hashlib
+import json
+import threading
+import time
+from website.extensions import cache
+from website.models import Product
+from website.services.catalog_service import serialize_product
+
+# Версия формата записей входит в ключ: после изменения сериализации старые записи
+# просто перестают находиться и вытесняются по TTL
+CACHE_SCHEMA_VERSION = 1
+PRODUCT_TIMEOUT = 3600
+CATALOG_TIMEOUT = 600
+
+GENERATION_KEY = f'catalog:v{CACHE_SCHEMA_VERSION}:generation'
+PROCESS_CACHE_TYPES = ('SimpleCache', 'simple')
+
+
+def _generation_key(product_id):
+    return f'product:v{CACHE_SCHEMA_VERSION}:{product_id}:generation'
+
+
+def _product_key(product_id, generation):
+    return f'product:v{CACHE_SCHEMA_VERSION}:{product_id}:g{generation}'
+
+
+class CacheStats:
+    # Счётчики на процесс: обращения к ним не должны стоить сетевого round trip до кэша
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.sets = 0
+            self.invalidations = 0
+
+    def record(self, hits=0, misses=0, sets=0, invalidations=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.sets += sets
+            self.invalidations += invalidations
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            data = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "sets": self.sets,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None
+            }
+        data.update(_backend_stats())
+        return data
+
+
+stats = CacheStats()
+
+
+def _backend_stats():
+    # Вытеснения считает сам бэкенд: Redis отдаёт их в INFO, SimpleCache — только размер и порог
+    backend = cache.cache
+    client = getattr(backend, '_write_client', None)
+    if client is not None and hasattr(client, 'info'):
+        try:
+            info = client.info('stats')
+        except Exception:
+            return {"evictions": None}
+        return {"evictions": info.get('evicted_keys'), "expirations": info.get('expired_keys')}
+    if hasattr(backend, '_cache') and hasattr(backend, '_threshold'):
+        return {"evictions": None, "size": len(backend._cache), "threshold": backend._threshold}
+    return {"evictions": None}
+
+
+def _current_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Поколение потеряно (рестарт или вытеснение): начинаем новое от текущего времени,
+        # чтобы не переиспользовать страницы, оставшиеся от старого поколения
+        generation = time.time_ns()
+        if not cache.add(GENERATION_KEY, generation, timeout=0):
+            generation = cache.get(GENERATION_KEY) or generation
+    return generation
+
+
+def _generations(product_ids, created=None):
+    # {product_id: поколение} одним get_many; потерянные поколения начинаются заново, как у каталога.
+    # В created попадают товары, чьё поколение заведено этим вызовом
+    keys = [_generation_key(product_id) for product_id in product_ids]
+    generations = {}
+    for product_id, key, generation in zip(product_ids, keys, cache.get_many(*keys)):
+        if generation is None:
+            generation = time.time_ns()
+            if cache.add(key, generation, timeout=0):
+                if created is not None:
+                    created.add(product_id)
+            else:
+                generation = cache.get(key) or generation
+        generations[product_id] = generation
+    return generations
+
+
+def init_product_cache(app):
+    # Инвалидация — это смена поколений в кэше. Кэш в памяти процесса её другим воркерам
+    # не передаёт, и они отдавали бы устаревшие товары до PRODUCT_TIMEOUT
+    if app.config.get('CACHE_TYPE') in PROCESS_CACHE_TYPES and not (app.config.get('TESTING') or app.debug):
+        raise RuntimeError("Кэшу товаров нужен общий бэкенд: задайте USE_REDIS=True")
+
+
+class ProductCache:
+    @staticmethod
+    def get_product(product_id):
+        return ProductCache.get_products([product_id]).get(product_id)
+
+    @staticmethod
+    def get_products(product_ids):
+        # Пакетное чтение: get_many поколений, get_many записей и один IN-запрос на промахи.
+        # Запись кладётся под поколением, прочитанным до запроса к БД: если товар изменили
+        # или удалили в это время, invalidate уже сменил поколение и устаревшая запись недостижима
+        product_ids = list(dict.fromkeys(product_ids))
+        if not product_ids:
+            return {}
+
+        keys = {product_id: _product_key(product_id, generation)
+                for product_id, generation in _generations(product_ids).items()}
+        cached = cache.get_many(*keys.values())
+        result = {product_id: data for product_id, data in zip(keys, cached) if data is not None}
+
+        missing = [product_id for product_id in product_ids if product_id not in result]
+        stats.record(hits=len(result), misses=len(missing))
+        if missing:
+            loaded = {product.id: serialize_product(product)
+                      for product in Product.query.filter(Product.id.in_(missing)).all()}
+            if loaded:
+                cache.set_many({keys[product_id]: data for product_id, data in loaded.items()},
+                               timeout=PRODUCT_TIMEOUT)
+                stats.record(sets=len(loaded))
+            result.update(loaded)
+        return result
+
+    @staticmethod
+    def get_catalog_page(params, loader):
+        # Поколение каталога меняется только при правке товаров админом или импортом (состав
+        # и порядок страниц). Остатки меняются при каждом заказе — поэтому страница хранится
+        # с поколениями своих товаров и годится, пока ни одно из них не сменилось
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        key = f'catalog:v{CACHE_SCHEMA_VERSION}:g{_current_generation()}:{digest}'
+        entry = cache.get(key)
+        if entry is not None:
+            page, generations = entry
+            if _generations(list(generations)) == generations:
+                stats.record(hits=1)
+                return page, None
+
+        stats.record(misses=1)
+        started = time.time_ns()
+        page, error = loader()
+        if error is None:
+            created = set()
+            generations = _generations([product['id'] for product in page['products']], created)
+            # Поколение, сменившееся во время запроса к БД, могло не попасть в страницу — такая не кэшируется
+            if all(generation < started for product_id, generation in generations.items() if product_id not in created):
+                cache.set(key, (page, generations), timeout=CATALOG_TIMEOUT)
+                stats.record(sets=1)
+        return page, error
+
+    @staticmethod
+    def generation():
+        # Меняется при изменении состава каталога — вместе с generations годится для ETag
+        return _current_generation()
+
+    @staticmethod
+    def generations(product_ids):
+        return _generations(list(dict.fromkeys(product_ids)))
+
+    @staticmethod
+    def invalidate(product_ids, catalog=False):
+        # Вызывается после commit изменений товаров. catalog=True — изменились поля, от которых
+        # зависят состав и порядок страниц каталога (правка админом, импорт), а не только остатки
+        product_ids = list(product_ids)
+        if product_ids:
+            generation = time.time_ns()
+            cache.set_many({_generation_key(product_id): generation for product_id in product_ids}, timeout=0)
+        if catalog:
+            cache.set(GENERATION_KEY, time.time_ns(), timeout=0)
+        stats.record(invalidations=max(len(product_ids), 1))
\ No newline at end of file
@@ -0,0 +1,206 @@
+import math
+from sqlalchemy import insert, select, text, update
+from website.extensions import db
+from website.models import Product
+from website.services.product_cache import ProductCache
+from website.services.search_service import SearchService
+
+IMPORT_CHUNK_SIZE = 1000
+EXPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+MAX_INTEGER = 2 ** 31 - 1  # INTEGER в PostgreSQL
+
+EXPORT_FIELDS = ['id', 'name', 'price', 'description', 'stock', 'image_url']
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _integer(value):
+    # int() молча принимает True и обрезает 2.7 до 2 — такие значения из NDJSON отклоняются
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(value)
+    return int(value)
+
+
+def validate_product_row(row):
+    # Приводит строку импорта (из CSV все значения приходят строками) к полям Product
+    data = {}
+
+    if not _blank(row.get('id')):
+        try:
+            data['id'] = _integer(row['id'])
+        except (TypeError, ValueError):
+            return None, "Некорректный id"
+        if not 1 <= data['id'] <= MAX_INTEGER:
+            return None, "Некорректный id"
+
+    name = row.get('name')
+    if _blank(name) or not isinstance(name, str):
+        return None, "Необходимо указать название"
+    if len(name) > 100:
+        return None, "Название длиннее 100 символов"
+    data['name'] = name.strip()
+
+    price = row.get('price')
+    try:
+        data['price'] = float(price)
+    except (TypeError, ValueError):
+        return None, "Некорректная цена"
+    if isinstance(price, bool) or not math.isfinite(data['price']):
+        return None, "Некорректная цена"
+    if data['price'] < 0:
+        return None, "Цена должна быть положительной"
+
+    stock = row.get('stock')
+    try:
+        data['stock'] = 0 if _blank(stock) else _integer(stock)
+    except (TypeError, ValueError):
+        return None, "Некорректное количество на складе"
+    if data['stock'] < 0:
+        return None, "Количество не может быть отрицательным"
+    if data['stock'] > MAX_INTEGER:
+        return None, "Некорректное количество на складе"
+
+    # В NDJSON поля могут прийти числами, списками и т.п.
+    description = row.get('description')
+    if description is None:
+        description = ''
+    if not isinstance(description, str):
+        return None, "Некорректное описание"
+    data['description'] = description
+    image_url = row.get('image_url')
+    if image_url is None:
+        image_url = ''
+    if not isinstance(image_url, str):
+        return None, "Некорректная ссылка на изображение"
+    if len(image_url) > 200:
+        return None, "Ссылка на изображение длиннее 200 символов"
+    data['image_url'] = image_url
+    return data, None
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line_no, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_no, "error": message})
+
+    def to_dict(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+
+class ProductIOService:
+    @staticmethod
+    def import_rows(rows, chunk_size=IMPORT_CHUNK_SIZE):
+        # rows — итератор (номер строки, словарь, ошибка разбора); в памяти держится один чанк
+        report = ImportReport()
+        chunk = []
+        for line_no, row, error in rows:
+            if error:
+                report.error(line_no, error)
+                continue
+            data, error = validate_product_row(row)
+            if error:
+                report.error(line_no, error)
+                continue
+            chunk.append((line_no, data))
+            if len(chunk) >= chunk_size:
+                ProductIOService._apply_chunk(chunk, report)
+                chunk = []
+        if chunk:
+            ProductIOService._apply_chunk(chunk, report)
+        return report
+
+    @staticmethod
+    def _apply_chunk(chunk, report):
+        # Последняя строка с одинаковым id побеждает, как при построчной загрузке
+        by_id = {}
+        new_rows = []
+        for line_no, data in chunk:
+            if 'id' in data:
+                by_id[data['id']] = (line_no, data)
+            else:
+                new_rows.append((line_no, data))
+        rows = list(by_id.values()) + new_rows
+
+        try:
+            created, updated = ProductIOService._write([data for _, data in rows])
+        except Exception:
+            db.session.rollback()
+            # Пачка не записалась — строки повторяются по одной, чтобы сохранить остальные
+            # и указать в отчёте ту строку, на которой упала БД
+            created = updated = 0
+            for line_no, data in rows:
+                try:
+                    row_created, row_updated = ProductIOService._write([data])
+                except Exception as e:
+                    db.session.rollback()
+                    report.error(line_no, f"Ошибка записи в БД: {e.__class__.__name__}")
+                    continue
+                created += row_created
+                updated += row_updated
+
+        report.created += created
+        report.updated += updated
+
+    @staticmethod
+    def _write(rows):
+        existing = set()
+        ids = [data['id'] for data in rows if 'id' in data]
+        if ids:
+            existing = set(db.session.execute(
+                select(Product.id).where(Product.id.in_(ids))
+            ).scalars())
+        updates = [data for data in rows if data.get('id') in existing]
+        explicit = [data for data in rows if 'id' in data and data['id'] not in existing]
+        new_rows = [data for data in rows if 'id' not in data]
+
+        touched = list(existing)
+        if updates:
+            db.session.execute(update(Product), updates)
+        if explicit:
+            touched += db.session.execute(insert(Product).returning(Product.id), explicit).scalars().all()
+            ProductIOService._advance_id_sequence(max(data['id'] for data in explicit))
+        if new_rows:
+            touched += db.session.execute(insert(Product).returning(Product.id), new_rows).scalars().all()
+
+        SearchService.reindex(touched)
+        db.session.commit()
+        ProductCache.invalidate(touched, catalog=True)
+        return len(explicit) + len(new_rows), len(updates)
+
+    @staticmethod
+    def _advance_id_sequence(max_id):
+        # Явные id не двигают последовательность PostgreSQL — без этого следующий товар
+        # без id получил бы уже занятый ключ. SQLite берёт MAX(rowid) сам
+        if db.engine.dialect.name != 'postgresql':
+            return
+        db.session.execute(text(
+            "SELECT setval(seq, :max_id) "
+            "FROM (SELECT pg_get_serial_sequence('products', 'id')::regclass AS seq) AS s "
+            "WHERE :max_id > COALESCE(pg_sequence_last_value(seq), 0)"
+        ), {"max_id": max_id})
+
+    @staticmethod
+    def export_rows(chunk_size=EXPORT_CHUNK_SIZE):
+        # Потоковая выборка: драйвер отдаёт строки порциями по chunk_size, ORM-объекты не создаются
+        columns = [getattr(Product, field) for field in EXPORT_FIELDS]
+        result = db.session.execute(
+            select(*columns).order_by(Product.id).execution_options(yield_per=chunk_size)
+        )
+        for row in result.mappings():
+            yield dict(row)
\ No newline at end of file
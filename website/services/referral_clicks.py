@@ -0,0 +1,182 @@
+import re
+import threading
+import uuid
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from website.extensions import db
+from website.models import ReferralClick, User
+
+CODE_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,32}')
+DEFAULT_MAX_CODES = 100_000
+LOOKUP_CHUNK = 500
+
+
+class MemoryClickCounter:
+    # Счётчики переходов в памяти процесса: переход — увеличение значения в словаре,
+    # без обращения к БД. drain забирает накопленное целиком, подменяя словарь.
+    # Число разных кодов ограничено: переходы по новым кодам сверх предела отбрасываются
+
+    def __init__(self, max_codes=DEFAULT_MAX_CODES):
+        self.max_codes = max_codes
+        self.dropped = 0
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def incr(self, code, amount=1):
+        with self._lock:
+            if code in self._counts:
+                self._counts[code] += amount
+            elif len(self._counts) < self.max_codes:
+                self._counts[code] = amount
+            else:
+                self.dropped += amount
+                return False
+        return True
+
+    def pending(self, code):
+        with self._lock:
+            return self._counts.get(code, 0)
+
+    def drain(self):
+        with self._lock:
+            counts, self._counts = self._counts, {}
+        return counts
+
+    def restore(self, counts):
+        # Перенос не удался — дельты возвращаются и уйдут следующим проходом
+        for code, amount in counts.items():
+            self.incr(code, amount)
+
+
+class RedisClickCounter:
+    # Счётчики в общем хэше Redis (HINCRBY) — для нескольких процессов и узлов.
+    # drain переименовывает хэш, поэтому переходы во время переноса не теряются
+    KEY = 'referral:clicks'
+
+    def __init__(self, client):
+        self.client = client
+        self.dropped = 0
+        self.recover()
+
+    def incr(self, code, amount=1):
+        self.client.hincrby(self.KEY, code, amount)
+        return True
+
+    def pending(self, code):
+        return int(self.client.hget(self.KEY, code) or 0)
+
+    def drain(self):
+        # Переименование, чтение и удаление — одна транзакция MULTI/EXEC: процесс, упавший
+        # между командами, не оставит ключ :flushing:, который никто не прочитает
+        flushing = f'{self.KEY}:flushing:{uuid.uuid4().hex}'
+        pipe = self.client.pipeline()
+        pipe.rename(self.KEY, flushing)
+        pipe.hgetall(flushing)
+        pipe.delete(flushing)
+        renamed, counts, _ = pipe.execute(raise_on_error=False)
+        if isinstance(renamed, Exception):
+            return {}  # Ключа нет — переходов не было
+        return {code: int(amount) for code, amount in counts.items()}
+
+    def recover(self):
+        # При старте: ключи :flushing:, оставшиеся от упавшего процесса (прежний drain
+        # переименовывал и читал хэш отдельными командами), возвращаются в основной хэш.
+        # WATCH не даёт двум стартующим процессам вернуть один ключ дважды
+        for key in self.client.scan_iter(match=f'{self.KEY}:flushing:*'):
+            def merge(pipe, key=key):
+                counts = pipe.hgetall(key)
+                pipe.multi()
+                for code, amount in counts.items():
+                    pipe.hincrby(self.KEY, code, int(amount))
+                pipe.delete(key)
+
+            self.client.transaction(merge, key)
+
+    def restore(self, counts):
+        pipe = self.client.pipeline()
+        for code, amount in counts.items():
+            pipe.hincrby(self.KEY, code, amount)
+        pipe.execute()
+
+
+def get_click_counter():
+    counter = current_app.extensions.get('referral_clicks')
+    if counter is None:
+        redis_url = current_app.config.get('REFERRAL_CLICK_REDIS_URL')
+        if redis_url:
+            import redis
+            counter = RedisClickCounter(redis.Redis.from_url(redis_url, decode_responses=True))
+        else:
+            counter = MemoryClickCounter(current_app.config.get('REFERRAL_CLICK_MAX_CODES', DEFAULT_MAX_CODES))
+        current_app.extensions['referral_clicks'] = counter
+    return counter
+
+
+class ReferralClickService:
+    @staticmethod
+    def track(referral_code):
+        # Учёт перехода — только счётчик; существование кода проверяется при переносе,
+        # здесь отсекаются строки, которые кодом быть не могут
+        if not referral_code or not CODE_PATTERN.fullmatch(referral_code):
+            return None, "Неверный реферальный код"
+        get_click_counter().incr(referral_code)
+        return True, None
+
+    @staticmethod
+    def flush(now=None):
+        # Накопленные дельты переносятся в referral_clicks: коды сопоставляются с пользователями
+        # пачками по LOOKUP_CHUNK, строки за день пишутся одним upsert, прибавляющим дельту
+        counter = get_click_counter()
+        counts = counter.drain()
+        report = {"codes": 0, "clicks": 0, "unknown": 0}
+        if not counts:
+            return report
+
+        now = now or datetime.utcnow()
+        try:
+            codes = list(counts)
+            owners = {}
+            for start in range(0, len(codes), LOOKUP_CHUNK):
+                owners.update(db.session.execute(
+                    select(User.referral_code, User.id).where(User.referral_code.in_(codes[start:start + LOOKUP_CHUNK]))
+                ).all())
+            rows = [{"referral_code": code, "day": now.date(), "user_id": owners[code], "clicks": amount,
+                     "updated_at": now} for code, amount in counts.items() if code in owners]
+            if rows:
+                insert_ = pg_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+                statement = insert_(ReferralClick)
+                db.session.execute(statement.on_conflict_do_update(
+                    index_elements=['referral_code', 'day'],
+                    set_={
+                        "clicks": ReferralClick.__table__.c.clicks + statement.excluded.clicks,
+                        "updated_at": statement.excluded.updated_at
+                    }
+                ), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            counter.restore(counts)
+            raise
+
+        report["codes"] = len(rows)
+        report["clicks"] = sum(row["clicks"] for row in rows)
+        report["unknown"] = sum(amount for code, amount in counts.items() if code not in owners)
+        return report
+
+    @staticmethod
+    def clicks(referral_code, since=None):
+        # Переходы по коду: записанные в БД (по первичному ключу) плюс ещё не перенесённые
+        query = select(func.coalesce(func.sum(ReferralClick.clicks), 0)).where(
+            ReferralClick.referral_code == referral_code)
+        if since is not None:
+            query = query.where(ReferralClick.day >= since)
+        return db.session.execute(query).scalar() + get_click_counter().pending(referral_code)
+
+    @staticmethod
+    def clicks_for_user(user_id):
+        return db.session.execute(
+            select(func.coalesce(func.sum(ReferralClick.clicks), 0)).where(ReferralClick.user_id == user_id)
+        ).scalar()
\ No newline at end of file
@@ -0,0 +1,176 @@
+from datetime import datetime
+from sqlalchemy import case, delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from website.extensions import db
+from website.models import Referral, ReferralStats, User
+from website.services.bonus_service import to_minor
+
+MAX_DEPTH = 1000  # Предел рекурсии на случай цикла в исторических данных
+DEFAULT_TREE_DEPTH = 3
+MAX_TREE_ROWS = 1000
+
+
+def _ancestors(user_id):
+    # user_id и все его вышестоящие рефереры с расстоянием: рекурсивный CTE вверх по referred_user_id
+    chain = select(literal(user_id).label('user_id'), literal(0).label('distance')).cte('ancestors', recursive=True)
+    chain = chain.union_all(
+        select(Referral.referrer_id, chain.c.distance + 1)
+        .select_from(chain)
+        .join(Referral, Referral.referred_user_id == chain.c.user_id)
+        .where(chain.c.distance < MAX_DEPTH)
+    )
+    return db.session.execute(select(chain.c.user_id, chain.c.distance).order_by(chain.c.distance)).all()
+
+
+def _already_referred(user_id):
+    return db.session.execute(select(Referral.id).where(Referral.referred_user_id == user_id)).first() is not None
+
+
+def _upsert_stats(rows):
+    insert_ = pg_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+    statement = insert_(ReferralStats)
+    current, added = ReferralStats.__table__.c, statement.excluded
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={
+            "direct_count": current.direct_count + added.direct_count,
+            "total_count": current.total_count + added.total_count,
+            "levels": case((added.levels > current.levels, added.levels), else_=current.levels),
+            "bonus_earned_minor": current.bonus_earned_minor + added.bonus_earned_minor,
+            "updated_at": added.updated_at
+        }
+    ), rows)
+
+
+def serialize_stats(user_id, stats):
+    direct = stats.direct_count if stats else 0
+    total = stats.total_count if stats else 0
+    return {
+        "user_id": user_id,
+        "direct": direct,
+        "indirect": total - direct,
+        "total": total,
+        "levels": stats.levels if stats else 0,
+        "bonus_earned": (stats.bonus_earned_minor if stats else 0) / 100
+    }
+
+
+class ReferralService:
+    @staticmethod
+    def add_referral(referrer_id, referred_user_id, bonus_amount=0):
+        # Новое ребро дерева и инкрементальное обновление агрегатов всех вышестоящих:
+        # один рекурсивный запрос за цепочкой и один upsert на всю цепочку
+        if referrer_id == referred_user_id:
+            return None, "Нельзя пригласить самого себя"
+        if _already_referred(referred_user_id):
+            return None, "Пользователь уже приглашён"
+        chain = _ancestors(referrer_id)
+        if any(row.user_id == referred_user_id for row in chain):
+            return None, "Циклическая реферальная связь"
+
+        referral = Referral(referrer_id=referrer_id, referred_user_id=referred_user_id, bonus_amount=bonus_amount)
+        try:
+            # Проверка выше не защищает от параллельной регистрации того же приглашённого:
+            # вторую вставку отвергает уникальный индекс, и агрегаты не меняются
+            with db.session.begin_nested():
+                db.session.add(referral)
+                db.session.flush()
+                db.session.execute(
+                    update(User).where(User.id == referred_user_id).values(referrer_id=referrer_id)
+                    .execution_options(synchronize_session=False)
+                )
+
+                # Приглашённый мог уже иметь своё поддерево — оно переходит к вышестоящим целиком
+                below = db.session.get(ReferralStats, referred_user_id)
+                subtree, sublevels = (below.total_count, below.levels) if below else (0, 0)
+                now = datetime.utcnow()
+                _upsert_stats([{
+                    "user_id": row.user_id,
+                    "direct_count": 1 if row.distance == 0 else 0,
+                    "total_count": 1 + subtree,
+                    "levels": row.distance + 1 + sublevels,
+                    "bonus_earned_minor": to_minor(bonus_amount) if row.distance == 0 else 0,
+                    "updated_at": now
+                } for row in chain])
+        except IntegrityError:
+            if _already_referred(referred_user_id):
+                return None, "Пользователь уже приглашён"
+            raise
+        db.session.commit()
+        return referral, None
+
+    @staticmethod
+    def add_referral_by_code(referral_code, referred_user_id, bonus_amount=0):
+        referrer_id = db.session.execute(select(User.id).where(User.referral_code == referral_code)).scalar()
+        if referrer_id is None:
+            return None, "Реферальный код не найден"
+        return ReferralService.add_referral(referrer_id, referred_user_id, bonus_amount)
+
+    @staticmethod
+    def get_stats(user_id):
+        # Одно чтение по первичному ключу, независимо от размера и глубины дерева
+        return serialize_stats(user_id, db.session.get(ReferralStats, user_id))
+
+    @staticmethod
+    def top(limit=50):
+        rows = db.session.execute(
+            select(ReferralStats).order_by(ReferralStats.total_count.desc(), ReferralStats.user_id.desc())
+            .limit(max(1, min(limit, 500)))
+        ).scalars().all()
+        return [serialize_stats(row.user_id, row) for row in rows]
+
+    @staticmethod
+    def subtree(user_id, depth=DEFAULT_TREE_DEPTH, limit=MAX_TREE_ROWS):
+        # Поддерево до заданной глубины рекурсивным CTE вниз по referrer_id; стоимость
+        # ограничена глубиной и limit, а не всем деревом
+        depth = max(1, min(depth, MAX_DEPTH))
+        tree = select(Referral.referred_user_id.label('user_id'), Referral.referrer_id.label('parent_id'),
+                      literal(1).label('level')).where(Referral.referrer_id == user_id).cte('subtree', recursive=True)
+        tree = tree.union_all(
+            select(Referral.referred_user_id, Referral.referrer_id, tree.c.level + 1)
+            .select_from(tree)
+            .join(Referral, Referral.referrer_id == tree.c.user_id)
+            .where(tree.c.level < depth)
+        )
+        rows = db.session.execute(
+            select(tree.c.user_id, tree.c.parent_id, tree.c.level, User.login)
+            .join(User, User.id == tree.c.user_id)
+            .order_by(tree.c.level, tree.c.user_id).limit(max(1, min(limit, MAX_TREE_ROWS)))
+        ).all()
+        return [{"user_id": row.user_id, "parent_id": row.parent_id, "level": row.level, "login": row.login}
+                for row in rows]
+
+    @staticmethod
+    def rebuild_stats():
+        # Полный пересчёт агрегатов из referrals (заполнение, исправление после ручных правок):
+        # замыкание дерева рекурсивным CTE и группировка по предку — без обхода в Python
+        closure = select(Referral.referrer_id.label('ancestor'), Referral.referred_user_id.label('descendant'),
+                         literal(1).label('depth')).cte('closure', recursive=True)
+        closure = closure.union_all(
+            select(closure.c.ancestor, Referral.referred_user_id, closure.c.depth + 1)
+            .select_from(closure)
+            .join(Referral, Referral.referrer_id == closure.c.descendant)
+            .where(closure.c.depth < MAX_DEPTH)
+        )
+        bonuses = select(
+            Referral.referrer_id.label('user_id'),
+            func.sum(func.round(Referral.bonus_amount * 100)).label('bonus_minor')
+        ).group_by(Referral.referrer_id).subquery()
+        aggregates = select(
+            closure.c.ancestor,
+            func.sum(case((closure.c.depth == 1, 1), else_=0)),
+            func.count(),
+            func.max(closure.c.depth),
+            func.coalesce(func.max(bonuses.c.bonus_minor), 0),
+            literal(datetime.utcnow())
+        ).select_from(closure).join(bonuses, bonuses.c.user_id == closure.c.ancestor).group_by(closure.c.ancestor)
+
+        db.session.execute(delete(ReferralStats))
+        db.session.execute(insert(ReferralStats).from_select(
+            ['user_id', 'direct_count', 'total_count', 'levels', 'bonus_earned_minor', 'updated_at'], aggregates
+        ))
+        users = db.session.execute(select(func.count()).select_from(ReferralStats)).scalar()
+        db.session.commit()
+        return {"users": users}, None
\ No newline at end of file
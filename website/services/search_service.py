@@ -0,0 +1,156 @@
+import re
+from sqlalchemy import DDL, bindparam, event, text
+from website.extensions import db
+from website.models import Product
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_PAGE = 50  # Смещение растёт со страницей — дальние страницы бессмысленны и дороги
+MAX_QUERY_TERMS = 8
+MAX_PREFIX_LENGTH = 8  # Длиннее индекса префиксов слово обрезается
+
+# SQLite: отдельная FTS5-таблица, rowid которой совпадает с products.id.
+# prefix строит индексы префиксов: без них запрос "ноутбук*" сливает списки документов всех слов
+# с этим префиксом целиком, и частое слово стоит миллисекунды ещё до LIMIT
+SQLITE_CREATE_INDEX = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "name, description, tokenize='unicode61 remove_diacritics 2', prefix='1 2 3 4 5 6 7 8')",
+]
+SQLITE_DROP_INDEX = ["DROP TABLE IF EXISTS products_fts"]
+
+# Postgres: генерируемая tsvector-колонка обновляется самой БД, GIN-индекс обслуживает @@
+POSTGRES_CREATE_INDEX = [
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)",
+]
+
+for statement in SQLITE_CREATE_INDEX:
+    event.listen(Product.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in SQLITE_DROP_INDEX:
+    event.listen(Product.__table__, 'before_drop', DDL(statement).execute_if(dialect='sqlite'))
+for statement in POSTGRES_CREATE_INDEX:
+    event.listen(Product.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+SQLITE_DELETE = text("DELETE FROM products_fts WHERE rowid IN :ids").bindparams(
+    bindparam('ids', expanding=True))
+SQLITE_INSERT = text(
+    "INSERT INTO products_fts (rowid, name, description) "
+    "SELECT id, name, coalesce(description, '') FROM products WHERE id IN :ids"
+).bindparams(bindparam('ids', expanding=True))
+
+# Ранжирование без оценки по всем совпадениям: сначала товары, у которых все слова есть в названии,
+# затем остальные, внутри групп — новые выше. Обе группы читаются из индекса в порядке rowid,
+# поэтому LIMIT останавливает чтение, а не сортирует всё множество совпадений (bm25 по
+# широкому префиксу считался для большей части каталога)
+SQLITE_SEARCH = text(
+    "SELECT p.id, p.name, p.price, p.description, p.stock, p.image_url "
+    "FROM (SELECT 0 AS tier, id FROM (SELECT rowid AS id FROM products_fts "
+    "                                 WHERE products_fts MATCH :name_query ORDER BY rowid DESC) "
+    "      UNION ALL "
+    "      SELECT 1, id FROM (SELECT rowid AS id FROM products_fts "
+    "                         WHERE products_fts MATCH :other_query ORDER BY rowid DESC) "
+    "      LIMIT :limit OFFSET :offset) hits "
+    "JOIN products p ON p.id = hits.id "
+    "ORDER BY hits.tier, p.id DESC"
+)
+
+# Postgres: то же правило; совпадение в названии — слова с весом A в search_vector
+POSTGRES_SEARCH = text(
+    "SELECT p.id, p.name, p.price, p.description, p.stock, p.image_url "
+    "FROM products p, to_tsquery('simple', :query) query, to_tsquery('simple', :name_query) name_query "
+    "WHERE p.search_vector @@ query "
+    "ORDER BY p.search_vector @@ name_query DESC, p.id DESC LIMIT :limit OFFSET :offset"
+)
+
+
+def _dialect():
+    return db.engine.dialect.name
+
+
+def _terms(query):
+    return [term[:MAX_PREFIX_LENGTH] for term in re.findall(r'\w+', query.lower())[:MAX_QUERY_TERMS]]
+
+
+class SearchService:
+    @staticmethod
+    def ensure_index():
+        # Для уже существующей таблицы products событие after_create не срабатывает,
+        # поэтому индекс создаётся и заполняется здесь при старте приложения
+        dialect = _dialect()
+        if dialect == 'sqlite':
+            # Индекс со старым определением (другие префиксы) пересоздаётся
+            current = db.session.execute(text(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+            )).scalar()
+            expected = SQLITE_CREATE_INDEX[0].replace(' IF NOT EXISTS', '')
+            if current != expected:
+                for statement in SQLITE_DROP_INDEX + SQLITE_CREATE_INDEX:
+                    db.session.execute(text(statement))
+                SearchService.rebuild_index()
+        elif dialect == 'postgresql':
+            for statement in POSTGRES_CREATE_INDEX:
+                db.session.execute(text(statement))
+        db.session.commit()
+
+    @staticmethod
+    def rebuild_index():
+        if _dialect() != 'sqlite':
+            return
+        db.session.execute(text("DELETE FROM products_fts"))
+        db.session.execute(text(
+            "INSERT INTO products_fts (rowid, name, description) "
+            "SELECT id, name, coalesce(description, '') FROM products"
+        ))
+
+    @staticmethod
+    def reindex(product_ids):
+        # Вызывается внутри транзакции изменения товара, до commit
+        if _dialect() != 'sqlite' or not product_ids:
+            return
+        db.session.flush()
+        params = {"ids": list(product_ids)}
+        db.session.execute(SQLITE_DELETE, params)
+        db.session.execute(SQLITE_INSERT, params)
+
+    @staticmethod
+    def remove(product_ids):
+        if _dialect() != 'sqlite' or not product_ids:
+            return
+        db.session.execute(SQLITE_DELETE, {"ids": list(product_ids)})
+
+    @staticmethod
+    def search(query, page=1, limit=None):
+        if limit is None:
+            limit = DEFAULT_PAGE_SIZE
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            return None, f"Размер страницы должен быть от 1 до {MAX_PAGE_SIZE}"
+        if page < 1 or page > MAX_PAGE:
+            return None, f"Номер страницы должен быть от 1 до {MAX_PAGE}"
+
+        terms = _terms(query or '')
+        if not terms:
+            return None, "Пустой поисковый запрос"
+
+        # Каждое слово ищется как префикс, все слова обязательны
+        dialect = _dialect()
+        params = {"limit": limit + 1, "offset": (page - 1) * limit}
+        if dialect == 'sqlite':
+            statement = SQLITE_SEARCH
+            match = ' '.join(f'"{term}"*' for term in terms)
+            params.update(name_query=f'name : ({match})', other_query=f'({match}) NOT name : ({match})')
+        elif dialect == 'postgresql':
+            statement = POSTGRES_SEARCH
+            params.update(query=' & '.join(f'{term}:*' for term in terms),
+                          name_query=' & '.join(f'{term}:*A' for term in terms))
+        else:
+            return None, "Поиск не поддерживается для этой базы данных"
+
+        rows = db.session.execute(statement, params).mappings().all()
+
+        return {
+            "products": [dict(row) for row in rows[:limit]],
+            "page": page,
+            "has_more": len(rows) > limit
+        }, None
\ No newline at end of file
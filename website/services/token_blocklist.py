@@ -0,0 +1,176 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import delete, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from website.extensions import db, jwt
+from website.models import RevokedToken
+
+DEFAULT_CAPACITY = 1_000_000
+DEFAULT_ERROR_RATE = 0.001
+SYNC_OVERLAP = timedelta(seconds=5)  # Перекрытие окна синхронизации на случай запоздавших commit
+BUCKET_SECONDS = 60
+MASK64 = (1 << 64) - 1
+
+
+def _key(jti):
+    return int.from_bytes(hashlib.blake2b(jti.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _second_hash(key):
+    # Второй хэш для фильтра выводится из ключа (финализатор splitmix64), чтобы фильтр
+    # можно было перестроить по одним ключам точного множества
+    z = (key + 0x9E3779B97F4A7C15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return (z ^ (z >> 31)) | 1
+
+
+class BloomFilter:
+    # Битовый массив на bytearray; k позиций по схеме двойного хэширования h1 + i*h2
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, key):
+        bits, size, step = self._bits, self.size, _second_hash(key)
+        for i in range(self.hashes):
+            position = (key + i * step) % size
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        bits, size, step = self._bits, self.size, _second_hash(key)
+        for i in range(self.hashes):
+            position = (key + i * step) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def nbytes(self):
+        return len(self._bits)
+
+
+class TokenBlocklist:
+    # Отозванные токены в памяти процесса. Почти все проверяемые токены не отозваны, и для
+    # них хватает фильтра Блума — без БД и сети. Положительный ответ фильтра подтверждается
+    # точным множеством {ключ jti: exp}. Ключи лежат в корзинах по минуте истечения и
+    # выбрасываются целиком; фильтр перестраивается, когда устаревших ключей в нём больше, чем живых
+    def __init__(self, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE, clock=time.time):
+        self.error_rate = error_rate
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._expires = {}
+        self._buckets = {}
+        self._stale = 0
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._synced_at = None
+
+    def __len__(self):
+        return len(self._expires)
+
+    def add(self, jti, expires_at=None):
+        # expires_at — exp токена в секундах эпохи; None — токен без срока действия
+        if expires_at is not None and expires_at <= self.clock():
+            return
+        key = _key(jti)
+        bucket = int(expires_at // BUCKET_SECONDS) if expires_at is not None else None
+        with self._lock:
+            if key in self._expires:
+                return
+            self._expires[key] = expires_at
+            self._buckets.setdefault(bucket, []).append(key)
+            self._bloom.add(key)
+            if len(self._expires) > self._bloom.capacity:
+                self._rebuild(self._bloom.capacity * 2)
+
+    def is_revoked(self, jti):
+        key = _key(jti)
+        if key not in self._bloom:
+            return False
+        expires_at = self._expires.get(key, 0)
+        return expires_at is None or expires_at > self.clock()
+
+    def prune(self):
+        # Выбрасывает записи с истёкшим сроком; возвращает их число
+        current = int(self.clock() // BUCKET_SECONDS)
+        removed = 0
+        with self._lock:
+            for bucket in [b for b in self._buckets if b is not None and b < current]:
+                for key in self._buckets.pop(bucket):
+                    self._expires.pop(key, None)
+                    removed += 1
+            self._stale += removed
+            if self._stale > max(len(self._expires), 1024):
+                self._rebuild(self._bloom.capacity)
+        return removed
+
+    def _rebuild(self, capacity):
+        bloom = BloomFilter(capacity, self.error_rate)
+        for key in self._expires:
+            bloom.add(key)
+        self._bloom = bloom
+        self._stale = 0
+
+    def sync(self):
+        # Подтягивает из общей таблицы отзывы, сделанные другими процессами, и удаляет
+        # из неё просроченные записи. Первый вызов загружает все действующие отзывы
+        now = datetime.utcnow()
+        query = select(RevokedToken.jti, RevokedToken.expires_at).where(
+            or_(RevokedToken.expires_at.is_(None), RevokedToken.expires_at > now)
+        )
+        if self._synced_at is not None:
+            query = query.where(RevokedToken.revoked_at >= self._synced_at - SYNC_OVERLAP)
+        rows = db.session.execute(query).all()
+        for row in rows:
+            self.add(row.jti, row.expires_at.replace(tzinfo=timezone.utc).timestamp() if row.expires_at else None)
+        self._synced_at = now
+
+        db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+        db.session.commit()
+        self.prune()
+        return len(rows)
+
+    def stats(self):
+        return {"entries": len(self._expires), "bloom_bytes": self._bloom.nbytes,
+                "bloom_capacity": self._bloom.capacity}
+
+
+def get_token_blocklist():
+    # Один блок-лист на приложение; при создании загружает действующие отзывы из БД
+    blocklist = current_app.extensions.get('token_blocklist')
+    if blocklist is None:
+        config = current_app.config
+        blocklist = TokenBlocklist(
+            capacity=config.get('TOKEN_BLOCKLIST_CAPACITY', DEFAULT_CAPACITY),
+            error_rate=config.get('TOKEN_BLOCKLIST_ERROR_RATE', DEFAULT_ERROR_RATE)
+        )
+        blocklist.sync()
+        current_app.extensions['token_blocklist'] = blocklist
+    return blocklist
+
+
+def revoke_token(payload):
+    # Отзыв по jti до истечения токена: запись в общую таблицу и сразу в блок-лист процесса,
+    # остальные процессы увидят её при следующей синхронизации
+    exp = payload.get('exp')
+    insert = pg_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+    db.session.execute(insert(RevokedToken).values(
+        jti=payload['jti'],
+        user_id=int(payload['sub']) if str(payload.get('sub', '')).isdigit() else None,
+        expires_at=datetime.utcfromtimestamp(exp) if exp else None,
+        revoked_at=datetime.utcnow()
+    ).on_conflict_do_nothing(index_elements=['jti']))
+    db.session.commit()
+    get_token_blocklist().add(payload['jti'], exp)
+
+
+@jwt.token_in_blocklist_loader
+def _token_revoked(jwt_header, jwt_payload):
+    return get_token_blocklist().is_revoked(jwt_payload.get('jti', ''))
\ No newline at end of file
@@ -0,0 +1,149 @@
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from website.extensions import db
+from website.models import Order, OrderItem, WebhookEvent
+from website.services.inventory_service import InventoryService
+from website.services.product_cache import ProductCache
+
+DRAIN_BATCH_SIZE = 500
+RETRY_INTERVAL = 60  # Через сколько секунд повторить событие без заказа; растёт с числом попыток
+MAX_RETRY_INTERVAL = 3600
+PENDING_STATUS = 'pending'
+PAID_STATUS = "Оплачен"
+CANCELLED_STATUS = 'Отменен'
+REFUND_STATUS = "Требует возврата"  # Оплачен, но товар уже вернулся на склад и разобран
+
+
+def _insert_ignoring_duplicates(row):
+    # Повтор уже принятого события отбрасывается уникальным индексом по event_key
+    insert = pg_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+    return insert(WebhookEvent).values(**row).on_conflict_do_nothing(index_elements=['event_key'])
+
+
+class WebhookService:
+    @staticmethod
+    def enqueue(payload):
+        # Приём уведомления — одна вставка во входящую очередь и commit, без чтения заказов.
+        # Возвращает (принято ли новое событие, ошибка)
+        obj = payload.get('object') if isinstance(payload, dict) else None
+        if not isinstance(obj, dict) or not obj.get('id'):
+            return False, "Неверные данные"
+
+        payment_id = str(obj['id'])
+        event = payload.get('event') or f"payment.{obj.get('status')}"
+        result = db.session.execute(_insert_ignoring_duplicates({
+            "event_key": f"{event}:{payment_id}"[:120],
+            "event": event[:50],
+            "payment_id": payment_id[:50],
+            "payment_status": obj.get('status'),
+            "payload": json.dumps(payload, ensure_ascii=False),
+            "received_at": datetime.utcnow()
+        }))
+        db.session.commit()
+        return result.rowcount > 0, None
+
+    @staticmethod
+    def drain(batch_size=DRAIN_BATCH_SIZE):
+        # Разбирает очередь пачками: пачка захватывается через UPDATE ... RETURNING (как
+        # в InventoryService.release_expired), события схлопываются по payment_id, а заказы
+        # переводятся в оплаченные одним UPDATE на пачку. Возвращает число разобранных событий
+        processed_total = 0
+        while True:
+            now = datetime.utcnow()
+            batch = select(WebhookEvent.id).where(
+                WebhookEvent.processed_at.is_(None),
+                or_(WebhookEvent.next_attempt_at.is_(None), WebhookEvent.next_attempt_at <= now)
+            ).order_by(WebhookEvent.id).limit(batch_size).subquery()
+
+            claimed = db.session.execute(
+                update(WebhookEvent)
+                .where(WebhookEvent.id.in_(select(batch.c.id)), WebhookEvent.processed_at.is_(None))
+                .values(processed_at=now)
+                .returning(WebhookEvent.id, WebhookEvent.event, WebhookEvent.payment_id,
+                           WebhookEvent.payment_status, WebhookEvent.attempts)
+                .execution_options(synchronize_session=False)
+            ).all()
+            if not claimed:
+                db.session.commit()
+                return processed_total
+
+            paid = {event.payment_id for event in claimed
+                    if event.event == 'payment.succeeded' and event.payment_status == 'succeeded'}
+            reserved = set()
+            if paid:
+                WebhookService._postpone_unmatched([event for event in claimed if event.payment_id in paid], now)
+                # Оплаченными становятся только ожидающие заказы: их удержания ещё на месте
+                order_ids = db.session.execute(
+                    update(Order)
+                    .where(Order.payment_id.in_(paid), Order.status == PENDING_STATUS)
+                    .values(status=PAID_STATUS)
+                    .returning(Order.id)
+                    .execution_options(synchronize_session=False)
+                ).scalars().all()
+                InventoryService.commit_orders(order_ids)
+                reserved = WebhookService._settle_cancelled(paid)
+            db.session.commit()
+            if reserved:
+                ProductCache.invalidate(reserved)
+
+            processed_total += len(claimed)
+            if len(claimed) < batch_size:
+                return processed_total
+
+    @staticmethod
+    def _postpone_unmatched(events, now):
+        # Платёж, для которого ещё нет заказа (уведомление обогнало запись payment_id),
+        # не подтверждается: событие возвращается в очередь со счётчиком попыток и паузой
+        known = set(db.session.execute(
+            select(Order.payment_id).where(Order.payment_id.in_({event.payment_id for event in events}))
+        ).scalars())
+        retries = [{
+            "id": event.id,
+            "processed_at": None,
+            "attempts": event.attempts + 1,
+            "next_attempt_at": now + timedelta(seconds=min(RETRY_INTERVAL * 2 ** event.attempts, MAX_RETRY_INTERVAL))
+        } for event in events if event.payment_id not in known]
+        if retries:
+            db.session.execute(update(WebhookEvent), retries)
+
+    @staticmethod
+    def _settle_cancelled(payment_ids):
+        # Платёж пришёл после того, как очистка отменила заказ и вернула товар на склад.
+        # Товар резервируется заново по снимку позиций; если его уже нет — заказ помечается
+        # к возврату денег. Случай редкий, поэтому заказы разбираются по одному
+        orders = db.session.execute(
+            select(Order.id, Order.user_id)
+            .where(Order.payment_id.in_(payment_ids), Order.status == CANCELLED_STATUS)
+            .order_by(Order.id)
+        ).all()
+        reserved = set()
+        if not orders:
+            return reserved
+        quantities, lost = defaultdict(dict), set()
+        for order_id, product_id, quantity in db.session.execute(
+            select(OrderItem.order_id, OrderItem.product_id, OrderItem.quantity)
+            .where(OrderItem.order_id.in_([order.id for order in orders]))
+        ):
+            if product_id is None:
+                lost.add(order_id)  # Товар удалён из каталога
+            else:
+                quantities[order_id][product_id] = quantities[order_id].get(product_id, 0) + quantity
+
+        for order_id, user_id in orders:
+            error = "Товар удалён" if order_id in lost or not quantities[order_id] else None
+            if error is None:
+                _, error = InventoryService.reserve(user_id, quantities[order_id], order_id=order_id)
+            if error is None:
+                InventoryService.commit_orders([order_id])
+                reserved.update(quantities[order_id])
+            db.session.execute(
+                update(Order)
+                .where(Order.id == order_id)
+                .values(status=PAID_STATUS if error is None else REFUND_STATUS)
+                .execution_options(synchronize_session=False)
+            )
+        return reserved
\ No newline at end of file
@@ -0,0 +1,4 @@
+import os
+
+# Тесты не трогают instance/store.db: по умолчанию — своя база в памяти
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
\ No newline at end of file
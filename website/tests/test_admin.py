@@ -0,0 +1,107 @@
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from website.models import User
+from website.extensions import db
+
+
+@pytest.fixture
+def app():
+    from website import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def make_user(login, role='user'):
+    user = User(login=login, email=f"{login}@example.com", phone=f"+7912{len(login):07d}", role=role)
+    user.set_password("password123")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def login(client, name):
+    response = client.post('/auth/login', json={"login": name, "password": "password123"})
+    return response, {"Authorization": f"Bearer {response.get_json().get('access_token')}"}
+
+
+@contextmanager
+def count_user_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM users' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def test_require_role_uses_token_claims(app):
+    """
+    Права администратора проверяются по роли из токена, без запросов к таблице пользователей.
+    """
+    make_user("boss", role="admin")
+    make_user("client")
+    client = app.test_client()
+    _, admin_headers = login(client, "boss")
+    _, user_headers = login(client, "client")
+
+    with count_user_queries() as statements:
+        assert client.get('/admin/cache/stats', headers=admin_headers).status_code == 200
+    assert statements == []
+
+    assert client.get('/admin/cache/stats', headers=user_headers).status_code == 403
+
+
+def test_role_change_and_block_revoke_issued_tokens(app):
+    """
+    Смена роли и блокировка действуют сразу, даже для уже выданных токенов.
+    """
+    boss = make_user("boss", role="admin")
+    deputy = make_user("deputy", role="admin")
+    client = app.test_client()
+    _, boss_headers = login(client, "boss")
+    _, deputy_headers = login(client, "deputy")
+    assert client.get('/admin/cache/stats', headers=deputy_headers).status_code == 200
+
+    client.put(f'/admin/users/{deputy.id}/role', json={"role": "user"}, headers=boss_headers)
+    assert client.get('/admin/cache/stats', headers=deputy_headers).status_code == 403
+
+    client.put(f'/admin/users/{deputy.id}/role', json={"role": "admin"}, headers=boss_headers)
+    assert client.get('/admin/cache/stats', headers=deputy_headers).status_code == 200
+
+    client.post(f'/admin/users/{deputy.id}/block', headers=boss_headers)
+    response = client.get('/admin/cache/stats', headers=deputy_headers)
+    assert response.status_code == 403
+    assert response.get_json()['error'] == "Пользователь заблокирован"
+
+    response, _ = login(client, "deputy")
+    assert response.status_code == 403
+    assert client.get('/admin/cache/stats', headers=boss_headers).status_code == 200
+
+def test_without_shared_cache_roles_are_read_from_db(app):
+    """
+    С кэшем в памяти процесса метки смены роли не видны другим воркерам, поэтому роль
+    и блокировка читаются из БД при каждой проверке: блокировка из другого процесса действует сразу.
+    """
+    boss = make_user("boss", role="admin")
+    client = app.test_client()
+    _, boss_headers = login(client, "boss")
+    app.testing = False
+
+    with count_user_queries() as statements:
+        assert client.get('/admin/cache/stats', headers=boss_headers).status_code == 200
+    assert len(statements) == 1
+
+    # Блокировка выполнена в другом процессе: invalidate_principal здесь не вызывался
+    db.session.execute(User.__table__.update().where(User.id == boss.id).values(is_blocked=True))
+    db.session.commit()
+    assert client.get('/admin/cache/stats', headers=boss_headers).status_code == 403
\ No newline at end of file
@@ -0,0 +1,100 @@
+import threading
+import pytest
+from sqlalchemy import func, insert, select
+from website.models import User, BonusTransaction, Product
+from website.extensions import db
+from website.services import bonus_service
+from website.services.bonus_service import BonusService, to_minor
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Файловая БД: потокам в тесте на гонку нужны отдельные соединения к одной базе
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'bonus.db'}")
+    from website import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def make_users(count):
+    db.session.execute(insert(User), [
+        {"login": f"user{i}", "email": f"user{i}@example.com", "phone": f"+7900{i:07d}", "password_hash": "-"}
+        for i in range(count)
+    ])
+    db.session.commit()
+    return db.session.execute(select(User.id).order_by(User.id)).scalars().all()
+
+
+def test_credit_and_debit_are_atomic(app):
+    """
+    Списание проверяет остаток в самом UPDATE: параллельные списания не уводят баланс в минус.
+    """
+    user_id = make_users(1)[0]
+    transaction, error = BonusService.add_bonus(user_id, 10.1, "credit")
+    assert error is None and transaction.amount_minor == 1010
+    assert db.session.get(User, user_id).bonus_balance == 10.1
+
+    results = []
+
+    def spend():
+        with app.app_context():
+            results.append(BonusService.debit(user_id, 300)[1])
+            db.session.remove()
+
+    threads = [threading.Thread(target=spend) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(None) == 3
+    assert results.count("Недостаточно бонусов") == 2
+    assert db.session.get(User, user_id).bonus_minor == 110
+    assert BonusService.debit(999999, 1)[1] == "Пользователь не найден"
+    assert to_minor("0.29") == 29 and to_minor(0.29) == 29
+
+
+def test_failed_bonus_operation_keeps_caller_changes(app, monkeypatch):
+    """
+    Неудачное списание откатывает только свою точку сохранения: несохранённые изменения
+    вызывающего кода остаются в транзакции.
+    """
+    user_id = make_users(1)[0]
+    db.session.add(Product(name="Товар", price=1, stock=1))
+    assert BonusService.debit(user_id, 100) == (None, "Недостаточно бонусов")
+
+    BonusService.credit(user_id, 500)
+    db.session.add(Product(name="Ещё товар", price=1, stock=1))
+
+    def broken_consume(user_id, amount_minor):
+        raise RuntimeError("сбой")
+
+    monkeypatch.setattr(bonus_service, '_consume_expiring', broken_consume)
+    with pytest.raises(RuntimeError):
+        BonusService.debit(user_id, 100)
+    db.session.commit()
+
+    assert {product.name for product in Product.query.all()} == {"Товар", "Ещё товар"}
+    assert db.session.get(User, user_id).bonus_minor == 500
+    assert BonusTransaction.query.count() == 1
+
+
+def test_bulk_credit_by_ids_and_query(app):
+    """
+    Начисление по акции пачками: по набору id и по запросу, с проводкой на каждого получателя.
+    """
+    ids = make_users(25)
+    credited, error = BonusService.bulk_credit(set(ids[:10]) | {999999}, 500, chunk_size=4)
+    assert (credited, error) == (10, None)
+
+    credited, _ = BonusService.bulk_credit(select(User.id).where(User.bonus_minor == 0), 100, chunk_size=7)
+    assert credited == 15
+
+    balances = dict(db.session.execute(select(User.id, User.bonus_minor)).all())
+    assert [balances[user_id] for user_id in ids] == [500] * 10 + [100] * 15
+    assert db.session.scalar(select(func.count()).select_from(BonusTransaction)) == 25
+    assert db.session.scalar(select(func.sum(BonusTransaction.amount_minor))) == sum(balances.values())
\ No newline at end of file
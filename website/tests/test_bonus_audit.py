@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import insert, select, update
+from website.models import User, BonusCheckpoint, BonusTransaction
+from website.extensions import db
+from website.services.bonus_audit import BonusAuditService
+from website.services.bonus_service import BonusService
+
+
+@pytest.fixture
+def app():
+    from website import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user_ids(app):
+    db.session.execute(insert(User), [
+        {"login": f"user{i}", "email": f"user{i}@example.com", "phone": f"+7900{i:07d}", "password_hash": "-"}
+        for i in range(7)
+    ])
+    db.session.commit()
+    ids = db.session.execute(select(User.id).order_by(User.id)).scalars().all()
+    BonusService.bulk_credit(ids, 1000)
+    BonusService.debit(ids[0], 300)
+    return ids
+
+
+def test_reconcile_reports_and_repairs_drift(app, user_ids):
+    """
+    Сверка находит баланс, разошедшийся с журналом, и по запросу возвращает его к журналу.
+    """
+    later = datetime.utcnow() + timedelta(hours=1)
+    report, _ = BonusAuditService.reconcile(chunk_size=3, now=later)
+    assert (report["users"], report["transactions"], report["drifted"]) == (7, 8, 0)
+    assert report["checkpoints"] == 7
+    assert db.session.get(BonusCheckpoint, user_ids[0]).balance_minor == 700
+
+    db.session.execute(update(User).where(User.id == user_ids[2]).values(bonus_minor=5000))
+    db.session.commit()
+    report, _ = BonusAuditService.reconcile(chunk_size=3, now=later)
+    assert report["transactions"] == 0
+    assert report["samples"] == [{"user_id": user_ids[2], "balance_minor": 5000,
+                                  "ledger_minor": 1000, "drift_minor": 4000}]
+    assert report["repaired"] == 0
+
+    report, _ = BonusAuditService.reconcile(repair=True, chunk_size=3, now=later)
+    assert report["repaired"] == 1
+    assert db.session.get(User, user_ids[2]).bonus_minor == 1000
+
+
+def test_reconcile_reads_only_transactions_after_checkpoint(app, user_ids):
+    """
+    После контрольной точки сверка читает только новые проводки, а свежие проводки не сдвигают точку.
+    """
+    BonusAuditService.reconcile(now=datetime.utcnow() + timedelta(hours=1))
+    BonusService.credit(user_ids[1], 250)
+
+    report, _ = BonusAuditService.reconcile()
+    assert (report["transactions"], report["drifted"], report["checkpoints"]) == (1, 0, 0)
+    assert db.session.get(BonusCheckpoint, user_ids[1]).balance_minor == 1000
+
+    report, _ = BonusAuditService.reconcile(now=datetime.utcnow() + timedelta(hours=1))
+    assert (report["transactions"], report["checkpoints"]) == (1, 1)
+    checkpoint = db.session.get(BonusCheckpoint, user_ids[1])
+    assert checkpoint.balance_minor == 1250
+    assert checkpoint.last_transaction_id == db.session.scalar(select(BonusTransaction.id).order_by(BonusTransaction.id.desc()))
\ No newline at end of file
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import insert, select
+from website.models import User, BonusTransaction, JobCheckpoint
+from website.extensions import db
+from website.services.bonus_audit import BonusAuditService
+from website.services.bonus_expiry import BonusExpiryService, SWEEP_JOB
+from website.services.bonus_service import BonusService
+
+
+@pytest.fixture
+def app():
+    from website import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user_ids(app):
+    db.session.execute(insert(User), [
+        {"login": f"user{i}", "email": f"user{i}@example.com", "phone": f"+7900{i:07d}", "password_hash": "-"}
+        for i in range(5)
+    ])
+    db.session.commit()
+    return db.session.execute(select(User.id).order_by(User.id)).scalars().all()
+
+
+def balance(user_id):
+    return db.session.get(User, user_id).bonus_minor
+
+
+def test_sweep_burns_only_unspent_expired_bonuses(app, user_ids):
+    """
+    Сгорает только неизрасходованный остаток просроченного начисления; списания тратят
+    сначала начисления, которые сгорят раньше; повторный проход ничего не сжигает.
+    """
+    now = datetime.utcnow()
+    first, second, other = user_ids[0], user_ids[1], user_ids[2]
+    BonusService.credit(first, 1000, expires_at=now + timedelta(days=1))
+    BonusService.credit(first, 500, expires_at=now + timedelta(days=30))
+    BonusService.debit(first, 700)
+    BonusService.bulk_credit([second, other], 200, expires_at=now + timedelta(days=2))
+    BonusService.credit(other, 50, expires_at=now + timedelta(days=400))
+
+    later = now + timedelta(days=3)
+    report = BonusExpiryService.sweep(now=later, batch_size=2)
+    assert report == {"users": 3, "transactions": 3, "expired_minor": 300 + 200 + 200, "resumed_from": 0}
+    assert [balance(user_id) for user_id in (first, second, other)] == [500, 0, 50]
+
+    expired = db.session.execute(
+        select(BonusTransaction.reference_id, BonusTransaction.amount_minor).where(BonusTransaction.type == 'expire')
+    ).all()
+    assert sorted(amount for _, amount in expired) == [200, 200, 300]
+    assert BonusExpiryService.sweep(now=later)["transactions"] == 0
+    assert BonusAuditService.reconcile()[0]["drifted"] == 0
+
+
+def test_sweep_resumes_from_checkpoint(app, user_ids):
+    """
+    Прерванный проход продолжается с курсора и не сжигает уже обработанных пользователей повторно.
+    """
+    now = datetime.utcnow()
+    BonusService.bulk_credit(user_ids, 100, expires_at=now + timedelta(days=1))
+    db.session.add(JobCheckpoint(name=SWEEP_JOB, cursor=user_ids[2]))
+    db.session.commit()
+
+    report = BonusExpiryService.sweep(now=now + timedelta(days=2))
+    assert report["resumed_from"] == user_ids[2]
+    assert report["users"] == 2
+    assert [balance(user_id) for user_id in user_ids] == [100, 100, 100, 0, 0]
+    assert db.session.get(JobCheckpoint, SWEEP_JOB).cursor == 0
\ No newline at end of file
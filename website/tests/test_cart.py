@@ -0,0 +1,369 @@
+from contextlib import contextmanager
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from website.models import User, Product, CartItem, Order
+from website.extensions import db
+from website.services import cart_store
+from website.services.cart_store import RedisCartStore, init_cart_store
+from website.utils.cursor_utils import encode_cursor
+from website.utils.memory_redis import MemoryRedis
+
+
+@pytest.fixture
+def app():
+    from website import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    user = User(login="buyer", email="buyer@example.com", phone="+79123456789")
+    user.set_password("password123")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def headers(user):
+    return {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+
+
+@pytest.fixture
+def products(app):
+    items = [Product(name=f"Товар {i}", price=100.0 * (i + 1), stock=10) for i in range(3)]
+    db.session.add_all(items)
+    db.session.commit()
+    return items
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def fill_cart(user, count):
+    items = [Product(name=f"Позиция {i}", price=10.0, stock=100) for i in range(count)]
+    db.session.add_all(items)
+    db.session.flush()
+    db.session.add_all(CartItem(user_id=user.id, product_id=item.id, quantity=2) for item in items)
+    db.session.commit()
+
+
+def test_cart_and_checkout_query_count_is_constant(app, user, headers):
+    """
+    Число запросов при просмотре корзины и оформлении заказа не зависит от числа позиций.
+    """
+    client = app.test_client()
+    counts = []
+    for size in (1, 50):
+        CartItem.query.delete()
+        db.session.commit()
+        fill_cart(user, size)
+        with count_queries() as view_statements:
+            response = client.get('/cart/view', headers=headers)
+        assert len(response.get_json()['cart']) == size
+        assert response.get_json()['total_amount'] == 20.0 * size
+        with count_queries() as order_statements:
+            assert client.post('/order/create', headers=headers).status_code == 201
+        counts.append((len(view_statements), len(order_statements)))
+
+    assert counts[0] == counts[1]
+
+
+def test_view_cart_conditional_get(app, headers, products):
+    """
+    Повторный запрос корзины с If-None-Match получает 304, пока корзина и её товары не изменились.
+    """
+    client = app.test_client()
+    client.post('/cart/add', json={"product_id": products[0].id, "quantity": 2}, headers=headers)
+
+    response = client.get('/cart/view', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['total_amount'] == 200.0
+    etag = response.headers['ETag']
+
+    response = client.get('/cart/view', headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    # Изменение цены товара из корзины меняет ETag
+    products[0].price = 150.0
+    db.session.commit()
+    response = client.get('/cart/view', headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+
+    etag = response.headers['ETag']
+    client.post('/cart/add', json={"product_id": products[1].id}, headers=headers)
+    response = client.get('/cart/view', headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json()['total_amount'] == 500.0
+
+
+def test_view_profile_conditional_get(app, user, headers):
+    client = app.test_client()
+    response = client.get('/profile/profile', headers=headers)
+    assert response.status_code == 200
+    etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+
+    assert client.get('/profile/profile', headers={**headers, "If-None-Match": etag}).status_code == 304
+    assert client.get('/profile/profile', headers={**headers, "If-Modified-Since": last_modified}).status_code == 304
+
+    user.bonus_balance = 10.0
+    db.session.commit()
+    assert client.get('/profile/profile', headers={**headers, "If-None-Match": etag}).status_code == 200
+
+def test_cart_batch_reports_per_item_results(app, user, headers, products):
+    """
+    Пакетные операции применяются по порядку; ошибочные попадают в результат и не мешают остальным.
+    """
+    client = app.test_client()
+    client.post('/cart/add', json={"product_id": products[0].id, "quantity": 1}, headers=headers)
+
+    response = client.post('/cart/batch', json={"operations": [
+        {"op": "add", "product_id": products[0].id, "quantity": 2},
+        {"op": "add", "product_id": products[1].id},
+        {"op": "update", "product_id": products[1].id, "quantity": 5},
+        {"op": "add", "product_id": 999999},
+        {"op": "remove", "product_id": products[2].id},
+        {"op": "update", "product_id": products[0].id, "quantity": 0},
+        {"op": "clear"}
+    ]}, headers=headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [result['status'] for result in body['results']] == ['ok', 'ok', 'ok', 'error', 'error', 'error', 'error']
+    assert body['results'][0]['quantity'] == 3
+    assert body['results'][2]['quantity'] == 5
+    assert body['applied'] == 3 and body['failed'] == 4
+
+    cart = {line['product_id']: line['quantity'] for line in client.get('/cart/view', headers=headers).get_json()['cart']}
+    assert cart == {products[0].id: 3, products[1].id: 5}
+
+    response = client.post('/cart/batch', json={"operations": [
+        {"op": "remove", "product_id": products[0].id}
+    ]}, headers=headers)
+    assert response.get_json()['applied'] == 1
+    cart = client.get('/cart/view', headers=headers).get_json()['cart']
+    assert [line['product_id'] for line in cart] == [products[1].id]
+
+    assert client.post('/cart/batch', json={"operations": []}, headers=headers).status_code == 400
+
+
+def test_cart_batch_reorder_is_constant_queries(app, user, headers):
+    """
+    Повторный заказ из 40 позиций — один запрос к API и фиксированное число запросов к БД.
+    """
+    items = [Product(name=f"Позиция {i}", price=10.0, stock=100) for i in range(40)]
+    db.session.add_all(items)
+    db.session.commit()
+    operations = [{"op": "add", "product_id": item.id, "quantity": 2} for item in items]
+
+    client = app.test_client()
+    with count_queries() as statements:
+        response = client.post('/cart/batch', json={"operations": operations}, headers=headers)
+    assert response.get_json()['applied'] == 40
+    assert len(statements) <= 6
+    assert CartItem.query.filter_by(user_id=user.id).count() == 40
+
+
+def test_sql_cart_store_concurrent_writes_add_up(app, user, products):
+    """
+    Два запроса прочитали одну и ту же корзину: записи складываются в одну строку на товар,
+    а не затирают друг друга и не дублируют строки.
+    """
+    store = cart_store.SqlCartStore()
+    before = store.get(user.id)
+    store.write(user.id, before, {products[0].id: 2})
+    store.write(user.id, before, {products[0].id: 3, products[1].id: 1})
+    rows = {item.product_id: item.quantity for item in CartItem.query.filter_by(user_id=user.id)}
+    assert rows == {products[0].id: 5, products[1].id: 1}
+
+    stale = store.get(user.id)
+    store.write(user.id, stale, {products[1].id: 1})
+    store.write(user.id, stale, {products[1].id: 1})
+    rows = {item.product_id: item.quantity for item in CartItem.query.filter_by(user_id=user.id)}
+    assert rows == {products[1].id: 1}
+
+@pytest.fixture
+def memory_store(app):
+    store = RedisCartStore(MemoryRedis())
+    app.extensions['cart_store'] = store
+    return store
+
+
+def test_redis_cart_store_writes_behind(app, user, headers, products, memory_store):
+    """
+    Корзина в Redis-хранилище не пишет в cart_items до flush; оформление заказа видит актуальную корзину.
+    """
+    client = app.test_client()
+    client.post('/cart/add', json={"product_id": products[0].id, "quantity": 2}, headers=headers)
+    client.post('/cart/batch', json={"operations": [
+        {"op": "add", "product_id": products[1].id, "quantity": 3},
+        {"op": "update", "product_id": products[0].id, "quantity": 4}
+    ]}, headers=headers)
+    assert CartItem.query.filter_by(user_id=user.id).count() == 0
+
+    body = client.get('/cart/view', headers=headers).get_json()
+    assert {line['product_id']: line['quantity'] for line in body['cart']} == {products[0].id: 4, products[1].id: 3}
+    assert body['total_amount'] == 4 * 100.0 + 3 * products[1].price
+
+    assert memory_store.flush() == 1
+    rows = {item.product_id: item.quantity for item in CartItem.query.filter_by(user_id=user.id)}
+    assert rows == {products[0].id: 4, products[1].id: 3}
+
+    # Изменение после фонового переноса ещё не в БД, но заказ его учитывает
+    client.delete(f'/cart/remove/{products[1].id}', headers=headers)
+    assert CartItem.query.filter_by(user_id=user.id).count() == 2
+    response = client.post('/order/create', headers=headers)
+    assert response.status_code == 201
+    assert db.session.get(Order, response.get_json()['order_id']).total_amount == 400.0
+
+    # Оформленная корзина очищается и в БД, и в хранилище
+    assert CartItem.query.filter_by(user_id=user.id).count() == 0
+    assert client.get('/cart/view', headers=headers).get_json()['cart'] == []
+    assert memory_store.flush() == 0
+
+
+def test_redis_cart_store_loads_existing_cart(app, user, headers, products, memory_store):
+    """
+    Корзина, уже лежащая в cart_items, поднимается в хранилище при первом обращении; очистка переносится в БД.
+    """
+    db.session.add(CartItem(user_id=user.id, product_id=products[0].id, quantity=5))
+    db.session.commit()
+
+    client = app.test_client()
+    cart = client.get('/cart/view', headers=headers).get_json()['cart']
+    assert [(line['product_id'], line['quantity']) for line in cart] == [(products[0].id, 5)]
+
+    client.delete('/cart/clear', headers=headers)
+    assert client.get('/cart/view', headers=headers).get_json()['cart'] == []
+    memory_store.flush()
+    assert CartItem.query.filter_by(user_id=user.id).count() == 0
+
+def test_redis_cart_store_load_keeps_concurrent_changes(app, user, products, memory_store, monkeypatch):
+    """
+    Пока корзина читается из cart_items, другой процесс успел её загрузить и изменить —
+    устаревшее состояние из БД не перезаписывает хэш.
+    """
+    db.session.add(CartItem(user_id=user.id, product_id=products[0].id, quantity=1))
+    db.session.commit()
+    load = cart_store.SqlCartStore.get
+
+    def load_while_another_worker_writes(self, user_id):
+        state = load(self, user_id)
+        memory_store.client.hset(f'cart:{user.id}', mapping={"_loaded": 1, products[0].id: 5})
+        return state
+
+    monkeypatch.setattr(cart_store.SqlCartStore, 'get', load_while_another_worker_writes)
+    assert memory_store.get(user.id) == {products[0].id: 5}
+    assert [key for key in memory_store.client._data if key.startswith('cart:')] == [f'cart:{user.id}']
+
+def test_redis_cart_store_increments_and_reloads_forgotten_cart(app, user, products, memory_store):
+    """
+    Записи по одному устаревшему состоянию складываются; корзина, сброшенная между чтением
+    и записью, поднимается из БД целиком. У хэша всегда есть срок жизни.
+    """
+    db.session.add(CartItem(user_id=user.id, product_id=products[0].id, quantity=2))
+    db.session.commit()
+    key = f'cart:{user.id}'
+
+    before = memory_store.get(user.id)
+    memory_store.write(user.id, before, {products[0].id: 3})
+    memory_store.write(user.id, before, {products[0].id: 2, products[1].id: 1})
+    assert memory_store.get(user.id) == {products[0].id: 3, products[1].id: 1}
+    assert memory_store.client.ttl(key) == cart_store.CART_TTL
+
+    stale = memory_store.get(user.id)
+    memory_store.forget(user.id)
+    memory_store.write(user.id, stale, {products[1].id: 1})
+    assert memory_store.get(user.id) == {}
+    assert memory_store.client.hexists(key, '_loaded')
+    assert memory_store.client.ttl(key) == cart_store.CART_TTL
+
+
+def test_redis_cart_store_requires_url_outside_tests():
+    """
+    CART_STORE=redis без CART_REDIS_URL не запускается с корзинами в памяти процесса.
+    """
+    app = Flask(__name__)
+    app.config.update(CART_STORE='redis', CART_REDIS_URL=None)
+    with pytest.raises(RuntimeError):
+        init_cart_store(app)
+
+def test_order_history_snapshots_items_and_paginates(app, user, headers, products):
+    """
+    Заказ сохраняет снимок позиций; история листается курсором от новых заказов к старым.
+    """
+    client = app.test_client()
+    order_ids = []
+    for product in products:
+        client.post('/cart/add', json={"product_id": product.id, "quantity": 2}, headers=headers)
+        order_ids.append(client.post('/order/create', headers=headers).get_json()['order_id'])
+        client.delete('/cart/clear', headers=headers)
+
+    # Смена цены в каталоге не меняет уже оформленный заказ
+    products[0].price = 999.0
+    db.session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        query = f'?limit=2&cursor={cursor}' if cursor else '?limit=2'
+        with count_queries() as statements:
+            page = client.get(f'/profile/profile/orders{query}', headers=headers).get_json()
+        assert len(statements) <= 3
+        seen.extend(page['orders'])
+        if not page['has_more']:
+            break
+        cursor = page['next_cursor']
+
+    assert [order['order_id'] for order in seen] == order_ids[::-1]
+    first = seen[-1]
+    assert first['items'] == [{"product_id": products[0].id, "product_name": products[0].name,
+                               "unit_price": 100.0, "quantity": 2, "total_price": 200.0}]
+    assert client.get('/profile/profile/orders?cursor=bad', headers=headers).status_code == 400
+    for values in ([{"a": 1}], ["2024-01-01", 1], [[1]]):
+        response = client.get('/profile/profile/orders', query_string={"cursor": encode_cursor(values)}, headers=headers)
+        assert response.status_code == 400
+
+def test_checkout_route_reserves_stock_and_clears_cart(app, user, headers, products):
+    """
+    Оформление через /order/create списывает остатки и очищает корзину; при нехватке остатка ничего не меняется.
+    """
+    client = app.test_client()
+    client.post('/cart/batch', json={"operations": [
+        {"op": "add", "product_id": products[0].id, "quantity": 4},
+        {"op": "add", "product_id": products[1].id, "quantity": 11}
+    ]}, headers=headers)
+
+    response = client.post('/order/create', headers=headers)
+    assert response.status_code == 400
+    assert products[1].name in response.get_json()['error']
+    db.session.expire_all()
+    assert [product.stock for product in products] == [10, 10, 10]
+    assert CartItem.query.filter_by(user_id=user.id).count() == 2
+    assert Order.query.count() == 0
+
+    client.put(f'/cart/update/{products[1].id}', json={"quantity": 10}, headers=headers)
+    response = client.post('/order/create', headers=headers)
+    assert response.status_code == 201
+    db.session.expire_all()
+    assert [product.stock for product in products] == [6, 0, 10]
+    assert CartItem.query.filter_by(user_id=user.id).count() == 0
+    assert client.post('/order/create', headers=headers).status_code == 400
\ No newline at end of file
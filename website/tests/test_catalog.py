@@ -0,0 +1,374 @@
+import csv
+import io
+import json
+import pytest
+from flask_jwt_extended import create_access_token
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from website.models import Product, User, Order
+from website.extensions import db, cache
+from flask import Flask
+from website.services import product_cache
+from website.services.product_cache import ProductCache, init_product_cache, stats as cache_stats
+from website.utils.cursor_utils import encode_cursor
+
+
+@pytest.fixture
+def app():
+    from website import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def admin_headers(app):
+    admin = User(login="admin", email="admin@example.com", phone="+79120000000", role="admin")
+    admin.set_password("password123")
+    db.session.add(admin)
+    db.session.commit()
+    return {"Authorization": f"Bearer {create_access_token(identity=str(admin.id))}"}
+
+
+@pytest.fixture
+def products(app):
+    items = [
+        Product(name=f"Товар {i:02d}", price=float(100 - i % 5 * 10), stock=i % 3, description="")
+        for i in range(25)
+    ]
+    db.session.add_all(items)
+    db.session.commit()
+    return items
+
+
+def collect_pages(client, **params):
+    ids, cursor = [], None
+    while True:
+        query = dict(params)
+        if cursor:
+            query['cursor'] = cursor
+        response = client.get('/catalog/products', query_string=query)
+        assert response.status_code == 200
+        page = response.get_json()
+        ids.extend(product['id'] for product in page['products'])
+        if not page['has_more']:
+            return ids
+        cursor = page['next_cursor']
+
+
+def test_catalog_keyset_pagination(app, products):
+    """
+    Обход каталога по курсорам возвращает все товары ровно один раз.
+    """
+    client = app.test_client()
+    ids = collect_pages(client, limit=7)
+    assert ids == sorted(product.id for product in products)
+
+
+def test_catalog_sort_by_price(app, products):
+    """
+    Сортировка по цене стабильна при одинаковых ценах благодаря id вторым ключом.
+    """
+    client = app.test_client()
+    ids = collect_pages(client, limit=4, sort='price', order='desc')
+    expected = sorted(products, key=lambda p: (p.price, p.id), reverse=True)
+    assert ids == [product.id for product in expected]
+
+
+def test_catalog_filters(app, products):
+    """
+    Фильтры по диапазону цены и наличию на складе.
+    """
+    client = app.test_client()
+    ids = collect_pages(client, limit=5, min_price=70, max_price=90, in_stock='true')
+    expected = [p.id for p in products if 70 <= p.price <= 90 and p.stock > 0]
+    assert ids == expected
+
+
+def test_catalog_invalid_params(app, products):
+    client = app.test_client()
+    assert client.get('/catalog/products?limit=1000').status_code == 400
+    assert client.get('/catalog/products?sort=stock').status_code == 400
+    assert client.get('/catalog/products?cursor=garbage').status_code == 400
+    assert client.get('/catalog/products/999').status_code == 404
+    # Подделанные курсоры: значения не того типа не доходят до SQL
+    for sort, values in [('price', [{"a": 1}, 2]), ('id', [1, {"x": 1}]), ('name', [[1], [2]]),
+                         ('id', [1, True]), ('id', [1, 2 ** 70])]:
+        response = client.get('/catalog/products', query_string={"sort": sort, "cursor": encode_cursor(values)})
+        assert response.status_code == 400
+
+
+def test_search_index_follows_admin_changes(app, admin_headers):
+    """
+    Поиск по префиксам с ранжированием; индекс обновляется при добавлении, изменении и удалении товара.
+    """
+    client = app.test_client()
+    created = {}
+    for name, description in [("Ноутбук игровой", "мощный"), ("Сумка", "для ноутбука"), ("Мышь", "беспроводная")]:
+        response = client.post('/admin/products', json={"name": name, "price": 1000, "description": description},
+                               headers=admin_headers)
+        assert response.status_code == 201
+        created[name] = response.get_json()['product_id']
+
+    results = client.get('/catalog/search?q=ноут').get_json()
+    # Совпадение в названии весит больше, чем в описании
+    assert [p['id'] for p in results['products']] == [created["Ноутбук игровой"], created["Сумка"]]
+
+    client.put(f'/admin/products/{created["Мышь"]}', json={"name": "Мышь для ноутбука"}, headers=admin_headers)
+    results = client.get('/catalog/search?q=ноут мыш').get_json()
+    assert [p['id'] for p in results['products']] == [created["Мышь"]]
+
+    client.delete(f'/admin/products/{created["Ноутбук игровой"]}', headers=admin_headers)
+    results = client.get('/catalog/search', query_string={"q": "ноутбук", "limit": 1}).get_json()
+    assert results['has_more'] is True
+    assert created["Ноутбук игровой"] not in [p['id'] for p in results['products']]
+
+    assert client.get('/catalog/search?q=').status_code == 400
+
+
+def test_search_ranks_name_matches_first(app):
+    """
+    Совпадения в названии идут раньше совпадений в описании, даже старые; число страниц ограничено.
+    """
+    from website.services.search_service import SearchService
+    db.session.execute(db.insert(Product), [{"name": "Ноутбук старый", "price": 1, "stock": 1, "description": ""}] + [
+        {"name": f"Товар {i}", "price": 1, "stock": 1, "description": "чехол для ноутбука"} for i in range(1200)
+    ])
+    SearchService.rebuild_index()
+    db.session.commit()
+    client = app.test_client()
+
+    results = client.get('/catalog/search?q=ноутбук').get_json()
+    assert results['products'][0]['name'] == "Ноутбук старый"
+
+    results = client.get('/catalog/search', query_string={"q": "ноутбук", "page": 49, "limit": 25}).get_json()
+    assert len(results['products']) == 1
+    assert results['has_more'] is False
+    assert client.get('/catalog/search', query_string={"q": "ноутбук", "page": 51}).status_code == 400
+
+def test_product_cache_invalidated_on_admin_update(app, admin_headers, products):
+    """
+    Товар и страницы каталога читаются из кэша и инвалидируются при изменении товара админом.
+    """
+    cache.clear()
+    cache_stats.reset()
+    client = app.test_client()
+    product_id = products[0].id
+
+    assert client.get(f'/catalog/products/{product_id}').get_json()['name'] == "Товар 00"
+    client.get(f'/catalog/products/{product_id}')
+    client.get('/catalog/products?limit=5')
+    client.get('/catalog/products?limit=5')
+    stats = client.get('/admin/cache/stats', headers=admin_headers).get_json()['cache']
+    assert (stats['hits'], stats['misses']) == (2, 2)
+
+    client.put(f'/admin/products/{product_id}', json={"name": "Новое имя"}, headers=admin_headers)
+    assert client.get(f'/catalog/products/{product_id}').get_json()['name'] == "Новое имя"
+    page = client.get('/catalog/products?limit=5').get_json()
+    assert page['products'][0]['name'] == "Новое имя"
+
+
+def test_stock_change_invalidates_only_its_products(app, products):
+    """
+    Изменение остатков (заказ, возврат на склад) не сбрасывает весь каталог: страница без
+    изменённого товара остаётся в кэше, страница с ним перечитывается с новым остатком.
+    """
+    cache.clear()
+    client = app.test_client()
+    first = client.get('/catalog/products?limit=5')
+    second = client.get('/catalog/products?limit=5&order=desc')
+    client.get('/catalog/products?limit=5')
+    client.get('/catalog/products?limit=5&order=desc')
+    generation = ProductCache.generation()
+
+    db.session.get(Product, products[0].id).stock = 40
+    db.session.commit()
+    ProductCache.invalidate([products[0].id])
+    assert ProductCache.generation() == generation
+
+    cache_stats.reset()
+    page = client.get('/catalog/products?limit=5', headers={"If-None-Match": first.headers['ETag']})
+    assert page.status_code == 200
+    assert page.get_json()['products'][0]['stock'] == 40
+    assert client.get('/catalog/products?limit=5&order=desc',
+                      headers={"If-None-Match": second.headers['ETag']}).status_code == 304
+    assert (cache_stats.hits, cache_stats.misses) == (1, 1)
+    assert client.get(f'/catalog/products/{products[0].id}').get_json()['stock'] == 40
+
+
+def test_product_cache_fill_does_not_outlive_concurrent_invalidation(app, products, monkeypatch):
+    """
+    Товар изменили и инвалидировали, пока другой запрос читал его из БД: прочитанная
+    устаревшая запись не остаётся в кэше.
+    """
+    cache.clear()
+    product_id = products[0].id
+    serialize = product_cache.serialize_product
+
+    def serialize_while_admin_updates(product):
+        data = serialize(product)
+        db.session.execute(text("UPDATE products SET name = 'Новое имя' WHERE id = :id"), {"id": product_id})
+        db.session.commit()
+        ProductCache.invalidate([product_id], catalog=True)
+        return data
+
+    monkeypatch.setattr(product_cache, 'serialize_product', serialize_while_admin_updates)
+    assert ProductCache.get_product(product_id)['name'] == "Товар 00"
+    monkeypatch.setattr(product_cache, 'serialize_product', serialize)
+    assert ProductCache.get_product(product_id)['name'] == "Новое имя"
+
+
+def test_product_cache_requires_shared_backend_outside_tests():
+    """
+    Без TESTING кэш товаров в памяти процесса не запускается: инвалидация не дошла бы до других воркеров.
+    """
+    app = Flask(__name__)
+    app.config.update(CACHE_TYPE='SimpleCache')
+    with pytest.raises(RuntimeError):
+        init_product_cache(app)
+    app.config.update(CACHE_TYPE='RedisCache')
+    init_product_cache(app)
+
+
+def test_catalog_etag_changes_with_products(app, admin_headers, products):
+    client = app.test_client()
+    etag = client.get('/catalog/products?limit=5').headers['ETag']
+    assert client.get('/catalog/products?limit=5', headers={"If-None-Match": etag}).status_code == 304
+    assert client.get('/catalog/products?limit=6', headers={"If-None-Match": etag}).status_code == 200
+
+    client.put(f'/admin/products/{products[0].id}', json={"price": 1.0}, headers=admin_headers)
+    assert client.get('/catalog/products?limit=5', headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_bulk_import_and_export(app, admin_headers, products):
+    """
+    Импорт NDJSON/CSV обновляет существующие товары по id, создаёт новые и сообщает об ошибках построчно.
+    """
+    client = app.test_client()
+    feed = '\n'.join([
+        json.dumps({"id": products[0].id, "name": "Обновлённый товар", "price": 1, "stock": 3}),
+        json.dumps({"name": "Новый планшет", "price": "499.90", "stock": "7"}),
+        "{broken",
+        json.dumps({"name": "", "price": 10}),
+        json.dumps({"id": 100000, "name": "Товар с заданным id", "price": 5}),
+    ])
+    response = client.post('/admin/products/import?format=ndjson', data=feed, headers=admin_headers)
+    report = response.get_json()
+    assert response.status_code == 200
+    assert (report['created'], report['updated'], report['failed']) == (2, 1, 2)
+    assert [error['line'] for error in report['errors']] == [3, 4]
+
+    assert db.session.get(Product, products[0].id).name == "Обновлённый товар"
+    assert db.session.get(Product, 100000).price == 5
+    assert client.get('/catalog/search?q=планш').get_json()['products'][0]['name'] == "Новый планшет"
+
+    csv_feed = "name,price,stock\nКлавиатура,1500,2\nМышь,abc,1\n"
+    response = client.post('/admin/products/import', data=csv_feed, content_type='text/csv', headers=admin_headers)
+    assert (response.get_json()['created'], response.get_json()['errors']) == (1, [{"line": 3, "error": "Некорректная цена"}])
+
+    response = client.get('/admin/products/export?format=csv', headers=admin_headers)
+    assert response.mimetype == 'text/csv'
+    exported = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(exported) == len(products) + 3
+    assert exported[0]['name'] == "Обновлённый товар"
+
+    response = client.get('/admin/products/export', headers=admin_headers)
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['id'] for line in lines] == sorted(line['id'] for line in lines)
+    assert 100000 in [line['id'] for line in lines]
+
+def test_import_rejects_bad_values_and_reports_failed_row(app, admin_headers):
+    """
+    Нестроковые поля и нечисловые цены отклоняются проверкой, а ошибка БД приписывается
+    только своей строке — остальные строки пачки записываются.
+    """
+    client = app.test_client()
+    db.session.execute(text(
+        "CREATE TRIGGER reject_product BEFORE INSERT ON products WHEN NEW.name = 'Брак' "
+        "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+    ))
+    db.session.commit()
+    feed = '\n'.join([
+        json.dumps({"name": "Товар", "price": 1, "image_url": 5}),
+        json.dumps({"name": "Товар", "price": 1, "description": ["a"]}),
+        json.dumps({"name": "Товар", "price": "nan"}),
+        json.dumps({"name": "Товар", "price": "inf"}),
+        json.dumps({"id": 2 ** 40, "name": "Товар", "price": 1}),
+        json.dumps({"name": "Первый", "price": 1}),
+        json.dumps({"name": "Брак", "price": 1}),
+        json.dumps({"name": "Второй", "price": 1}),
+        json.dumps({"name": "Товар", "price": True}),
+        json.dumps({"name": "Товар", "price": 1, "stock": 2.7}),
+    ])
+    response = client.post('/admin/products/import?format=ndjson', data=feed, headers=admin_headers)
+    report = response.get_json()
+    errors = {error['line']: error['error'] for error in report['errors']}
+    assert sorted(errors) == [1, 2, 3, 4, 5, 7, 9, 10]
+    assert errors[7].startswith("Ошибка записи в БД")
+    assert (report['created'], report['failed']) == (2, 8)
+    assert {product.name for product in Product.query.all()} == {"Первый", "Второй"}
+
+def test_import_reports_undecodable_and_malformed_lines(app, admin_headers):
+    """
+    Строки не в UTF-8 и испорченные записи CSV попадают в отчёт как ошибки своих строк, импорт продолжается.
+    """
+    client = app.test_client()
+    feed = b'{"name": "\xff", "price": 1}\n' + json.dumps({"name": "Целый", "price": 1}).encode()
+    report = client.post('/admin/products/import?format=ndjson', data=feed, headers=admin_headers).get_json()
+    assert (report['created'], report['errors']) == (1, [{"line": 1, "error": "Некорректная кодировка, ожидается UTF-8"}])
+
+    feed = b'name,price\n\xff,1\n"' + b'a' * 200000 + '",2\nМышь,3\n'.encode()
+    response = client.post('/admin/products/import', data=feed, content_type='text/csv', headers=admin_headers)
+    assert response.status_code == 200
+    assert response.get_json()['created'] == 1
+    assert [(error['line'], error['error']) for error in response.get_json()['errors']] == [
+        (2, "Некорректная кодировка, ожидается UTF-8"), (3, "Некорректная строка CSV")
+    ]
+
+def test_admin_orders_filters_pagination_and_export(app, admin_headers):
+    """
+    Админский список заказов фильтруется, листается курсором и выгружается потоком.
+    """
+    buyer = User(login="buyer", email="buyer@example.com", phone="+79123456789")
+    buyer.set_password("password123")
+    db.session.add(buyer)
+    db.session.flush()
+    start = datetime(2024, 1, 1)
+    db.session.add_all(Order(user_id=buyer.id, total_amount=100.0 * (i + 1),
+                             status="Оплачен" if i % 2 else "pending",
+                             created_at=start + timedelta(days=i)) for i in range(10))
+    db.session.commit()
+    client = app.test_client()
+
+    ids, cursor = [], None
+    while True:
+        query = {"status": "Оплачен", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get('/admin/orders', query_string=query, headers=admin_headers).get_json()
+        ids.extend(order['id'] for order in page['orders'])
+        if not page['has_more']:
+            break
+        cursor = page['next_cursor']
+    assert len(ids) == 5 and ids == sorted(ids, reverse=True)
+
+    page = client.get('/admin/orders', query_string={
+        "min_amount": 300, "max_amount": 600, "created_from": "2024-01-04", "created_to": "2024-01-06"
+    }, headers=admin_headers).get_json()
+    assert [order['total_amount'] for order in page['orders']] == [500.0, 400.0]
+
+    assert client.get('/admin/orders', query_string={"created_from": "вчера"},
+                      headers=admin_headers).status_code == 400
+    for values in [[{"a": 1}], ["1"], [True], [2 ** 70], [1, 2]]:
+        assert client.get('/admin/orders', query_string={"cursor": encode_cursor(values)},
+                          headers=admin_headers).status_code == 400
+
+    response = client.get('/admin/orders/export', query_string={"format": "csv", "status": "pending"},
+                          headers=admin_headers)
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [float(row['total_amount']) for row in rows] == [100.0, 300.0, 500.0, 700.0, 900.0]
+
+    response = client.get('/admin/orders/export', query_string={"user_id": buyer.id}, headers=admin_headers)
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(lines) == 10 and lines[0]['created_at'] == "2024-01-01T00:00:00"
\ No newline at end of file
@@ -0,0 +1,123 @@
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from website.models import User
+from website.extensions import db
+from website.services.auth_service import AuthService
+
+
+@pytest.fixture
+def app():
+    from website import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@contextmanager
+def count_user_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT') and 'FROM users' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def register(client, login, email, phone):
+    return client.post('/auth/register', json={
+        "login": login, "email": email, "phone": phone,
+        "password": "password123", "confirm_password": "password123"
+    })
+
+
+def test_register_checks_normalized_identifiers_in_one_query(app):
+    """
+    Email и телефон сравниваются в нормализованном виде, а все проверки уникальности — один запрос.
+    """
+    client = app.test_client()
+    assert register(client, "buyer", "Buyer@Example.com", "+79123456789").status_code == 201
+    user = User.query.filter_by(login="buyer").one()
+    assert (user.email_norm, user.phone_e164) == ("buyer@example.com", "+79123456789")
+
+    with count_user_queries() as statements:
+        response = register(client, "other", "BUYER@example.COM", "+79120000000")
+    assert response.status_code == 400
+    assert response.get_json()['error'] == "Email уже зарегистрирован"
+    assert len(statements) == 1
+
+    assert AuthService.find_conflicts("other", "other@example.com", "+7 (912) 345-67-89") == "Телефон уже зарегистрирован"
+    assert AuthService.find_conflicts("buyer", "other@example.com", exclude_id=user.id) is None
+    response = register(client, "buyer", "buyer@example.com", "+79123456789")
+    assert response.get_json()['error'] == "Логин уже занят"
+
+
+def test_login_by_any_identifier(app):
+    """
+    Вход по логину, email в другом регистре или телефону в другом формате находит одного и того же пользователя.
+    """
+    client = app.test_client()
+    register(client, "buyer", "buyer@example.com", "+79123456789")
+
+    for credentials in ({"login": "buyer"}, {"email": "BUYER@example.com"},
+                        {"phone": "+7 (912) 345-67-89"}, {"login": "buyer@example.com"}):
+        response = client.post('/auth/login', json={**credentials, "password": "password123"})
+        assert response.status_code == 200, credentials
+        assert response.get_json()['login'] == "buyer"
+
+
+def test_login_shaped_like_email_or_phone_cannot_take_over_sign_in(app):
+    """
+    Идентификатор ищется только в своей колонке: старый логин, совпавший с чужим email или телефоном,
+    не перехватывает вход владельца, а новые такие логины не регистрируются.
+    """
+    client = app.test_client()
+    register(client, "owner", "owner@example.com", "+79123456789")
+    for login in ("owner@example.com", "+79123456789"):
+        squatter = User(login=login, email=f"{len(login)}@example.net", phone=f"+7912000000{len(login) % 10}")
+        squatter.set_password("password123")
+        db.session.add(squatter)
+    db.session.commit()
+
+    for identifier in ("owner@example.com", "+7 (912) 345-67-89", "+79123456789"):
+        response = client.post('/auth/login', json={"login": identifier, "password": "password123"})
+        assert response.get_json()['login'] == "owner", identifier
+
+    assert register(client, "new@example.com", "new@example.com", "+79120000001").status_code == 400
+    assert register(client, "8 912 000-00-02", "new@example.com", "+79120000002").status_code == 400
+
+
+def test_unknown_identifier_is_cached_until_registration(app):
+    """
+    Повторный вход с несуществующим логином не обращается к БД, пока кто-нибудь не зарегистрируется.
+    """
+    client = app.test_client()
+    credentials = {"login": "ghost", "password": "password123"}
+    assert client.post('/auth/login', json=credentials).status_code == 401
+
+    with count_user_queries() as statements:
+        assert client.post('/auth/login', json=credentials).status_code == 401
+    assert statements == []
+
+    register(client, "ghost", "ghost@example.com", "+79123456789")
+    assert client.post('/auth/login', json=credentials).status_code == 200
+
+def test_phone_validation_returns_e164_from_cache():
+    """
+    Проверка номера отдаёт E.164, а повторная проверка того же номера берётся из кэша.
+    """
+    from website.utils.identity_utils import _parse_phone, phone_to_e164
+    _parse_phone.cache_clear()
+    assert phone_to_e164("+7 (912) 345-67-89") == "+79123456789"
+    assert phone_to_e164("+7 (912) 345-67-89") == "+79123456789"
+    assert _parse_phone.cache_info().hits == 1
+    assert phone_to_e164("+7000") is None
+    assert phone_to_e164("not a phone") is None
\ No newline at end of file
@@ -0,0 +1,64 @@
+import pytest
+from website.models import User
+from website.extensions import db
+from website.services.password_service import PasswordHasher
+
+
+@pytest.fixture
+def app():
+    from website import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    user = User(login="buyer", email="buyer@example.com", phone="+79123456789")
+    user.password_hash = PasswordHasher(method='pbkdf2:sha256:2000').hash("password123")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_login_rehashes_outdated_password(app, user):
+    """
+    Вход с паролем, захэшированным по старым параметрам, пересчитывает хэш по текущим настройкам.
+    """
+    client = app.test_client()
+    old_hash = user.password_hash
+
+    response = client.post('/auth/login', json={"login": "buyer", "password": "wrong"})
+    assert response.status_code == 401
+    assert db.session.get(User, user.id).password_hash == old_hash
+
+    response = client.post('/auth/login', json={"login": "buyer", "password": "password123"})
+    assert response.status_code == 200
+    new_hash = db.session.get(User, user.id).password_hash
+    assert new_hash.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+
+    assert client.post('/auth/login', json={"login": "buyer", "password": "password123"}).status_code == 200
+    assert db.session.get(User, user.id).password_hash == new_hash
+
+
+def test_password_pool_hashes_in_worker_and_sheds_load(app, user):
+    """
+    Пул процессов считает хэши; при заполненной очереди вход отвечает 503, а не ждёт.
+    """
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, max_pending=1)
+    try:
+        password_hash = hasher.hash("secret")
+        assert hasher.verify(password_hash, "secret")
+        assert not hasher.verify(password_hash, "other")
+        assert not hasher.needs_rehash(password_hash)
+
+        app.extensions['password_hasher'] = hasher
+        hasher._slots.acquire()
+        response = app.test_client().post('/auth/login', json={"login": "buyer", "password": "password123"})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == "1"
+    finally:
+        hasher.shutdown()
\ No newline at end of file
@@ -0,0 +1,215 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from datetime import datetime, timedelta
+from website.models import User, Order, OrderItem, Product, WebhookEvent
+from website.services.inventory_service import InventoryService
+from website.extensions import db
+from website.services.webhook_service import WebhookService
+from website.services.payment_client import YooKassaClient, CircuitBreaker, CircuitOpenError, PaymentError
+from website.utils.fake_yookassa import FakeYooKassa
+
+
+@pytest.fixture
+def gateway():
+    with FakeYooKassa() as gateway:
+        yield gateway
+
+
+@pytest.fixture
+def app(gateway):
+    from website import create_app
+    app = create_app()
+    app.config.update(YOOKASSA_API_URL=gateway.url, PAYMENT_READ_TIMEOUT=1)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def order(app):
+    user = User(login="payer", email="payer@example.com", phone="+79123456789")
+    user.set_password("password123")
+    db.session.add(user)
+    db.session.flush()
+    order = Order(user_id=user.id, total_amount=1500.0)
+    db.session.add(order)
+    db.session.commit()
+    return order
+
+
+def make_client(gateway, **kwargs):
+    kwargs.setdefault('backoff', 0)
+    return YooKassaClient(gateway.url, 'shop', 'secret', **kwargs)
+
+
+def test_generate_payment_link_is_idempotent(app, gateway, order):
+    """
+    Повторная генерация ссылки для одного заказа не создаёт второй платёж в шлюзе.
+    """
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(order.user_id))}"}
+
+    first = client.post(f'/order/generate_payment_link/{order.id}', headers=headers)
+    second = client.post(f'/order/generate_payment_link/{order.id}', headers=headers)
+    assert first.status_code == 200
+    assert first.get_json() == second.get_json()
+    assert len(gateway.payments) == 1
+    assert db.session.get(Order, order.id).payment_id in gateway.payments
+
+
+def test_payment_link_after_cancelled_payment_and_bad_gateway_replies(app, gateway, order, monkeypatch):
+    """
+    Ответ шлюза не в JSON или без ссылки на оплату — 502, а не 500. После отмены платежа
+    ссылка генерируется заново новым платежом, повторное нажатие его не дублирует.
+    """
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(order.user_id))}"}
+    url = f'/order/generate_payment_link/{order.id}'
+
+    gateway.fail_next(1, status=200, body="<html>Bad gateway</html>")
+    assert client.post(url, headers=headers).status_code == 502
+    create = gateway._create_payment
+    monkeypatch.setattr(gateway, '_create_payment', lambda body, key: {**create(body, key), "confirmation": {}})
+    assert client.post(url, headers=headers).status_code == 502
+    monkeypatch.setattr(gateway, '_create_payment', create)
+
+    first = client.post(url, headers=headers).get_json()
+    first_id = db.session.get(Order, order.id).payment_id
+    gateway.payments[first_id]['status'] = 'canceled'
+    second = client.post(url, headers=headers).get_json()
+    assert client.post(url, headers=headers).get_json() == second != first
+    assert db.session.get(Order, order.id).payment_id != first_id
+    assert len(gateway.payments) == 2
+
+
+def test_payment_link_only_for_pending_orders(app, gateway, order):
+    """
+    Отменённый очисткой удержаний заказ нельзя оплатить.
+    """
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(order.user_id))}"}
+    db.session.get(Order, order.id).status = 'Отменен'
+    db.session.commit()
+
+    response = client.post(f'/order/generate_payment_link/{order.id}', headers=headers)
+    assert response.status_code == 400
+    assert gateway.payments == {}
+
+
+def test_payment_client_retries_with_same_key(gateway):
+    """
+    Сбой соединения и 5xx повторяются с тем же Idempotence-Key; ошибка запроса (4xx) — нет.
+    """
+    client = make_client(gateway, max_retries=2)
+    gateway.fail_next(1, status=0)
+    gateway.fail_next(1, status=503)
+    payment = client.create_payment({"amount": {"value": "10.00", "currency": "RUB"}}, 'key-1')
+    assert gateway.requests == 3
+    assert client.create_payment({"amount": {"value": "10.00", "currency": "RUB"}}, 'key-1') == payment
+    assert len(gateway.payments) == 1
+
+    with pytest.raises(PaymentError):
+        client.create_payment({"description": "без суммы"})
+    assert gateway.requests == 5
+
+
+def test_payment_client_timeout_and_circuit_breaker(gateway):
+    """
+    Медленный шлюз обрывается по таймауту, а после серии отказов предохранитель перестаёт слать запросы.
+    """
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+    client = make_client(gateway, read_timeout=0.05, max_retries=0, breaker=breaker)
+    payment_data = {"amount": {"value": "10.00", "currency": "RUB"}}
+
+    gateway.latency = 0.2
+    for _ in range(2):
+        with pytest.raises(PaymentError):
+            client.create_payment(payment_data)
+    assert breaker.state == 'open'
+
+    requests_before = gateway.requests
+    with pytest.raises(CircuitOpenError):
+        client.create_payment(payment_data)
+    assert gateway.requests == requests_before
+
+    # По истечении паузы проходит пробный запрос, и успех замыкает предохранитель
+    gateway.latency = 0
+    now[0] += 30
+    assert breaker.state == 'half-open'
+    client.create_payment(payment_data)
+    assert breaker.state == 'closed'
+
+def webhook(payment_id, status='succeeded'):
+    return {"type": "notification", "event": f"payment.{status}",
+            "object": {"id": payment_id, "status": status, "paid": status == 'succeeded'}}
+
+
+def test_webhook_is_queued_deduplicated_and_drained(app, order):
+    """
+    Вебхук только записывает событие; повторы отбрасываются, а разбор очереди переводит заказ в оплаченные.
+    """
+    order.payment_id = "pay-1"
+    db.session.commit()
+    client = app.test_client()
+
+    for _ in range(3):
+        assert client.post('/order/yookassa_webhook', json=webhook("pay-1")).status_code == 200
+    assert client.post('/order/yookassa_webhook', json=webhook("pay-unknown")).status_code == 200
+    assert client.post('/order/yookassa_webhook', json={"object": {}}).status_code == 400
+    assert WebhookEvent.query.count() == 2
+    assert db.session.get(Order, order.id).status == 'pending'
+
+    assert WebhookService.drain(batch_size=1) == 2
+    db.session.expire_all()
+    assert db.session.get(Order, order.id).status == "Оплачен"
+    assert WebhookService.drain() == 0
+
+    # Платёж без заказа не теряется: событие ждёт повтора, пока заказ не получит payment_id
+    unknown = WebhookEvent.query.filter_by(payment_id="pay-unknown").one()
+    assert (unknown.processed_at, unknown.attempts) == (None, 1)
+    late = Order(user_id=order.user_id, total_amount=100.0, payment_id="pay-unknown")
+    db.session.add(late)
+    unknown.next_attempt_at = datetime.utcnow()
+    db.session.commit()
+    assert WebhookService.drain() == 1
+    db.session.expire_all()
+    assert db.session.get(Order, late.id).status == "Оплачен"
+    assert WebhookEvent.query.filter(WebhookEvent.processed_at.is_(None)).count() == 0
+
+def test_payment_after_hold_expired_reserves_again_or_flags_refund(app, order):
+    """
+    Оплата заказа, отменённого очисткой удержаний, заново резервирует товар, а если его
+    уже раскупили — помечает заказ к возврату, не уводя остаток в минус.
+    """
+    product = Product(name="Товар", price=500.0, stock=4)
+    db.session.add(product)
+    second = Order(user_id=order.user_id, total_amount=1500.0, payment_id="pay-2")
+    order.payment_id = "pay-1"
+    db.session.add(second)
+    db.session.flush()
+    for target in (order, second):
+        db.session.add(OrderItem(order_id=target.id, product_id=product.id, product_name="Товар",
+                                 unit_price=500.0, quantity=2))
+        InventoryService.reserve(order.user_id, {product.id: 2}, order_id=target.id, hold_seconds=60)
+    db.session.commit()
+
+    assert InventoryService.release_expired(now=datetime.utcnow() + timedelta(minutes=2)) == 2
+    db.session.expire_all()
+    assert db.session.get(Product, product.id).stock == 4
+    assert {db.session.get(Order, order.id).status, db.session.get(Order, second.id).status} == {'Отменен'}
+
+    # Пока платёж шёл, остаток частично раскупили: хватает только на один заказ
+    db.session.get(Product, product.id).stock = 3
+    db.session.commit()
+    client = app.test_client()
+    client.post('/order/yookassa_webhook', json=webhook("pay-1"))
+    client.post('/order/yookassa_webhook', json=webhook("pay-2"))
+    assert WebhookService.drain() == 2
+
+    db.session.expire_all()
+    assert db.session.get(Order, order.id).status == "Оплачен"
+    assert db.session.get(Order, second.id).status == "Требует возврата"
+    assert db.session.get(Product, product.id).stock == 1
\ No newline at end of file
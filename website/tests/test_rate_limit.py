@@ -0,0 +1,61 @@
+import pytest
+from website.extensions import db
+from website.utils.rate_limit import WindowMemoryStorage
+
+
+@pytest.fixture
+def app():
+    from website import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_login_is_rate_limited(app):
+    """
+    После исчерпания лимита вход отвечает 429 с Retry-After, лимит берётся из настроек.
+    """
+    app.config['RATELIMIT_LOGIN'] = '3 per minute'
+    client = app.test_client()
+    credentials = {"login": "ghost", "password": "password123"}
+    for _ in range(3):
+        assert client.post('/auth/login', json=credentials).status_code == 401
+
+    response = client.post('/auth/login', json=credentials)
+    assert response.status_code == 429
+    assert response.get_json()['error']
+    assert int(response.headers['Retry-After']) > 0
+    # Остальные маршруты считаются отдельно
+    assert client.get('/catalog/products?limit=1').status_code == 200
+
+
+def test_sliding_window_counter_weights_previous_window():
+    """
+    Прошлое окно учитывается пропорционально тому, какая его часть ещё попадает в скользящее окно.
+    """
+    now = [600.0]
+    storage = WindowMemoryStorage(clock=lambda: now[0])
+    assert all(storage.acquire_sliding_window_entry('k', 10, 60) for _ in range(10))
+    assert not storage.acquire_sliding_window_entry('k', 10, 60)
+
+    now[0] = 660.0  # Начало следующего окна: прошлое окно ещё целиком в скользящем
+    assert not storage.acquire_sliding_window_entry('k', 10, 60)
+    now[0] = 690.0  # Середина окна: от прошлого осталась половина
+    assert sum(storage.acquire_sliding_window_entry('k', 10, 60) for _ in range(10)) == 5
+    assert storage.get_sliding_window('k', 60)[::2] == (10, 5)
+
+    now[0] = 800.0
+    assert storage.get_sliding_window('k', 60)[::2] == (0, 0)
+
+
+def test_storage_memory_is_bounded():
+    """
+    Число ключей в хранилище ограничено: давно не использованные вытесняются.
+    """
+    storage = WindowMemoryStorage(max_keys=3)
+    for key in ('a', 'b', 'c', 'a', 'd', 'e'):
+        storage.acquire_sliding_window_entry(key, 10, 60)
+    assert list(storage._windows) == ['a', 'd', 'e']
\ No newline at end of file
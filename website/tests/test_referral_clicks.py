@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event, insert, select
+from website.models import User, ReferralClick
+from website.extensions import db
+from website.services.referral_clicks import MemoryClickCounter, RedisClickCounter, ReferralClickService
+from website.utils.memory_redis import MemoryRedis
+
+
+@pytest.fixture
+def app():
+    from website import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user_ids(app):
+    db.session.execute(insert(User), [
+        {"login": f"user{i}", "email": f"user{i}@example.com", "phone": f"+7900{i:07d}", "password_hash": "-",
+         "referral_code": f"code-{i}"}
+        for i in range(3)
+    ])
+    db.session.commit()
+    return db.session.execute(select(User.id).order_by(User.id)).scalars().all()
+
+
+def test_clicks_are_counted_in_memory_and_flushed_as_upserts(app, user_ids):
+    """
+    Переходы не пишут в БД; перенос складывает дельты в строку дня и отбрасывает неизвестные коды.
+    """
+    client = app.test_client()
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for _ in range(5):
+            assert client.post('/auth/ref/code-0/click').status_code == 202
+        client.post('/auth/ref/code-1/click')
+        client.post('/auth/ref/missing/click')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    assert statements == []
+    assert client.post('/auth/ref/bad%20code/click').status_code == 400
+
+    now = datetime(2026, 10, 18, 12)
+    assert ReferralClickService.flush(now=now) == {"codes": 2, "clicks": 6, "unknown": 1}
+    client.post('/auth/ref/code-0/click')
+    assert ReferralClickService.clicks('code-0') == 6
+    assert ReferralClickService.flush(now=now) == {"codes": 1, "clicks": 1, "unknown": 0}
+    ReferralClickService.track('code-0')
+    ReferralClickService.flush(now=now + timedelta(days=1))
+
+    rows = db.session.execute(select(ReferralClick.day, ReferralClick.clicks)
+                              .where(ReferralClick.referral_code == 'code-0').order_by(ReferralClick.day)).all()
+    assert [row.clicks for row in rows] == [6, 1]
+    assert ReferralClickService.clicks('code-0', since=now.date() + timedelta(days=1)) == 1
+    assert ReferralClickService.clicks_for_user(user_ids[0]) == 7
+    assert ReferralClickService.flush() == {"codes": 0, "clicks": 0, "unknown": 0}
+
+
+def test_redis_counter_recovers_orphaned_flushing_keys():
+    """
+    Хэш :flushing:, оставшийся от процесса, упавшего посреди переноса, возвращается
+    в счётчики при старте, а не теряется.
+    """
+    client = MemoryRedis()
+    client.hset('referral:clicks:flushing:dead', mapping={"a": 2, "b": 1})
+    client.hset('referral:clicks', mapping={"a": 1})
+
+    counter = RedisClickCounter(client)
+    assert list(client.scan_iter(match='referral:clicks:flushing:*')) == []
+    assert counter.drain() == {"a": 3, "b": 1}
+    assert counter.drain() == {}
+    assert list(client.scan_iter()) == []
+
+
+def test_memory_counter_bounds_codes_and_restores_failed_flush():
+    """
+    Счётчик в памяти не растёт сверх предела кодов, а дельты неудачного переноса возвращаются.
+    """
+    counter = MemoryClickCounter(max_codes=2)
+    assert counter.incr('a') and counter.incr('b') and counter.incr('a')
+    assert not counter.incr('c')
+    assert counter.dropped == 1
+
+    counts = counter.drain()
+    assert counts == {"a": 2, "b": 1}
+    counter.incr('a')
+    counter.restore(counts)
+    assert counter.drain() == {"a": 3, "b": 1}
\ No newline at end of file
@@ -0,0 +1,158 @@
+import pytest
+from sqlalchemy import event, insert, select
+from website.models import User, ReferralStats
+from website.extensions import db
+from website.services import referral_service
+from website.services.referral_service import ReferralService
+
+
+@pytest.fixture
+def app():
+    from website import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user_ids(app):
+    db.session.execute(insert(User), [
+        {"login": f"user{i}", "email": f"user{i}@example.com", "phone": f"+7900{i:07d}", "password_hash": "-",
+         "role": "admin" if i == 0 else "user"}
+        for i in range(8)
+    ])
+    db.session.commit()
+    return db.session.execute(select(User.id).order_by(User.id)).scalars().all()
+
+
+def build_tree(ids):
+    # 1 -> 2 -> 3 -> 4, 1 -> 5, 2 -> 6; поддерево 6 -> 7 подвешивается последним
+    for referrer, referred in [(1, 2), (2, 3), (3, 4), (1, 5), (6, 7), (2, 6)]:
+        _, error = ReferralService.add_referral(ids[referrer], ids[referred], bonus_amount=10.5)
+        assert error is None
+
+
+def snapshot():
+    return {row.user_id: (row.direct_count, row.total_count, row.levels, row.bonus_earned_minor)
+            for row in db.session.execute(select(ReferralStats)).scalars()}
+
+
+def test_add_referral_updates_ancestors_incrementally(app, user_ids):
+    """
+    Добавление реферала обновляет агрегаты всей цепочки вышестоящих, включая перенос готового поддерева.
+    """
+    build_tree(user_ids)
+    stats = ReferralService.get_stats(user_ids[1])
+    assert stats == {"user_id": user_ids[1], "direct": 2, "indirect": 4, "total": 6, "levels": 3,
+                     "bonus_earned": 21.0}
+    assert ReferralService.get_stats(user_ids[2])["total"] == 4
+    assert ReferralService.get_stats(user_ids[4])["total"] == 0
+    assert db.session.get(User, user_ids[7]).referrer_id == user_ids[6]
+
+    incremental = snapshot()
+    assert ReferralService.rebuild_stats() == ({"users": 4}, None)
+    db.session.expire_all()
+    assert snapshot() == incremental
+
+
+def test_add_referral_rejects_cycles_and_repeats(app, user_ids):
+    """
+    Нельзя пригласить себя, уже приглашённого пользователя или своего вышестоящего.
+    """
+    build_tree(user_ids)
+    assert ReferralService.add_referral(user_ids[3], user_ids[3])[1] == "Нельзя пригласить самого себя"
+    assert ReferralService.add_referral(user_ids[5], user_ids[4])[1] == "Пользователь уже приглашён"
+    assert ReferralService.add_referral(user_ids[4], user_ids[1])[1] == "Циклическая реферальная связь"
+    assert ReferralService.get_stats(user_ids[4])["total"] == 0
+
+
+def test_concurrent_duplicate_referral_leaves_stats_unchanged(app, user_ids, monkeypatch):
+    """
+    Повторная вставка, прошедшая проверку параллельно с первой, отвергается уникальным индексом:
+    агрегаты и пригласивший не меняются.
+    """
+    build_tree(user_ids)
+    before = snapshot()
+    check = referral_service._already_referred
+    checks = []
+
+    def stale_check(user_id):
+        # Первая проверка выполняется до того, как параллельная вставка зафиксирована
+        checks.append(user_id)
+        return len(checks) > 1 and check(user_id)
+
+    monkeypatch.setattr(referral_service, '_already_referred', stale_check)
+    assert ReferralService.add_referral(user_ids[5], user_ids[4]) == (None, "Пользователь уже приглашён")
+    db.session.expire_all()
+    assert snapshot() == before
+    assert db.session.get(User, user_ids[4]).referrer_id == user_ids[3]
+
+
+def test_registration_by_referral_link_creates_referral(app, user_ids):
+    """
+    Регистрация с ?ref=<код> добавляет приглашённого в дерево пригласившего; неизвестный код
+    регистрацию не ломает.
+    """
+    referrer = db.session.get(User, user_ids[1])
+    code = referrer.generate_referral_code()
+    db.session.commit()
+    client = app.test_client()
+
+    for login, ref in (("invited", code), ("stranger", "no-such-code")):
+        response = client.post('/auth/register', query_string={"ref": ref}, json={
+            "login": login, "email": f"{login}@example.com", "phone": f"+7912345678{len(login) % 10}",
+            "password": "password123", "confirm_password": "password123"
+        })
+        assert response.status_code == 201
+
+    invited = User.query.filter_by(login="invited").one()
+    assert invited.referrer_id == referrer.id
+    assert User.query.filter_by(login="stranger").one().referrer_id is None
+    assert ReferralService.get_stats(referrer.id)['direct'] == 1
+
+
+def test_referral_endpoints_read_fixed_number_of_queries(app, user_ids):
+    """
+    Статистика в профиле и у администратора читается фиксированным числом запросов при любой глубине дерева.
+    """
+    build_tree(user_ids)
+    for i in range(3):
+        user = db.session.get(User, user_ids[i])
+        user.set_password("password123")
+    db.session.commit()
+
+    client = app.test_client()
+    token = client.post('/auth/login', json={"login": "user1", "password": "password123"}).get_json()['access_token']
+    admin = client.post('/auth/login', json={"login": "user0", "password": "password123"}).get_json()['access_token']
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'referral' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get('/profile/referrals', headers={"Authorization": f"Bearer {token}"})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["stats"]["total"] == 6
+    assert [row["login"] for row in body["direct"]] == ["user2", "user5"]
+    assert body["clicks"] == 0
+    assert len(statements) == 3
+
+    headers = {"Authorization": f"Bearer {admin}"}
+    top = client.get('/admin/referrals/top?limit=2', headers=headers).get_json()["items"]
+    assert [row["user_id"] for row in top] == [user_ids[1], user_ids[2]]
+
+    tree = client.get(f'/admin/referrals/{user_ids[1]}?depth=2', headers=headers).get_json()["tree"]
+    assert [(row["login"], row["level"]) for row in tree] == [
+        ("user2", 1), ("user5", 1), ("user3", 2), ("user6", 2)
+    ]
+    assert client.get(f'/admin/referrals/{user_ids[1]}', headers={"Authorization": f"Bearer {token}"}).status_code == 403
+    assert client.post('/admin/referrals/rebuild', headers=headers).get_json() == {"users": 4}
\ No newline at end of file
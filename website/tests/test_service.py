@@ -1,8 +1,10 @@
 import pytest
-from website.models import User, Product, CartItem, Order, BonusTransaction
+from datetime import datetime, timedelta
+from website.models import User, Product, CartItem, Order, BonusTransaction, StockReservation
 from website.services.auth_service import AuthService
 from website.services.bonus_service import BonusService
 from website.services.order_service import OrderService
+from website.services.inventory_service import InventoryService
 from website.extensions import db
 
 
@@ -142,4 +144,59 @@ def test_order_service_insufficient_stock(app):
         # Попытка создать заказ
         order, error = OrderService.create_order(user.id)
         assert order is None
-        assert error == "Недостаточно товара на складе: Test Product"
\ No newline at end of file
+        assert error == "Недостаточно товара на складе: Test Product"
+
+
+def test_inventory_reserve_is_all_or_nothing(app):
+    """
+    Резерв списывает весь заказ одним условным UPDATE или не списывает ничего.
+    """
+    with app.app_context():
+        user = User(login="buyer", email="test@example.com", phone="+79123456789", password_hash="x")
+        first = Product(name="Первый", price=10.0, stock=5)
+        second = Product(name="Второй", price=20.0, stock=1)
+        db.session.add_all([user, first, second])
+        db.session.commit()
+
+        expires_at, error = InventoryService.reserve(user.id, {first.id: 3, second.id: 2})
+        db.session.commit()
+        assert expires_at is None
+        assert error == "Недостаточно товара на складе: Второй"
+        assert (db.session.get(Product, first.id).stock, db.session.get(Product, second.id).stock) == (5, 1)
+        assert StockReservation.query.count() == 0
+
+        expires_at, error = InventoryService.reserve(user.id, {first.id: 3, second.id: 1})
+        db.session.commit()
+        assert error is None
+        db.session.expire_all()
+        assert (db.session.get(Product, first.id).stock, db.session.get(Product, second.id).stock) == (2, 0)
+        assert StockReservation.query.filter_by(status='held').count() == 2
+
+
+def test_inventory_release_expired(app):
+    """
+    Очистка возвращает на склад просроченные удержания неоплаченных заказов и не трогает оплаченные.
+    """
+    with app.app_context():
+        user = User(login="buyer", email="test@example.com", phone="+79123456789", password_hash="x")
+        product = Product(name="Товар", price=10.0, stock=10)
+        db.session.add_all([user, product])
+        db.session.commit()
+
+        paid = Order(user_id=user.id, total_amount=30.0)
+        unpaid = Order(user_id=user.id, total_amount=40.0)
+        db.session.add_all([paid, unpaid])
+        db.session.flush()
+        InventoryService.reserve(user.id, {product.id: 3}, order_id=paid.id, hold_seconds=60)
+        InventoryService.reserve(user.id, {product.id: 4}, order_id=unpaid.id, hold_seconds=60)
+        InventoryService.commit_orders([paid.id])
+        db.session.commit()
+
+        assert InventoryService.release_expired() == 0
+        assert InventoryService.release_expired(now=datetime.utcnow() + timedelta(minutes=2), batch_size=1) == 1
+        db.session.expire_all()
+        assert db.session.get(Product, product.id).stock == 7
+        assert db.session.get(Order, unpaid.id).status == 'Отменен'
+        assert db.session.get(Order, paid.id).status == 'pending'
+        # Подтверждённое и возвращённое удержания удалены, товар можно удалить
+        assert StockReservation.query.count() == 0
@@ -0,0 +1,82 @@
+import pytest
+from flask_jwt_extended import decode_token
+from website.models import User
+from website.extensions import db
+from website.services.token_blocklist import TokenBlocklist, get_token_blocklist
+
+
+@pytest.fixture
+def app():
+    from website import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    user = User(login="buyer", email="buyer@example.com", phone="+79123456789")
+    user.set_password("password123")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def login(client):
+    response = client.post('/auth/login', json={"login": "buyer", "password": "password123"})
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+
+def test_logout_revokes_only_its_token(app, user):
+    """
+    После выхода токен перестаёт приниматься, а другие токены того же пользователя работают.
+    """
+    client = app.test_client()
+    headers, other_headers = login(client), login(client)
+    assert client.get('/profile/profile', headers=headers).status_code == 200
+
+    assert client.post('/auth/logout', headers=headers).status_code == 200
+    assert client.get('/profile/profile', headers=headers).status_code == 401
+    assert client.get('/profile/profile', headers=other_headers).status_code == 200
+
+
+def test_revocations_sync_between_processes(app, user):
+    """
+    Блок-лист другого процесса подтягивает отзыв из общей таблицы при синхронизации.
+    """
+    client = app.test_client()
+    headers = login(client)
+    other_process = TokenBlocklist(capacity=1000)
+    other_process.sync()
+
+    client.post('/auth/logout', headers=headers)
+    jti = decode_token(headers["Authorization"].split()[1], allow_expired=True)['jti']
+    assert get_token_blocklist().is_revoked(jti)
+    assert not other_process.is_revoked(jti)
+    assert other_process.sync() == 1
+    assert other_process.is_revoked(jti)
+
+
+def test_blocklist_entries_expire_with_tokens():
+    """
+    Запись исчезает из блок-листа вместе с истечением токена, фильтр перестраивается без неё.
+    """
+    now = [1_000_000.0]
+    blocklist = TokenBlocklist(capacity=100, clock=lambda: now[0])
+    for i in range(2000):
+        blocklist.add(f"old-{i}", now[0] + 60)
+    blocklist.add("fresh", now[0] + 3600)
+    blocklist.add("forever")
+    blocklist.add("already-expired", now[0] - 1)
+    assert blocklist.is_revoked("old-1") and blocklist.is_revoked("fresh")
+    assert not blocklist.is_revoked("already-expired") and not blocklist.is_revoked("unknown")
+    assert blocklist.stats()["bloom_capacity"] >= 2000
+
+    now[0] += 180
+    assert blocklist.prune() == 2000
+    assert len(blocklist) == 2
+    assert not blocklist.is_revoked("old-1")
+    assert blocklist.is_revoked("fresh") and blocklist.is_revoked("forever")
\ No newline at end of file
@@ -0,0 +1,91 @@
+import threading
+import time
+from functools import wraps
+from flask import current_app, jsonify
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, verify_jwt_in_request
+from website.extensions import cache, db
+from website.models import User
+
+PRINCIPAL_TTL = 30  # Сколько секунд процесс доверяет прочитанным из БД роли и блокировке
+CHANGED_KEY = 'principal:changed:{}'
+PROCESS_CACHE_TYPES = ('SimpleCache', 'NullCache', 'simple', 'null')
+
+_lock = threading.Lock()
+
+
+def _principals():
+    return current_app.extensions.setdefault('principals', {})
+
+
+def issue_access_token(user):
+    # Роль подписывается в токене, чтобы проверка прав не ходила в БД
+    return create_access_token(identity=str(user.id), additional_claims={"role": user.role})
+
+
+def _markers_shared():
+    # Метки смены роли видны всем процессам только в общем кэше (Redis). SimpleCache живёт
+    # в памяти процесса, поэтому с ним роли из токена и кэшу процесса доверяет только
+    # однопроцессный запуск — тесты и отладка; иначе каждая проверка читает БД
+    return (current_app.config.get('CACHE_TYPE') not in PROCESS_CACHE_TYPES
+            or current_app.testing or current_app.debug)
+
+
+def load_principal(user_id):
+    # (роль, заблокирован ли) из короткоживущего кэша процесса; промах — один узкий запрос.
+    # Запись, прочитанная до метки смены роли, считается устаревшей
+    user_id = int(user_id)
+    now = time.time()
+    shared = _markers_shared()
+    if shared:
+        with _lock:
+            entry = _principals().get(user_id)
+        if entry and entry[0] > now - PRINCIPAL_TTL and not _changed_after(user_id, entry[0]):
+            return entry[1]
+
+    row = db.session.query(User.role, User.is_blocked).filter(User.id == user_id).first()
+    principal = (row.role, bool(row.is_blocked)) if row else None
+    if shared:
+        with _lock:
+            _principals()[user_id] = (now, principal)
+    return principal
+
+
+def invalidate_principal(user_id):
+    # Роль или блокировка изменились: токены, выпущенные раньше, больше не проходят по claims,
+    # а перепроверяются по БД. Метка лежит в общем кэше, чтобы её видели все процессы;
+    # без общего кэша метки не используются (см. _markers_shared)
+    with _lock:
+        _principals().pop(int(user_id), None)
+    expires = current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES')
+    timeout = int(expires.total_seconds()) + 1 if expires else 0
+    cache.set(CHANGED_KEY.format(int(user_id)), time.time(), timeout=timeout)
+
+
+def _changed_after(user_id, issued_at):
+    changed_at = cache.get(CHANGED_KEY.format(int(user_id)))
+    return changed_at is not None and (issued_at is None or issued_at <= changed_at)
+
+
+def require_role(*roles):
+    # Замена jwt_required() + User.query.get + проверки роли. Обычный путь — роль из
+    # подписанного токена, без обращения к БД; токены без роли и выпущенные до смены
+    # роли или блокировки проверяются через load_principal. Без общего кэша — всегда по БД
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request()
+            user_id = get_jwt_identity()
+            claims = get_jwt()
+            role = claims.get('role')
+            if not _markers_shared() or role is None or _changed_after(user_id, claims.get('iat')):
+                principal = load_principal(user_id)
+                if principal is None:
+                    return jsonify({"error": "Недостаточно прав"}), 403
+                role, is_blocked = principal
+                if is_blocked:
+                    return jsonify({"error": "Пользователь заблокирован"}), 403
+            if role not in roles:
+                return jsonify({"error": "Недостаточно прав"}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
\ No newline at end of file
@@ -0,0 +1,23 @@
+import threading
+from website.extensions import db
+
+
+def start_periodic(app, name, interval, job):
+    # Фоновая периодическая задача в потоке процесса. Каждый запуск идёт в своём
+    # контексте приложения; ошибки пишутся в лог и не останавливают цикл
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            with app.app_context():
+                try:
+                    job()
+                except Exception:
+                    app.logger.exception(f"Ошибка фоновой задачи {name}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return stop
\ No newline at end of file
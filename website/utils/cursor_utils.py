@@ -0,0 +1,34 @@
+import base64
+import json
+
+MAX_INT64 = 2 ** 63 - 1
+
+
+# Курсор для keyset-пагинации: значения ключа сортировки последней строки страницы,
+# упакованные в url-safe base64, чтобы клиент передавал их обратно как есть
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _matches(value, expected):
+    # bool — подкласс int, но в курсоре ему не место; целые ограничены BIGINT
+    if isinstance(value, bool) or not isinstance(value, expected):
+        return False
+    return not isinstance(value, int) or abs(value) <= MAX_INT64
+
+
+def decode_cursor(cursor, types=None):
+    # types — ожидаемые типы значений по порядку: курсор приходит от клиента,
+    # и подделанные значения (списки, объекты) не должны доходить до SQL
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list):
+        return None
+    if types is not None and (len(values) != len(types)
+                              or not all(_matches(value, expected) for value, expected in zip(values, types))):
+        return None
+    return values
\ No newline at end of file
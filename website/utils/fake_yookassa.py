@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeYooKassa:
+    # Локальная заглушка API платежей ЮKassa для тестов и нагрузочных прогонов без сети.
+    # Понимает POST /v3/payments и GET /v3/payments/<id>, учитывает Idempotence-Key
+    # (повтор с тем же ключом возвращает тот же платёж), умеет добавлять задержку
+    # и отвечать ошибками, чтобы проверять таймауты, повторы и предохранитель клиента.
+    #
+    #     with FakeYooKassa(latency=0.05) as gateway:
+    #         app.config['YOOKASSA_API_URL'] = gateway.url
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.latency = latency
+        self.payments = {}
+        self.requests = 0
+        self._by_key = {}
+        self._failures = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v3"
+
+    def fail_next(self, count=1, status=500, body=None):
+        # Следующие count запросов получат ответ status (0 — соединение рвётся без ответа);
+        # body — произвольный текст вместо JSON, как от прокси перед шлюзом
+        with self._lock:
+            self._failures.extend([(status, body)] * count)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-yookassa', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _create_payment(self, body, key):
+        with self._lock:
+            if key and key in self._by_key:
+                return self.payments[self._by_key[key]]
+            payment_id = str(uuid.uuid4())
+            payment = {
+                "id": payment_id,
+                "status": "pending",
+                "paid": False,
+                "amount": body.get("amount"),
+                "description": body.get("description"),
+                "created_at": time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime()),
+                "confirmation": {
+                    "type": "redirect",
+                    "confirmation_url": f"https://yoomoney.ru/checkout/payments/v2/contract?orderId={payment_id}"
+                }
+            }
+            self.payments[payment_id] = payment
+            if key:
+                self._by_key[key] = payment_id
+            return payment
+
+    def _handler(self):
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, payload, content_type='application/json'):
+                data = payload.encode('utf-8') if isinstance(payload, str) else json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _start(self):
+                with gateway._lock:
+                    gateway.requests += 1
+                    failure = gateway._failures.pop(0) if gateway._failures else None
+                if gateway.latency:
+                    time.sleep(gateway.latency)
+                if failure is None:
+                    return True
+                status, body = failure
+                if status == 0:
+                    self.close_connection = True
+                    self.connection.close()
+                elif body is not None:
+                    self._reply(status, body, content_type='text/html')
+                else:
+                    self._reply(status, {"type": "error", "code": "internal_server_error"})
+                return False
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+                if not self._start():
+                    return
+                if self.path.rstrip('/') != '/v3/payments':
+                    return self._reply(404, {"type": "error", "code": "not_found"})
+                if not body.get("amount"):
+                    return self._reply(400, {"type": "error", "code": "invalid_request", "parameter": "amount"})
+                self._reply(200, gateway._create_payment(body, self.headers.get('Idempotence-Key')))
+
+            def do_GET(self):
+                if not self._start():
+                    return
+                payment = gateway.payments.get(self.path.rsplit('/', 1)[-1])
+                if payment is None:
+                    return self._reply(404, {"type": "error", "code": "not_found"})
+                self._reply(200, payment)
+
+        return Handler
\ No newline at end of file
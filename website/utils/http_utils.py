@@ -0,0 +1,37 @@
+import hashlib
+from datetime import timezone
+from flask import jsonify, make_response, request
+
+
+def make_etag(*validators):
+    raw = '|'.join('' if value is None else str(value) for value in validators)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def conditional_json(validators, build, last_modified=None, cache_control='private, no-cache'):
+    # validators — дешёвые признаки версии ресурса (updated_at, количество строк, поколение кэша);
+    # build вызывается только если клиентская копия устарела, поэтому тело не сериализуется при 304.
+    # last_modified стоит передавать только для одиночных строк: у коллекций удаление элемента
+    # не сдвигает max(updated_at), и If-Modified-Since дал бы ложный 304
+    etag = make_etag(request.path, request.query_string.decode('utf-8'), *validators)
+    if last_modified is not None:
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    elif last_modified is not None and request.if_modified_since:
+        not_modified = last_modified <= request.if_modified_since
+    else:
+        not_modified = False
+
+    if not_modified:
+        response = make_response('', 304)
+    else:
+        response = make_response(jsonify(build()), 200)
+
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # no-cache: клиент может хранить ответ, но обязан перепроверять его по ETag
+    response.headers['Cache-Control'] = cache_control
+    return response
\ No newline at end of file
@@ -0,0 +1,48 @@
+import re
+from functools import lru_cache
+
+PHONE_CACHE_SIZE = 4096  # Сколько разобранных номеров держать в памяти процесса
+
+
+def _phonenumbers():
+    # Метаданные phonenumbers заметно удлиняют старт воркера, а нужны только
+    # регистрации и смене профиля, поэтому модуль загружается при первом разборе номера
+    import phonenumbers
+    return phonenumbers
+
+
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
+def _parse_phone(text):
+    # (E.164, номер валиден) для строки ровно в том виде, в каком она пришла
+    phonenumbers = _phonenumbers()
+    try:
+        number = phonenumbers.parse(text, None)  # None — не привязываем к конкретной стране
+    except phonenumbers.NumberParseException:
+        return None, False
+    return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164), phonenumbers.is_valid_number(number)
+
+
+def normalize_email(email):
+    # Адреса сравниваются без учёта регистра и окружающих пробелов
+    if not email:
+        return None
+    return email.strip().lower()[:120]
+
+
+def phone_to_e164(phone):
+    # Проверка номера в международном формате; None — номер некорректен
+    if not phone:
+        return None
+    e164, valid = _parse_phone(phone.strip())
+    return e164 if valid else None
+
+
+def normalize_phone(phone):
+    # Телефон в E.164 (+79123456789) независимо от пробелов, скобок и дефисов во вводе
+    if not phone:
+        return None
+    digits = re.sub(r'\D', '', phone)
+    if not digits:
+        return None
+    e164, _ = _parse_phone('+' + digits)
+    return e164 or ('+' + digits)[:20]
\ No newline at end of file
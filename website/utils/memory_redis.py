@@ -0,0 +1,181 @@
+import fnmatch
+import random
+import threading
+
+
+class MemoryRedis:
+    # Минимальная потокобезопасная замена redis.Redis(decode_responses=True) в памяти процесса:
+    # только команды хэшей и множеств, которые нужны хранилищу корзин и счётчикам переходов.
+    # Только для тестов: у каждого процесса своя копия, при перезапуске данные теряются.
+    # Срок жизни ключей (EXPIRE) только запоминается, ключи не истекают
+
+    def __init__(self):
+        self._data = {}
+        self._ttl = {}
+        self._lock = threading.RLock()
+
+    def hgetall(self, name):
+        with self._lock:
+            return dict(self._data.get(name, {}))
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        items = dict(mapping or {})
+        if key is not None:
+            items[key] = value
+        with self._lock:
+            hash_ = self._data.setdefault(name, {})
+            added = sum(1 for field in items if str(field) not in hash_)
+            hash_.update({str(field): str(item) for field, item in items.items()})
+            return added
+
+    def hget(self, name, key):
+        with self._lock:
+            return self._data.get(name, {}).get(str(key))
+
+    def hexists(self, name, key):
+        with self._lock:
+            return str(key) in self._data.get(name, {})
+
+    def hincrby(self, name, key, amount=1):
+        with self._lock:
+            hash_ = self._data.setdefault(name, {})
+            value = int(hash_.get(str(key), 0)) + int(amount)
+            hash_[str(key)] = str(value)
+            return value
+
+    def hdel(self, name, *keys):
+        with self._lock:
+            hash_ = self._data.get(name, {})
+            removed = sum(1 for key in keys if hash_.pop(str(key), None) is not None)
+            if name in self._data and not hash_:
+                del self._data[name]
+            return removed
+
+    def rename(self, src, dst):
+        with self._lock:
+            if src not in self._data:
+                raise ValueError("no such key")
+            self._data[dst] = self._data.pop(src)
+            self._ttl.pop(dst, None)
+            if src in self._ttl:
+                self._ttl[dst] = self._ttl.pop(src)
+            return True
+
+    def scan_iter(self, match=None):
+        with self._lock:
+            names = list(self._data)
+        return iter([name for name in names if match is None or fnmatch.fnmatchcase(name, match)])
+
+    def renamenx(self, src, dst):
+        with self._lock:
+            if dst in self._data:
+                return False
+            self._data[dst] = self._data.pop(src)
+            if src in self._ttl:
+                self._ttl[dst] = self._ttl.pop(src)
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            for name in names:
+                self._ttl.pop(name, None)
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+    def expire(self, name, seconds):
+        with self._lock:
+            if name not in self._data:
+                return False
+            self._ttl[name] = int(seconds)
+            return True
+
+    def ttl(self, name):
+        with self._lock:
+            if name not in self._data:
+                return -2
+            return self._ttl.get(name, -1)
+
+    def sadd(self, name, *values):
+        with self._lock:
+            members = self._data.setdefault(name, set())
+            added = sum(1 for value in values if str(value) not in members)
+            members.update(str(value) for value in values)
+            return added
+
+    def srem(self, name, *values):
+        with self._lock:
+            members = self._data.get(name, set())
+            removed = sum(1 for value in values if str(value) in members)
+            members.difference_update(str(value) for value in values)
+            return removed
+
+    def smembers(self, name):
+        with self._lock:
+            return set(self._data.get(name, set()))
+
+    def spop(self, name, count=None):
+        with self._lock:
+            members = self._data.get(name, set())
+            popped = random.sample(sorted(members), min(count or 1, len(members)))
+            members.difference_update(popped)
+            if count is None:
+                return popped[0] if popped else None
+            return popped
+
+    def pipeline(self, transaction=True):
+        return _MemoryPipeline(self)
+
+    def transaction(self, func, *watches):
+        # Как redis.Redis.transaction (WATCH/MULTI/EXEC): вся функция выполняется
+        # под блокировкой, поэтому повторять её не приходится
+        with self._lock:
+            pipe = self.pipeline()
+            pipe.watch(*watches)
+            func(pipe)
+            return pipe.execute()
+
+
+class _MemoryPipeline:
+    # Команды копятся и выполняются под одной блокировкой, как MULTI/EXEC.
+    # После watch() команды выполняются сразу, до multi()
+
+    def __init__(self, client):
+        self._client = client
+        self._commands = []
+        self._buffered = True
+
+    def __getattr__(self, command):
+        if not self._buffered:
+            return getattr(self._client, command)
+
+        def queue(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    def watch(self, *names):
+        self._buffered = False
+
+    def multi(self):
+        self._buffered = True
+
+    def execute(self, raise_on_error=True):
+        # Как в Redis, ошибка одной команды транзакции не отменяет остальные
+        results = []
+        with self._client._lock:
+            for command, args, kwargs in self._commands:
+                try:
+                    results.append(getattr(self._client, command)(*args, **kwargs))
+                except Exception as e:
+                    if raise_on_error:
+                        self._commands = []
+                        raise
+                    results.append(e)
+        self._commands = []
+        self._buffered = True
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._commands = []
\ No newline at end of file
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+from math import floor
+from flask import current_app
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport
+
+DEFAULT_MAX_KEYS = 100_000
+
+
+class WindowMemoryStorage(Storage, SlidingWindowCounterSupport):
+    # Хранилище Flask-Limiter в памяти процесса для стратегии sliding-window-counter
+    # (RATELIMIT_STORAGE_URI = "window-memory://"). На ключ лимита — одна запись
+    # [номер окна, счётчик прошлого окна, счётчик текущего окна]; записей не больше max_keys,
+    # давно не обновлявшиеся вытесняются первыми. Для кластера — redis:// с той же стратегией
+
+    STORAGE_SCHEME = ["window-memory"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, max_keys=DEFAULT_MAX_KEYS, clock=time.time, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.max_keys = int(max_keys)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._windows = OrderedDict()
+        self._counters = OrderedDict()
+
+    @property
+    def base_exceptions(self):
+        return ValueError
+
+    def _store(self, entries, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > self.max_keys:
+            entries.popitem(last=False)
+
+    def _roll(self, key, expiry, now):
+        # Счётчики (прошлое окно, текущее окно) на момент now
+        window = int(now // expiry)
+        entry = self._windows.get(key)
+        if entry is None or entry[0] < window - 1:
+            return window, 0, 0
+        if entry[0] == window - 1:
+            return window, entry[2], 0
+        return window, entry[1], entry[2]
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = self.clock()
+        # Доля прошлого окна, ещё попадающая в скользящее окно длиной expiry
+        weight = 1 - (now / expiry) % 1
+        with self._lock:
+            entry = self._windows.get(key)
+            if entry is None:
+                entry = [0, 0, 0]
+                self._store(self._windows, key, entry)
+            else:
+                self._windows.move_to_end(key)
+            # Запись меняется на месте: на горячем пути без новых объектов
+            entry[0], entry[1], entry[2] = self._roll(key, expiry, now)
+            if floor(entry[1] * weight + entry[2]) + amount > limit:
+                return False
+            entry[2] += amount
+        return True
+
+    def get_sliding_window(self, key, expiry):
+        now = self.clock()
+        with self._lock:
+            _, previous, current = self._roll(key, expiry, now)
+        previous_ttl = (1 - (now / expiry) % 1) * expiry if previous else 0.0
+        current_ttl = (1 - (now / expiry) % 1) * expiry + expiry
+        return previous, previous_ttl, current, current_ttl
+
+    def clear_sliding_window(self, key, expiry):
+        with self._lock:
+            self._windows.pop(key, None)
+
+    # Счётчики фиксированного окна — для стратегии fixed-window на том же хранилище
+
+    def incr(self, key, expiry, amount=1):
+        now = self.clock()
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None or entry[0] <= now:
+                entry = [now + expiry, 0]
+            entry[1] += amount
+            self._store(self._counters, key, entry)
+            return entry[1]
+
+    def get(self, key):
+        entry = self._counters.get(key)
+        return entry[1] if entry and entry[0] > self.clock() else 0
+
+    def get_expiry(self, key):
+        entry = self._counters.get(key)
+        return entry[0] if entry else self.clock()
+
+    def clear(self, key):
+        with self._lock:
+            self._counters.pop(key, None)
+            self._windows.pop(key, None)
+
+    def check(self):
+        return True
+
+    def reset(self):
+        with self._lock:
+            count = len(self._windows) + len(self._counters)
+            self._windows.clear()
+            self._counters.clear()
+        return count
+
+
+def limit_from_config(name):
+    # Лимит читается из настроек при каждом запросе, поэтому его можно менять без правки маршрутов
+    return lambda: current_app.config[name]
\ No newline at end of file
@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+from flask import Response, stream_with_context
+
+# Отдаём клиенту накопленный текст кусками, а не построчно: меньше вызовов write у WSGI-сервера
+FLUSH_SIZE = 64 * 1024
+
+ENCODING_ERROR = "Некорректная кодировка, ожидается UTF-8"
+CSV_ERROR = "Некорректная строка CSV"
+
+STREAM_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def detect_format(requested, content_type=None):
+    if requested:
+        return requested if requested in STREAM_FORMATS else None
+    for name, mimetype in STREAM_FORMATS.items():
+        if content_type and content_type.startswith(mimetype):
+            return name
+    return None
+
+
+def ndjson_lines(rows):
+    buffer = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row, ensure_ascii=False, default=str) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def csv_lines(fieldnames, rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= FLUSH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_rows(rows, fmt, fieldnames, filename):
+    # rows — генератор словарей; ответ собирается по мере чтения из БД и не держит выборку в памяти
+    if fmt == 'csv':
+        body = csv_lines(fieldnames, rows)
+    else:
+        body = ndjson_lines(rows)
+    return Response(
+        stream_with_context(body),
+        mimetype=STREAM_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{fmt}"}
+    )
+
+
+def _decoded_lines(stream, bad_lines):
+    # Строки декодируются по одной: байты не в UTF-8 портят только свою строку,
+    # её номер попадает в bad_lines, а чтение продолжается
+    for line_no, raw in enumerate(stream, start=1):
+        try:
+            yield raw.decode('utf-8')
+        except UnicodeDecodeError:
+            bad_lines.add(line_no)
+            yield raw.decode('utf-8', errors='replace')
+
+
+def read_ndjson(stream):
+    # Возвращает (номер строки, словарь или None, ошибка); пустые строки пропускаются
+    bad_lines = set()
+    for line_no, line in enumerate(_decoded_lines(stream, bad_lines), start=1):
+        if line_no in bad_lines:
+            yield line_no, None, ENCODING_ERROR
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, None, "Некорректный JSON"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, "Ожидается JSON-объект"
+            continue
+        yield line_no, row, None
+
+
+def read_csv(stream):
+    bad_lines = set()
+    reader = csv.reader(_decoded_lines(stream, bad_lines))
+    try:
+        header = next(reader, None)
+    except csv.Error:
+        yield reader.line_num, None, CSV_ERROR
+        return
+    if header is None:
+        return
+    if bad_lines:
+        yield reader.line_num, None, ENCODING_ERROR
+        return
+
+    last_line = reader.line_num
+    while True:
+        # Номер строки файла с учётом заголовка; запись в кавычках может занимать несколько строк
+        try:
+            values = next(reader)
+        except StopIteration:
+            return
+        except csv.Error:
+            yield reader.line_num, None, CSV_ERROR
+        else:
+            if bad_lines.intersection(range(last_line + 1, reader.line_num + 1)):
+                yield reader.line_num, None, ENCODING_ERROR
+            elif values:
+                yield reader.line_num, dict(zip(header, values)), None
+        last_line = reader.line_num
\ No newline at end of file